@@ -0,0 +1,14 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "users" ADD "email_frequency" VARCHAR(7) NOT NULL DEFAULT 'instant';
+        COMMENT ON COLUMN "users"."email_frequency" IS 'instant: instant
+hourly: hourly
+daily: daily';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "users" DROP COLUMN "email_frequency";"""
@@ -0,0 +1,45 @@
+from tortoise import BaseDBAsyncClient
+from src.core.config import settings
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # Blobs are keyed by the bucket the app actually uses, which is configurable
+    projects, submissions = _literal(settings.MINIO_BUCKET_PROJECTS), _literal(settings.MINIO_BUCKET_SUBMISSIONS)
+    return f"""
+        CREATE TABLE IF NOT EXISTS "file_blobs" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "bucket" VARCHAR(100) NOT NULL,
+    "sha256" VARCHAR(64) NOT NULL,
+    "object_name" VARCHAR(500) NOT NULL,
+    "size" BIGINT NOT NULL,
+    "ref_count" INT NOT NULL DEFAULT 0,
+    "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT "uid_file_blobs_bucket_d4a2f1" UNIQUE ("bucket", "sha256")
+);
+COMMENT ON TABLE "file_blobs" IS 'One stored object per distinct content (SHA-256) per bucket, shared by every ProjectFile with that content.';
+        ALTER TABLE "project_files" ADD "blob_id" INT;
+        ALTER TABLE "project_files" ADD CONSTRAINT "fk_project__file_blo_8c1e3b7a" FOREIGN KEY ("blob_id") REFERENCES "file_blobs" ("id") ON DELETE RESTRICT;
+        CREATE INDEX IF NOT EXISTS "idx_project_fil_blob_id_5b0c9e" ON "project_files" ("blob_id");
+        -- Backfill: the earliest hashed copy of each content becomes its blob; later duplicates keep their own objects
+        INSERT INTO "file_blobs" ("bucket", "sha256", "object_name", "size", "ref_count")
+        SELECT DISTINCT ON (bucket, "sha256") bucket, "sha256", "object_name", COALESCE("file_size", 0), 1
+        FROM (
+            SELECT *, CASE WHEN "file_type" = 'attachment' THEN {projects} ELSE {submissions} END AS bucket
+            FROM "project_files" WHERE "sha256" IS NOT NULL
+        ) f
+        ORDER BY bucket, "sha256", "id";
+        UPDATE "project_files" pf SET "blob_id" = b."id"
+        FROM "file_blobs" b
+        WHERE b."sha256" = pf."sha256" AND b."object_name" = pf."object_name";"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "project_files" DROP CONSTRAINT IF EXISTS "fk_project__file_blo_8c1e3b7a";
+        DROP INDEX IF EXISTS "idx_project_fil_blob_id_5b0c9e";
+        ALTER TABLE "project_files" DROP COLUMN "blob_id";
+        DROP TABLE IF EXISTS "file_blobs";"""
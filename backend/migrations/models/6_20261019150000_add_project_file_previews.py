@@ -0,0 +1,18 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "project_files" ADD "preview_status" VARCHAR(10);
+        ALTER TABLE "project_files" ADD "thumbnail_object" VARCHAR(500);
+        ALTER TABLE "project_files" ADD "preview_object" VARCHAR(500);
+        -- Existing images and PDFs get picked up by the preview sweeper
+        UPDATE "project_files" SET "preview_status" = 'pending'
+        WHERE lower("filename") ~ '\\.(png|jpe?g|gif|pdf)$';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "project_files" DROP COLUMN "preview_status";
+        ALTER TABLE "project_files" DROP COLUMN "thumbnail_object";
+        ALTER TABLE "project_files" DROP COLUMN "preview_object";"""
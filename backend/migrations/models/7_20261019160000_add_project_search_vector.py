@@ -0,0 +1,74 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "projects" ADD "search_vector" TSVECTOR;
+
+        -- Title weighs most, then required skill names, then the description
+        CREATE OR REPLACE FUNCTION projects_search_vector(p_id INT, p_title TEXT, p_description TEXT)
+        RETURNS tsvector AS $$
+            SELECT setweight(to_tsvector('english', coalesce(p_title, '')), 'A')
+                || setweight(to_tsvector('english', coalesce((
+                       SELECT string_agg(s."name", ' ')
+                       FROM "project_skills" ps JOIN "skills" s ON s."id" = ps."skill_id"
+                       WHERE ps."projects_id" = p_id), '')), 'B')
+                || setweight(to_tsvector('english', coalesce(p_description, '')), 'C')
+        $$ LANGUAGE sql STABLE;
+
+        CREATE OR REPLACE FUNCTION projects_search_vector_trigger() RETURNS trigger AS $$
+        BEGIN
+            NEW."search_vector" := projects_search_vector(NEW."id", NEW."title", NEW."description");
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER "projects_search_vector"
+            BEFORE INSERT OR UPDATE OF "title", "description" ON "projects"
+            FOR EACH ROW EXECUTE FUNCTION projects_search_vector_trigger();
+
+        CREATE OR REPLACE FUNCTION project_skills_search_vector_trigger() RETURNS trigger AS $$
+        DECLARE
+            pid INT := CASE WHEN TG_OP = 'DELETE' THEN OLD."projects_id" ELSE NEW."projects_id" END;
+        BEGIN
+            UPDATE "projects" SET "search_vector" = projects_search_vector("id", "title", "description")
+            WHERE "id" = pid;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER "project_skills_search_vector"
+            AFTER INSERT OR DELETE ON "project_skills"
+            FOR EACH ROW EXECUTE FUNCTION project_skills_search_vector_trigger();
+
+        CREATE OR REPLACE FUNCTION skills_search_vector_trigger() RETURNS trigger AS $$
+        BEGIN
+            UPDATE "projects" p SET "search_vector" = projects_search_vector(p."id", p."title", p."description")
+            FROM "project_skills" ps
+            WHERE ps."projects_id" = p."id" AND ps."skill_id" = NEW."id";
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER "skills_search_vector"
+            AFTER UPDATE OF "name" ON "skills"
+            FOR EACH ROW WHEN (OLD."name" IS DISTINCT FROM NEW."name")
+            EXECUTE FUNCTION skills_search_vector_trigger();
+
+        -- Backfill existing projects
+        UPDATE "projects" SET "search_vector" = projects_search_vector("id", "title", "description");
+
+        CREATE INDEX "idx_projects_search_vector" ON "projects" USING GIN ("search_vector");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TRIGGER IF EXISTS "skills_search_vector" ON "skills";
+        DROP TRIGGER IF EXISTS "project_skills_search_vector" ON "project_skills";
+        DROP TRIGGER IF EXISTS "projects_search_vector" ON "projects";
+        DROP FUNCTION IF EXISTS skills_search_vector_trigger();
+        DROP FUNCTION IF EXISTS project_skills_search_vector_trigger();
+        DROP FUNCTION IF EXISTS projects_search_vector_trigger();
+        DROP FUNCTION IF EXISTS projects_search_vector(INT, TEXT, TEXT);
+        DROP INDEX IF EXISTS "idx_projects_search_vector";
+        ALTER TABLE "projects" DROP COLUMN "search_vector";"""
@@ -0,0 +1,14 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- Keyset pagination walks (created_at, id) backwards and (deadline, id) forwards
+        CREATE INDEX IF NOT EXISTS "idx_projects_created_at_id" ON "projects" ("created_at", "id");
+        CREATE INDEX IF NOT EXISTS "idx_projects_deadline_id" ON "projects" ("deadline", "id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_projects_created_at_id";
+        DROP INDEX IF EXISTS "idx_projects_deadline_id";"""
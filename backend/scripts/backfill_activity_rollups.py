@@ -0,0 +1,57 @@
+"""One-time backfill of activity_rollups / activity_daily_users from activity_logs.
+
+The rollups are only fed by the live writer, so events logged before they were
+deployed are missing from admin analytics until this script folds them in.
+
+Only raw events older than the earliest hourly rollup are counted; newer ones
+were already rolled up live. Events are processed newest hour first and each
+hour is written in one go, so an interrupted run can simply be started again:
+the earliest rollup then marks where it stopped. The hour in which the live
+writer started may still miss the events logged before the deploy.
+
+Usage (from the backend/ directory):
+
+    python3 scripts/backfill_activity_rollups.py
+"""
+import asyncio
+from datetime import datetime, timezone
+from src.database.mongodb import get_mongodb, init_mongodb, close_mongodb
+from src.core.activity import hour_bucket, rollup_activity
+
+
+async def backfill():
+    db = await get_mongodb()
+    try:
+        await init_mongodb()
+        earliest = await db.activity_rollups.find_one(
+            {"granularity": "hour"}, sort=[("bucket", 1)], projection={"bucket": 1},
+        )
+        cutoff = earliest["bucket"] if earliest else hour_bucket(datetime.now(timezone.utc))
+
+        cursor = db.activity_logs.find(
+            {"created_at": {"$lt": cutoff}},
+            projection={"user_id": 1, "action": 1, "role": 1, "created_at": 1},
+        ).sort("created_at", -1)
+        hours = events = 0
+        batch: list[dict] = []
+        async for doc in cursor:
+            # MongoDB returns naive UTC datetimes
+            doc["created_at"] = doc["created_at"].replace(tzinfo=timezone.utc)
+            if batch and hour_bucket(doc["created_at"]) != hour_bucket(batch[0]["created_at"]):
+                await rollup_activity(db, batch)
+                hours += 1
+                events += len(batch)
+                batch = []
+            batch.append(doc)
+        if batch:
+            await rollup_activity(db, batch)
+            hours += 1
+            events += len(batch)
+
+        print(f"Rolled up {events} activity log(s) across {hours} hour(s) before {cutoff.isoformat()}")
+    finally:
+        await close_mongodb()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
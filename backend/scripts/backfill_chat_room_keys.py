@@ -0,0 +1,51 @@
+"""One-time backfill script for chat room kind/key fields.
+
+Rooms created before the canonical-key change have neither `kind` nor `key`,
+so the (project_id, kind, key) upsert cannot find them and would open a second
+room for the same conversation. This script assigns:
+  - kind="team", key="team" to rooms flagged with is_team_chat,
+  - kind="dm",   key=<sorted participant ids joined by ":"> to everything else.
+
+When several legacy rooms map to the same (project_id, kind, key), only the
+oldest one is keyed; the duplicates keep their history and stay reachable from
+the room list, but new lookups resolve to the keyed room.
+
+Usage (from the backend/ directory):
+
+    python3 scripts/backfill_chat_room_keys.py
+"""
+import asyncio
+from src.database.mongodb import get_mongodb, init_mongodb, close_mongodb
+from src.chat.repository import ROOM_KIND_DM, ROOM_KIND_TEAM, TEAM_ROOM_KEY, room_key
+
+
+async def backfill():
+    db = await get_mongodb()
+    try:
+        await init_mongodb()
+        cursor = db.chat_rooms.find({"key": {"$exists": False}}).sort("created_at", 1)
+        updated = skipped = 0
+        async for room in cursor:
+            if room.get("is_team_chat"):
+                kind, key = ROOM_KIND_TEAM, TEAM_ROOM_KEY
+            else:
+                kind, key = ROOM_KIND_DM, room_key(room["participants"])
+            taken = await db.chat_rooms.find_one(
+                {"project_id": room["project_id"], "kind": kind, "key": key},
+                projection={"_id": 1},
+            )
+            if taken:
+                skipped += 1
+                continue
+            await db.chat_rooms.update_one(
+                {"_id": room["_id"]}, {"$set": {"kind": kind, "key": key}},
+            )
+            updated += 1
+
+        print(f"Backfilled kind/key for {updated} room(s), skipped {skipped} duplicate(s)")
+    finally:
+        await close_mongodb()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
@@ -0,0 +1,80 @@
+"""Benchmark GET /projects: the full response vs. the `view=card` projection.
+
+Seeds a throwaway database with projects that look like real ones (long
+descriptions, several skills, a couple of attachments each), then times
+`list_projects` for both views — query plus response serialization — and
+reports the JSON payload size of one page.
+
+Usage (from the backend/ directory):
+
+    python3 scripts/benchmark_project_list.py
+    python3 scripts/benchmark_project_list.py --projects 5000 --size 50 --database-url sqlite:///tmp/bench.db
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from tortoise import Tortoise
+from src.database.postgres import TORTOISE_ORM
+from src.projects import service
+from src.projects.models import Project, ProjectFile
+from src.projects.schemas import ProjectListResponse
+from src.skills.models import Skill
+from src.users.models import User, RoleEnum
+
+MODELS = [m for m in TORTOISE_ORM["apps"]["models"]["models"] if m != "aerich.models"]
+WORDS = ("platform data mobile design backend api student review team sprint dashboard "
+         "analytics prototype research cloud service integration testing").split()
+
+
+async def seed(projects: int) -> None:
+    owner = await User.create(email="bench@example.com", username="bench", hashed_password="x",
+                              role=RoleEnum.company)
+    skills = [await Skill.create(name=f"Skill {i}", category=f"Category {i % 8}") for i in range(60)]
+    rng = random.Random(42)
+    for i in range(projects):
+        project = await Project.create(
+            title=f"Project {i} {rng.choice(WORDS)}",
+            description=" ".join(rng.choice(WORDS) for _ in range(220)),
+            owner=owner, max_participants=rng.randint(1, 6),
+        )
+        await project.required_skills.add(*rng.sample(skills, 5))
+        for n in range(2):
+            await ProjectFile.create(project=project, uploader=owner, filename=f"brief-{n}.pdf",
+                                     object_name=f"{i}-{n}.pdf", file_size=120_000, file_type="attachment")
+
+
+async def measure(view: str, size: int, rounds: int) -> tuple[list[float], int]:
+    timings, payload = [], b""
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = await service.list_projects(1, size, None, None, None, None, None, "newest", view=view)
+        model = result if view == "card" else ProjectListResponse.model_validate(result)
+        payload = model.model_dump_json().encode()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, len(payload)
+
+
+async def main(args) -> None:
+    await Tortoise.init(db_url=args.database_url, modules={"models": MODELS})
+    await Tortoise.generate_schemas()
+    try:
+        await seed(args.projects)
+        print(f"{args.projects} projects, page size {args.size}, {args.rounds} rounds")
+        for view in ("full", "card"):
+            await measure(view, args.size, 3)  # warm up
+            timings, size = await measure(view, args.size, args.rounds)
+            print(f"  view={view:<5} median {statistics.median(timings):7.2f} ms   "
+                  f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:7.2f} ms   payload {size / 1024:7.1f} KiB")
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--size", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--database-url", default="sqlite://:memory:")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,64 @@
+"""Benchmark the in-memory recommendation index behind GET /projects/recommended.
+
+Fills the index with synthetic open projects (no database involved) and times
+a top-k query for random skill profiles, plus single-project updates.
+
+Usage (from the backend/ directory):
+
+    python3 scripts/benchmark_recommendations.py
+    python3 scripts/benchmark_recommendations.py --projects 100000 --skills 400 --top 20
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from src.projects.recommendations import RecommendationIndex
+
+
+def main(args) -> None:
+    rng = random.Random(42)
+    categories = [f"category-{i}" for i in range(max(1, args.skills // 25))]
+    skill_category = {skill_id: rng.choice(categories) for skill_id in range(1, args.skills + 1)}
+    # Skill popularity is skewed, as it is in practice
+    popularity = [1 / rank for rank in range(1, args.skills + 1)]
+    now = datetime.utcnow()
+
+    index = RecommendationIndex()
+    started = time.perf_counter()
+    for project_id in range(1, args.projects + 1):
+        skills = set(rng.choices(list(skill_category), popularity, k=rng.randint(1, 8)))
+        deadline = now + timedelta(days=rng.randint(1, 120)) if rng.random() < 0.6 else None
+        index.set_project(project_id, rng.randint(1, 5000), deadline,
+                          [(skill_id, skill_category[skill_id]) for skill_id in skills])
+    build = time.perf_counter() - started
+    print(f"{args.projects} projects, {args.skills} skills: built in {build:.2f} s")
+
+    timings = []
+    for _ in range(args.rounds):
+        profile = rng.sample(list(skill_category), rng.randint(2, 10))
+        started = time.perf_counter()
+        index.top({skill_id: skill_category[skill_id] for skill_id in profile}, args.top)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"  top-{args.top}: median {statistics.median(timings):6.2f} ms   "
+          f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:6.2f} ms")
+
+    updates = 1000
+    started = time.perf_counter()
+    for _ in range(updates):
+        project_id = rng.randint(1, args.projects)
+        index.set_project(project_id, 1, None, [(s, skill_category[s]) for s in rng.sample(list(skill_category), 4)])
+    update = (time.perf_counter() - started) * 1000 / updates
+    profile = {skill_id: skill_category[skill_id] for skill_id in rng.sample(list(skill_category), 5)}
+    started = time.perf_counter()
+    index.top(profile, args.top)
+    print(f"  update: {update:.3f} ms per project; first query after it {(time.perf_counter() - started) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--projects", type=int, default=100_000)
+    parser.add_argument("--skills", type=int, default=300)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,44 @@
+"""Local SMTP stand-in for development.
+
+Accepts every message without TLS or auth and prints it, so the email outbox can
+be exercised without a real mail provider. Point the backend at it with:
+
+    SMTP_HOST=localhost SMTP_PORT=8025 SMTP_STARTTLS=false SMTP_AUTH=false
+
+Usage (from the backend/ directory):
+
+    python3 scripts/dev_smtp_server.py [--host 0.0.0.0] [--port 8025]
+"""
+import argparse
+import time
+from email import message_from_bytes
+from aiosmtpd.controller import Controller
+
+
+class PrintingHandler:
+    async def handle_DATA(self, server, session, envelope):
+        msg = message_from_bytes(envelope.content)
+        print(f"── {msg['Subject']!r} from {envelope.mail_from} to {', '.join(envelope.rcpt_tos)}", flush=True)
+        return "250 Message accepted for delivery"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    controller = Controller(PrintingHandler(), hostname=args.host, port=args.port)
+    controller.start()
+    print(f"Dev SMTP server listening on {args.host}:{args.port}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
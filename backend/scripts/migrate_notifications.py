@@ -0,0 +1,50 @@
+"""One-time migration of existing notifications to the current schema.
+
+Notifications are now listed, paged and trimmed by (latest_at, _id), and read
+ones expire counting from `read_at` instead of a fixed time after creation
+(TTL index `notifications_read_ttl` on created_at). This script:
+  - sets latest_at = created_at where it is missing,
+  - drops the indexes the (latest_at, _id) ones replace, and the old TTL index,
+  - sets read_at = created_at on read notifications that predate the field,
+    so they still expire (at the same time they would have before),
+  - then creates the current indexes (init_mongodb).
+
+Safe to run more than once. Run it once per deployment, not from app startup:
+the backfill scans the whole collection.
+
+Usage (from the backend/ directory):
+
+    python3 scripts/migrate_notifications.py
+"""
+import asyncio
+from pymongo.errors import OperationFailure
+from src.database.mongodb import get_mongodb, init_mongodb, close_mongodb
+
+SUPERSEDED_INDEXES = ("user_id_1__id_-1", "user_id_1_is_read_1__id_-1",
+                      "user_id_1_group_key_1_is_read_1_latest_at_-1", "notifications_read_ttl")
+
+
+async def migrate():
+    db = await get_mongodb()
+    try:
+        result = await db.notifications.update_many(
+            {"latest_at": {"$exists": False}}, [{"$set": {"latest_at": "$created_at"}}],
+        )
+        print(f"Backfilled latest_at on {result.modified_count} notification(s)")
+        for name in SUPERSEDED_INDEXES:
+            try:
+                await db.notifications.drop_index(name)
+                print(f"Dropped index {name}")
+            except OperationFailure:
+                pass
+        result = await db.notifications.update_many(
+            {"is_read": True, "read_at": {"$exists": False}}, [{"$set": {"read_at": "$created_at"}}],
+        )
+        print(f"Backfilled read_at on {result.modified_count} notification(s)")
+        await init_mongodb()
+    finally:
+        await close_mongodb()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,44 @@
+"""One-time sync of team chat rooms with their project rosters.
+
+Team rooms created before membership was synced from team events may still
+list users who have left the team, and message reads/sends trust that list.
+This script sets every team room's participants to the project owner plus the
+current team, and deletes team rooms whose project no longer exists.
+
+Usage (from the backend/ directory):
+
+    python3 scripts/sync_team_room_participants.py
+"""
+import asyncio
+from tortoise import Tortoise
+from src.chat.repository import ROOM_KIND_TEAM
+from src.database.mongodb import get_mongodb, init_mongodb, close_mongodb
+from src.database.postgres import TORTOISE_ORM
+from src.projects.access import load_project_access
+
+
+async def sync():
+    await Tortoise.init(config=TORTOISE_ORM)
+    db = await get_mongodb()
+    try:
+        await init_mongodb()
+        updated = removed = 0
+        async for room in db.chat_rooms.find({"kind": ROOM_KIND_TEAM}, {"project_id": 1, "participants": 1}):
+            access = await load_project_access(room["project_id"])
+            if access is None:
+                await db.chat_rooms.delete_one({"_id": room["_id"]})
+                removed += 1
+                continue
+            roster = sorted(access.team | {access.owner_id})
+            if sorted(room["participants"]) != roster:
+                await db.chat_rooms.update_one({"_id": room["_id"]}, {"$set": {"participants": roster}})
+                updated += 1
+
+        print(f"Synced {updated} team room(s), removed {removed} orphaned room(s)")
+    finally:
+        await close_mongodb()
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(sync())
@@ -1,3 +1,4 @@
+from datetime import datetime
 from src.database.mongodb import get_mongodb
 from src.users.models import User, RoleEnum
 from src.projects.models import Project, ProjectStatus
@@ -38,6 +39,27 @@ async def count_notifications() -> int:
     return await mongo.notifications.count_documents({})
 
 
+async def count_active_users(since: datetime) -> int:
+    mongo = await get_mongodb()
+    cursor = mongo.activity_daily_users.aggregate([
+        {"$match": {"day": {"$gte": since}}},
+        {"$group": {"_id": "$user_id"}},
+        {"$count": "users"},
+    ])
+    async for row in cursor:
+        return row["users"]
+    return 0
+
+
+async def get_rollups(action: str, granularity: str, since: datetime) -> list[dict]:
+    mongo = await get_mongodb()
+    cursor = mongo.activity_rollups.find(
+        {"granularity": granularity, "action": action, "bucket": {"$gte": since}},
+        {"bucket": 1, "role": 1, "count": 1},
+    )
+    return [doc async for doc in cursor]
+
+
 async def get_all_users(skip: int, limit: int) -> list[User]:
     return await User.all().offset(skip).limit(limit).prefetch_related("skills")
 
@@ -3,7 +3,9 @@ from src.core.dependencies import require_role
 from src.users.models import User, RoleEnum
 from src.users.schemas import UserResponse
 from src.admin import service
-from src.admin.schemas import AdminUserUpdate, StatsResponse
+from src.admin.schemas import (
+    AdminUserUpdate, StatsResponse, ActivityWriterStats, StorageStats, ActiveUsersResponse, ActivitySeriesResponse,
+)
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -13,6 +15,45 @@ async def get_stats(current_user: User = Depends(require_role(RoleEnum.admin))):
     return await service.get_stats()
 
 
+@router.get("/activity-writer", response_model=ActivityWriterStats)
+async def get_activity_writer_stats(current_user: User = Depends(require_role(RoleEnum.admin))):
+    return service.get_activity_writer_stats()
+
+
+@router.get("/storage", response_model=StorageStats)
+async def get_storage_stats(current_user: User = Depends(require_role(RoleEnum.admin))):
+    return service.get_storage_stats()
+
+
+@router.get("/analytics/active-users", response_model=ActiveUsersResponse)
+async def get_active_users(current_user: User = Depends(require_role(RoleEnum.admin))):
+    return await service.get_active_users()
+
+
+@router.get("/analytics/signups", response_model=ActivitySeriesResponse)
+async def get_signups_per_day(
+    days: int = Query(30, ge=1, le=365),
+    current_user: User = Depends(require_role(RoleEnum.admin)),
+):
+    return await service.get_activity_series("register", "day", days)
+
+
+@router.get("/analytics/applications", response_model=ActivitySeriesResponse)
+async def get_applications_per_day(
+    days: int = Query(30, ge=1, le=365),
+    current_user: User = Depends(require_role(RoleEnum.admin)),
+):
+    return await service.get_activity_series("apply", "day", days)
+
+
+@router.get("/analytics/logins", response_model=ActivitySeriesResponse)
+async def get_logins_per_hour(
+    hours: int = Query(48, ge=1, le=24 * 14),
+    current_user: User = Depends(require_role(RoleEnum.admin)),
+):
+    return await service.get_activity_series("login", "hour", hours)
+
+
 @router.get("/users", response_model=list[UserResponse])
 async def get_all_users(
     skip: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100),
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel
 from src.users.models import RoleEnum
@@ -18,3 +19,44 @@ class StatsResponse(BaseModel):
     active_projects: int
     total_chat_messages: int = 0
     total_notifications: int = 0
+
+
+class ActivityWriterStats(BaseModel):
+    queued: int
+    written: int
+    dropped: int
+    failed: int
+
+
+class StorageOperationStats(BaseModel):
+    calls: int
+    errors: int
+    timeouts: int
+    avg_ms: float
+    max_ms: float
+
+
+class StorageStats(BaseModel):
+    backend: str
+    max_concurrency: int
+    in_flight: int
+    waiting: int
+    operations: dict[str, StorageOperationStats]
+
+
+class ActiveUsersResponse(BaseModel):
+    dau: int
+    wau: int
+    mau: int
+
+
+class SeriesPoint(BaseModel):
+    bucket: datetime
+    count: int
+    by_role: dict[str, int] = {}
+
+
+class ActivitySeriesResponse(BaseModel):
+    action: str
+    granularity: str
+    points: list[SeriesPoint]
@@ -1,7 +1,12 @@
+from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException
 from src.core.redis import cache_get, cache_set
+from src.core.activity import activity_writer, day_bucket, hour_bucket
+from src.core.storage import storage
 from src.admin import repository
-from src.admin.schemas import StatsResponse
+from src.admin.schemas import (
+    StatsResponse, ActivityWriterStats, StorageStats, ActiveUsersResponse, ActivitySeriesResponse, SeriesPoint,
+)
 from src.users.models import User
 from src.users.schemas import UserResponse
 
@@ -25,6 +30,50 @@ async def get_stats() -> StatsResponse:
     return stats
 
 
+def get_activity_writer_stats() -> ActivityWriterStats:
+    return ActivityWriterStats(**activity_writer.stats())
+
+
+def get_storage_stats() -> StorageStats:
+    return StorageStats(**storage.stats())
+
+
+async def get_active_users() -> ActiveUsersResponse:
+    cached = await cache_get("admin:active_users")
+    if cached:
+        return ActiveUsersResponse(**cached)
+
+    today = day_bucket(datetime.now(timezone.utc))
+    result = ActiveUsersResponse(
+        dau=await repository.count_active_users(today),
+        wau=await repository.count_active_users(today - timedelta(days=6)),
+        mau=await repository.count_active_users(today - timedelta(days=29)),
+    )
+    await cache_set("admin:active_users", result.model_dump(), ttl=60)
+    return result
+
+
+async def get_activity_series(action: str, granularity: str, periods: int) -> ActivitySeriesResponse:
+    """Per-bucket counts of one action from the rollups, oldest first, with empty buckets zero-filled."""
+    if granularity == "hour":
+        step, end = timedelta(hours=1), hour_bucket(datetime.now(timezone.utc))
+    else:
+        step, end = timedelta(days=1), day_bucket(datetime.now(timezone.utc))
+    start = end - step * (periods - 1)
+    points = {
+        (start + step * i).replace(tzinfo=None): SeriesPoint(bucket=start + step * i, count=0)
+        for i in range(periods)
+    }
+    for row in await repository.get_rollups(action, granularity, start):
+        point = points.get(row["bucket"].replace(tzinfo=None))
+        if point is None:
+            continue
+        point.count += row["count"]
+        role = row.get("role") or "unknown"
+        point.by_role[role] = point.by_role.get(role, 0) + row["count"]
+    return ActivitySeriesResponse(action=action, granularity=granularity, points=list(points.values()))
+
+
 async def get_all_users(skip: int, limit: int) -> list[User]:
     return await repository.get_all_users(skip, limit)
 
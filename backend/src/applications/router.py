@@ -5,6 +5,7 @@ from src.core.email import (
     send_submission_email, send_application_invite_email,
 )
 from src.notifications.service import create_notification
+from src.notifications.digest import wants_instant_email
 from src.users.models import User
 from src.applications.models import ApplicationStatus
 from src.applications import service
@@ -22,8 +23,16 @@ async def apply(data: ApplicationCreate, bg: BackgroundTasks,
 
     owner = await User.filter(id=project.owner_id).first()
     if owner:
-        bg.add_task(send_new_application_email, owner.email, owner.username,
-                    project.title, current_user.username)
+        await create_notification(
+            owner.id,
+            title=f"New application: {project.title}",
+            message=f"{current_user.username} applied to your project.",
+            notification_type="application",
+            link=f"/projects/{project.id}",
+        )
+        if wants_instant_email(owner):
+            bg.add_task(send_new_application_email, owner.email, owner.username,
+                        project.title, current_user.username)
     return application
 
 
@@ -41,8 +50,9 @@ async def invite_student(data: ApplicationInviteCreate, bg: BackgroundTasks,
         notification_type="invite",
         link="/my-applications",
     )
-    bg.add_task(send_application_invite_email, student.email, student.username,
-                project.title, company_name)
+    if wants_instant_email(student):
+        bg.add_task(send_application_invite_email, student.email, student.username,
+                    project.title, company_name)
     return application
 
 
@@ -65,16 +75,37 @@ async def update_status(app_id: int, data: ApplicationUpdateStatus, bg: Backgrou
     applicant = await User.filter(id=application.applicant_id).first()
     owner = await User.filter(id=project.owner_id).first()
 
+    invite_response = prev_status == ApplicationStatus.invited and was_initiator_company
+
+    # Everyone gets the in-app notification; email_frequency only decides whether
+    # it is also emailed now or left for the digest
     if applicant:
         if data.status in owner_statuses:
-            bg.add_task(send_application_status_email, applicant.email, applicant.username,
-                        project.title, data.status.value)
-        elif data.status == ApplicationStatus.submitted:
-            if owner:
+            # Invitation answers and withdrawals get their own notification below
+            if not invite_response:
+                await create_notification(
+                    applicant.id,
+                    title=f"Application {data.status.value}: {project.title}",
+                    message=f"Your application status changed to {data.status.value}.",
+                    notification_type="application",
+                    link="/my-applications",
+                )
+            if wants_instant_email(applicant):
+                bg.add_task(send_application_status_email, applicant.email, applicant.username,
+                            project.title, data.status.value)
+        elif data.status == ApplicationStatus.submitted and owner:
+            await create_notification(
+                owner.id,
+                title=f"Submission ready: {project.title}",
+                message=f"{applicant.username} submitted their work for review.",
+                notification_type="application",
+                link=f"/projects/{project.id}",
+            )
+            if wants_instant_email(owner):
                 bg.add_task(send_submission_email, owner.email, owner.username,
                             project.title, applicant.username)
 
-    if prev_status == ApplicationStatus.invited and was_initiator_company:
+    if invite_response:
         if data.status == ApplicationStatus.accepted and owner:
             await create_notification(
                 owner.id,
@@ -4,10 +4,12 @@ from fastapi import HTTPException
 from src.core.activity import log_activity
 from src.applications import repository
 from src.applications.models import Application, ApplicationStatus
+from src.projects.access import invalidate_project_access
 from src.projects.models import Project
 from src.users.models import User, RoleEnum, StudentProfile
 from src.teams import repository as teams_repo
 from src.teams.models import TeamRole
+from src.chat import service as chat_service
 
 
 VALID_TRANSITIONS = {
@@ -52,11 +54,12 @@ async def apply(user: User, project_id: int, cover_letter: str | None) -> tuple[
         raise HTTPException(status_code=400, detail="Project has reached maximum number of participants")
 
     application = await repository.create_application(project_id, user.id, cover_letter)
+    await invalidate_project_access(project_id)
     application.status_history = _append_history(application, "pending", user, None)
     await repository.save(application)
 
     await log_activity(user.id, "apply", f"Applied to project '{project.title}'",
-                       "application", application.id)
+                       "application", application.id, role=user.role.value)
 
     return application, project
 
@@ -114,6 +117,8 @@ async def update_status(app_id: int, new_status: ApplicationStatus, note: str |
                 project.id, application.applicant_id,
                 TeamRole.other, is_lead=not has_lead,
             )
+            await invalidate_project_access(project.id)
+            await chat_service.add_team_room_members(project.id, [application.applicant_id])
 
     if new_status == ApplicationStatus.completed:
         profile = await StudentProfile.filter(user_id=application.applicant_id).first()
@@ -122,7 +127,8 @@ async def update_status(app_id: int, new_status: ApplicationStatus, note: str |
             await profile.save(update_fields=["completed_projects_count"])
 
     await log_activity(user.id, "update_application_status",
-                       f"Changed status to {new_status.value}", "application", app_id)
+                       f"Changed status to {new_status.value}", "application", app_id,
+                       role=user.role.value)
 
     return application, project
 
@@ -168,11 +174,12 @@ async def invite_student(user: User, project_id: int, student_id: int,
         raise HTTPException(status_code=400, detail="Project has reached maximum number of participants")
 
     application = await repository.create_invite(project_id, student_id, message)
+    await invalidate_project_access(project_id)
     application.status_history = _append_history(application, "invited", user, None)
     await repository.save(application)
 
     await log_activity(user.id, "invite",
                        f"Invited {student.username} to '{project.title}'",
-                       "application", application.id)
+                       "application", application.id, role=user.role.value)
 
     return application, project, student
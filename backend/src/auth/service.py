@@ -18,7 +18,8 @@ class AuthService:
         user = await repository.create_user(
             data.email, data.username, data.password, data.full_name, data.role,
         )
-        await log_activity(user.id, "register", f"Registered as {data.role.value}", "user", user.id)
+        await log_activity(user.id, "register", f"Registered as {data.role.value}", "user", user.id,
+                           role=data.role.value)
         return user
 
     async def verify_email(self, user_id: int) -> User:
@@ -26,7 +27,8 @@ class AuthService:
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         await repository.activate_user(user)
-        await log_activity(user_id, "email_verified", entity_type="user", entity_id=user_id)
+        await log_activity(user_id, "email_verified", entity_type="user", entity_id=user_id,
+                           role=user.role.value)
         return user
 
     async def login(self, username: str, password: str) -> TokenResponse:
@@ -38,7 +40,7 @@ class AuthService:
         if user.is_blocked:
             raise HTTPException(status_code=403, detail="Account is blocked")
 
-        await log_activity(user.id, "login", entity_type="user", entity_id=user.id)
+        await log_activity(user.id, "login", entity_type="user", entity_id=user.id, role=user.role.value)
         token_data = {"sub": str(user.id), "role": user.role.value}
         return TokenResponse(
             access_token=create_access_token(token_data),
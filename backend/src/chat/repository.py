@@ -1,40 +1,77 @@
 from datetime import datetime, timezone
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from src.database.mongodb import get_mongodb
 
+ROOM_KIND_DM = "dm"
+ROOM_KIND_TEAM = "team"
+TEAM_ROOM_KEY = "team"
+
+# Fields needed to render the room list — skips anything stored for internal use.
+ROOM_LIST_PROJECTION = {
+    "project_id": 1, "project_title": 1, "participants": 1,
+    "last_message": 1, "last_message_at": 1, "created_at": 1,
+}
 
-async def find_room(project_id: int, participant_ids: list[int]) -> dict | None:
-    db = await get_mongodb()
-    return await db.chat_rooms.find_one({
-        "project_id": project_id,
-        "participants": {"$all": participant_ids},
-    })
 
+def room_key(participant_ids: list[int]) -> str:
+    """Canonical key for a participant set: sorted, de-duplicated ids."""
+    return ":".join(str(p) for p in sorted(set(participant_ids)))
 
-async def create_room(project_id: int, participant_ids: list[int],
-                      project_title: str) -> dict:
+
+async def get_or_create_room(project_id: int, kind: str, key: str,
+                             participant_ids: list[int], project_title: str) -> dict:
+    """Atomically fetch or create the room identified by (project_id, kind, key)."""
     db = await get_mongodb()
-    room = {
-        "project_id": project_id,
+    query = {"project_id": project_id, "kind": kind, "key": key}
+    update = {"$setOnInsert": {
         "project_title": project_title,
-        "participants": sorted(participant_ids),
+        "participants": sorted(set(participant_ids)),
         "last_message": None,
         "last_message_at": None,
         "created_at": datetime.now(timezone.utc),
-    }
-    result = await db.chat_rooms.insert_one(room)
-    room["_id"] = result.inserted_id
-    return room
+    }}
+    try:
+        return await db.chat_rooms.find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # A concurrent upsert inserted the room first — read the winner.
+        return await db.chat_rooms.find_one(query)
 
 
 async def get_room_by_id(room_id: str) -> dict | None:
+    if not ObjectId.is_valid(room_id):
+        return None
     db = await get_mongodb()
     return await db.chat_rooms.find_one({"_id": ObjectId(room_id)})
 
 
-async def get_rooms_for_user(user_id: int) -> list[dict]:
+async def get_rooms_for_user(user_id: int, limit: int,
+                             before_at: datetime | None = None,
+                             before_id: ObjectId | None = None) -> list[dict]:
+    """Keyset page of a user's rooms, newest activity first.
+
+    The cursor is the (last_message_at, _id) of the last room on the previous
+    page. Rooms without messages sort last, so a cursor with no timestamp means
+    the previous page already ended inside that tail.
+    """
     db = await get_mongodb()
-    cursor = db.chat_rooms.find({"participants": user_id}).sort("last_message_at", -1)
+    query: dict = {"participants": user_id}
+    if before_id is not None:
+        if before_at is None:
+            query["last_message_at"] = None
+            query["_id"] = {"$lt": before_id}
+        else:
+            query["$or"] = [
+                {"last_message_at": {"$lt": before_at}},
+                {"last_message_at": before_at, "_id": {"$lt": before_id}},
+                {"last_message_at": None},
+            ]
+    cursor = (db.chat_rooms.find(query, ROOM_LIST_PROJECTION)
+              .sort([("last_message_at", -1), ("_id", -1)])
+              .limit(limit))
     return [room async for room in cursor]
 
 
@@ -68,42 +105,27 @@ async def update_room_last_message(room_id: str, content: str,
     )
 
 
-async def find_team_room(project_id: int) -> dict | None:
-    db = await get_mongodb()
-    return await db.chat_rooms.find_one({
-        "project_id": project_id,
-        "is_team_chat": True,
-    })
+def _team_room_query(project_id: int) -> dict:
+    return {"project_id": project_id, "kind": ROOM_KIND_TEAM, "key": TEAM_ROOM_KEY}
 
 
-async def create_team_room(project_id: int, participant_ids: list[int],
-                           project_title: str) -> dict:
+async def get_team_room(project_id: int) -> dict | None:
     db = await get_mongodb()
-    room = {
-        "project_id": project_id,
-        "project_title": project_title,
-        "participants": sorted(participant_ids),
-        "is_team_chat": True,
-        "last_message": None,
-        "last_message_at": None,
-        "created_at": datetime.now(timezone.utc),
-    }
-    result = await db.chat_rooms.insert_one(room)
-    room["_id"] = result.inserted_id
-    return room
+    return await db.chat_rooms.find_one(_team_room_query(project_id))
 
 
-async def add_room_participant(room_id: str, user_id: int) -> None:
+async def add_team_room_participants(project_id: int, user_ids: list[int]) -> dict | None:
     db = await get_mongodb()
-    await db.chat_rooms.update_one(
-        {"_id": ObjectId(room_id)},
-        {"$addToSet": {"participants": user_id}},
+    return await db.chat_rooms.find_one_and_update(
+        _team_room_query(project_id),
+        {"$addToSet": {"participants": {"$each": sorted(set(user_ids))}}},
+        return_document=ReturnDocument.AFTER,
     )
 
 
-async def remove_room_participant(room_id: str, user_id: int) -> None:
+async def remove_team_room_participants(project_id: int, user_ids: list[int]) -> None:
     db = await get_mongodb()
     await db.chat_rooms.update_one(
-        {"_id": ObjectId(room_id)},
-        {"$pull": {"participants": user_id}},
+        _team_room_query(project_id),
+        {"$pull": {"participants": {"$in": list(user_ids)}}},
     )
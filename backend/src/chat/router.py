@@ -2,12 +2,14 @@ import json
 import asyncio
 import logging
 from datetime import datetime, timezone
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Query, BackgroundTasks
-from src.core.dependencies import get_current_user
-from src.core.security import decode_token
+from src.core.dependencies import get_current_user, authenticate_websocket
 from src.core.redis import get_redis
 from src.core.email import send_chat_notification_email
 from src.users.models import User
+from src.notifications.service import create_notifications_bulk
+from src.notifications.digest import wants_instant_email
 from src.chat import repository, service
 from src.chat.schemas import ChatRoomResponse, ChatMessageResponse, SendMessageRequest
 
@@ -59,8 +61,16 @@ async def get_or_create_team_room(project_id: int,
 
 
 @router.get("/rooms", response_model=list[ChatRoomResponse])
-async def get_my_rooms(current_user: User = Depends(get_current_user)):
-    return await service.get_my_rooms(current_user.id)
+async def get_my_rooms(limit: int = Query(50, ge=1, le=100),
+                       before: Optional[datetime] = Query(None, description="last_message_at of the last room on the previous page"),
+                       before_id: Optional[str] = Query(None, description="id of the last room on the previous page"),
+                       current_user: User = Depends(get_current_user)):
+    return await service.get_my_rooms(current_user.id, limit, before, before_id)
+
+
+@router.get("/rooms/{room_id}", response_model=ChatRoomResponse)
+async def get_room(room_id: str, current_user: User = Depends(get_current_user)):
+    return await service.get_room(room_id, current_user.id)
 
 
 @router.get("/rooms/{room_id}/messages", response_model=list[ChatMessageResponse])
@@ -77,12 +87,18 @@ async def send_message_rest(room_id: str, data: SendMessageRequest, bg: Backgrou
         room_id, current_user, data.content, manager.broadcast,
     )
 
-    for uid in ctx["other_ids"]:
-        other = await User.filter(id=uid).first()
-        if other:
+    sender_name = current_user.full_name or current_user.username
+    project_title = ctx["room"].get("project_title", "")
+    # Collapsed per room, so a busy conversation is one entry in the inbox and the digest
+    await create_notifications_bulk(
+        ctx["other_ids"], title=f"New messages: {project_title}",
+        message=f"{sender_name} sent you a message.",
+        notification_type="chat", link=f"/chat/{room_id}", group_key=f"chat:{room_id}",
+    )
+    for other in await User.filter(id__in=list(ctx["other_ids"])):
+        if wants_instant_email(other):
             bg.add_task(send_chat_notification_email, other.email, other.username,
-                        current_user.full_name or current_user.username,
-                        ctx["room"].get("project_title", ""))
+                        sender_name, project_title)
     return msg_response
 
 
@@ -95,24 +111,8 @@ async def websocket_chat(ws: WebSocket, room_id: str):
     Falls back to query param ?token= for backwards compatibility.
     """
     await ws.accept()
-
-    token = ws.query_params.get("token")
-    if not token:
-        try:
-            auth_msg = await asyncio.wait_for(ws.receive_json(), timeout=10.0)
-            if auth_msg.get("type") != "auth" or not auth_msg.get("token"):
-                await ws.close(code=4001, reason="First message must be {type: 'auth', token: '<jwt>'}")
-                return
-            token = auth_msg["token"]
-        except (asyncio.TimeoutError, Exception):
-            await ws.close(code=4001, reason="Authentication timeout")
-            return
-
-    try:
-        payload = decode_token(token)
-        user_id = int(payload["sub"])
-    except Exception:
-        await ws.close(code=4001, reason="Invalid token")
+    user_id = await authenticate_websocket(ws)
+    if user_id is None:
         return
 
     sender_user = await User.filter(id=user_id).only("id", "username", "full_name").first()
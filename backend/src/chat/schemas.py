@@ -8,6 +8,7 @@ class ChatRoomResponse(BaseModel):
     project_id: int
     project_title: str
     participants: list[int]
+    participant_names: dict[int, str] = {}
     last_message: Optional[str] = None
     last_message_at: Optional[datetime] = None
     created_at: datetime
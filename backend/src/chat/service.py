@@ -1,17 +1,23 @@
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
 from fastapi import HTTPException
 from src.chat import repository
 from src.chat.schemas import ChatRoomResponse, ChatMessageResponse
 from src.core.redis import publish_message
+from src.projects.access import project_access_or_404
 from src.projects.models import Project
 from src.users.models import User
 
 
-def _room_to_response(room: dict) -> ChatRoomResponse:
+def _room_to_response(room: dict, names: dict[int, str] | None = None) -> ChatRoomResponse:
+    names = names or {}
     return ChatRoomResponse(
         id=str(room["_id"]),
         project_id=room["project_id"],
         project_title=room.get("project_title", ""),
         participants=room["participants"],
+        participant_names={p: names[p] for p in room["participants"] if p in names},
         last_message=room.get("last_message"),
         last_message_at=room.get("last_message_at"),
         created_at=room["created_at"],
@@ -39,21 +45,49 @@ async def get_or_create_room(project_id: int, current_user_id: int,
         raise HTTPException(status_code=404, detail="User not found")
 
     participant_ids = [current_user_id, other_user_id]
-    room = await repository.find_room(project_id, participant_ids)
-    if not room:
-        room = await repository.create_room(project_id, participant_ids, project.title)
+    room = await repository.get_or_create_room(
+        project_id, repository.ROOM_KIND_DM, repository.room_key(participant_ids),
+        participant_ids, project.title,
+    )
     return _room_to_response(room)
 
 
-async def get_my_rooms(user_id: int) -> list[ChatRoomResponse]:
-    rooms = await repository.get_rooms_for_user(user_id)
-    return [_room_to_response(r) for r in rooms]
+async def _participant_names(user_ids: set[int]) -> dict[int, str]:
+    if not user_ids:
+        return {}
+    users = await User.filter(id__in=list(user_ids)).only("id", "username", "full_name")
+    return {u.id: (u.full_name or u.username) for u in users}
+
+
+async def get_my_rooms(user_id: int, limit: int, before: datetime | None,
+                       before_id: str | None) -> list[ChatRoomResponse]:
+    cursor_id = None
+    if before_id:
+        try:
+            cursor_id = ObjectId(before_id)
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    rooms = await repository.get_rooms_for_user(user_id, limit, before, cursor_id)
+    names = await _participant_names({p for r in rooms for p in r["participants"]})
+    return [_room_to_response(r, names) for r in rooms]
+
+
+async def get_room(room_id: str, user_id: int) -> ChatRoomResponse:
+    room = await repository.get_room_by_id(room_id)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    if user_id not in room["participants"]:
+        raise HTTPException(status_code=403, detail="Not a participant")
+    names = await _participant_names(set(room["participants"]))
+    return _room_to_response(room, names)
 
 
 async def get_messages(room_id: str, user_id: int, page: int,
                        size: int) -> list[ChatMessageResponse]:
     room = await repository.get_room_by_id(room_id)
-    if not room or user_id not in room["participants"]:
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    if user_id not in room["participants"]:
         raise HTTPException(status_code=403, detail="Not a participant")
 
     skip = (page - 1) * size
@@ -80,7 +114,9 @@ async def get_messages(room_id: str, user_id: int, page: int,
 
 async def send_message(room_id: str, user: User, content: str, broadcast_fn=None) -> tuple[ChatMessageResponse, dict]:
     room = await repository.get_room_by_id(room_id)
-    if not room or user.id not in room["participants"]:
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    if user.id not in room["participants"]:
         raise HTTPException(status_code=403, detail="Not a participant")
 
     sender_name = user.full_name or user.username
@@ -101,24 +137,37 @@ async def send_message(room_id: str, user: User, content: str, broadcast_fn=None
 
 
 async def get_or_create_team_room(project_id: int, user_id: int) -> ChatRoomResponse:
-    project = await Project.filter(id=project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    from src.teams import repository as teams_repo
-    members = await teams_repo.get_project_team(project_id)
-    member_ids = [m.user_id for m in members]
-
-    if user_id not in member_ids and project.owner_id != user_id:
+    # The roster is the authority (and is cached); the room's participant list
+    # only mirrors it, and rooms from before event-driven sync may still list
+    # users who have since left the team.
+    access = await project_access_or_404(project_id)
+    if not access.is_member(user_id) and access.owner_id != user_id:
         raise HTTPException(status_code=403, detail="Not a team member or project owner")
 
-    participant_ids = list(set(member_ids + [project.owner_id]))
-    room = await repository.find_team_room(project_id)
-    if not room:
-        room = await repository.create_team_room(project_id, participant_ids, project.title)
-    else:
-        for pid in participant_ids:
-            if pid not in room["participants"]:
-                await repository.add_room_participant(str(room["_id"]), pid)
-        room = await repository.get_room_by_id(str(room["_id"]))
+    roster = access.team | {access.owner_id}
+    room = await repository.get_team_room(project_id)
+    if room is None:
+        project = await Project.filter(id=project_id).only("id", "title").first()
+        room = await repository.get_or_create_room(
+            project_id, repository.ROOM_KIND_TEAM, repository.TEAM_ROOM_KEY,
+            list(roster), project.title,
+        )
+    listed = set(room["participants"])
+    if roster - listed:
+        room = await repository.add_team_room_participants(project_id, list(roster - listed))
+    if listed - roster:
+        await repository.remove_team_room_participants(project_id, list(listed - roster))
+        room = {**room, "participants": [p for p in room["participants"] if p in roster]}
     return _room_to_response(room)
+
+
+async def add_team_room_members(project_id: int, user_ids: list[int]) -> None:
+    """Called from team/application flows when users join a project team."""
+    if user_ids:
+        await repository.add_team_room_participants(project_id, user_ids)
+
+
+async def remove_team_room_members(project_id: int, user_ids: list[int]) -> None:
+    """Called from team flows when users leave a project team."""
+    if user_ids:
+        await repository.remove_team_room_participants(project_id, user_ids)
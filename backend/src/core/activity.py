@@ -1,28 +1,201 @@
-"""Activity logging — writes to MongoDB activity_logs collection."""
+"""Activity logging — buffered, batched writes to MongoDB activity_logs collection.
+
+`log_activity` only enqueues the event; a background flusher drains the queue
+with insert_many(ordered=False) whenever a batch fills up or the flush interval
+elapses. The queue is bounded: on overflow events are dropped (and counted) or,
+with ACTIVITY_LOG_OVERFLOW="block", the caller waits for room.
+
+Each flushed batch is also folded into `activity_rollups` (hourly and daily
+counts per action and role) and `activity_daily_users` (one doc per active user
+per day), so admin analytics never scan the raw, TTL-expired log. Events logged
+before the rollups existed are folded in once by scripts/backfill_activity_rollups.py.
+"""
+import asyncio
 import logging
 from datetime import datetime, timezone
 from typing import Optional
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from src.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+class ActivityLogWriter:
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float, overflow: str):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batch: list[dict] = []
+        self._inflight: Optional[asyncio.Future] = None
+
+    def start(self):
+        """Start the flusher on the running loop; called from the lifespan and lazily on submit."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._task = None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, doc: dict):
+        self.start()
+        if self.overflow == "block":
+            await self._queue.put(doc)
+            return
+        try:
+            self._queue.put_nowait(doc)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Activity log queue full — {self.dropped} event(s) dropped so far")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            batch, self._batch = self._batch, []
+            # Shielded so a shutdown mid-write doesn't lose or duplicate the batch;
+            # stop() waits for it through `_inflight`
+            self._inflight = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+    async def _flush(self, batch: list[dict]):
+        try:
+            from src.database.mongodb import get_mongodb
+            db = await get_mongodb()
+            await db.activity_logs.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except BulkWriteError as e:
+            # Unordered: everything but the rejected documents was stored, so roll those up
+            rejected = {err["index"] for err in e.details.get("writeErrors", [])}
+            self.failed += len(rejected)
+            self.written += len(batch) - len(rejected)
+            logger.warning(f"Failed to write {len(rejected)} of {len(batch)} activity log(s): {e}")
+            batch = [doc for i, doc in enumerate(batch) if i not in rejected]
+            if not batch:
+                return
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning(f"Failed to write {len(batch)} activity log(s): {e}")
+            return
+        try:
+            await rollup_activity(db, batch)
+        except Exception as e:
+            logger.warning(f"Failed to roll up {len(batch)} activity log(s): {e}")
+
+    async def stop(self):
+        """Stop the flusher and write out everything still queued (lifespan shutdown)."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight is not None:
+            # Finish the write in progress before the caller closes MongoDB
+            await self._inflight
+            self._inflight = None
+        if self._queue is None:
+            return
+        pending, self._batch = self._batch, []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for i in range(0, len(pending), self.batch_size):
+            await self._flush(pending[i:i + self.batch_size])
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+def hour_bucket(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def rollup_activity(db, batch: list[dict]):
+    """Fold a batch of raw events into the rollup collections (one bulk write each)."""
+    counts: dict[tuple, int] = {}
+    active: dict[tuple, Optional[str]] = {}
+    for doc in batch:
+        ts = doc["created_at"].astimezone(timezone.utc)
+        role = doc.get("role")
+        for granularity, bucket in (("hour", hour_bucket(ts)), ("day", day_bucket(ts))):
+            key = (granularity, bucket, doc["action"], role)
+            counts[key] = counts.get(key, 0) + 1
+        active[(day_bucket(ts), doc["user_id"])] = role
+
+    await db.activity_rollups.bulk_write([
+        UpdateOne(
+            {"_id": f"{granularity}:{bucket.isoformat()}:{action}:{role}"},
+            {"$inc": {"count": n},
+             "$setOnInsert": {"granularity": granularity, "bucket": bucket, "action": action, "role": role}},
+            upsert=True,
+        )
+        for (granularity, bucket, action, role), n in counts.items()
+    ], ordered=False)
+    await db.activity_daily_users.bulk_write([
+        UpdateOne(
+            {"_id": f"{day.date().isoformat()}:{user_id}"},
+            {"$setOnInsert": {"day": day, "user_id": user_id, "role": role}},
+            upsert=True,
+        )
+        for (day, user_id), role in active.items()
+    ], ordered=False)
+
+
+activity_writer = ActivityLogWriter(
+    max_size=settings.ACTIVITY_LOG_QUEUE_SIZE,
+    batch_size=settings.ACTIVITY_LOG_BATCH_SIZE,
+    flush_interval=settings.ACTIVITY_LOG_FLUSH_INTERVAL,
+    overflow=settings.ACTIVITY_LOG_OVERFLOW,
+)
+
+
 async def log_activity(
     user_id: int,
     action: str,
     details: Optional[str] = None,
     entity_type: Optional[str] = None,
     entity_id: Optional[int] = None,
+    role: Optional[str] = None,
 ):
-    """Log a user activity to MongoDB. Non-blocking — errors are logged, not raised."""
+    """Queue a user activity for MongoDB. Fire-and-forget — never raises."""
     try:
-        from src.database.mongodb import get_mongodb
-        db = await get_mongodb()
-        await db.activity_logs.insert_one({
+        await activity_writer.submit({
             "user_id": user_id,
             "action": action,
             "details": details,
             "entity_type": entity_type,
             "entity_id": entity_id,
+            "role": role,
             "created_at": datetime.now(timezone.utc),
         })
     except Exception as e:
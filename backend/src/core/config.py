@@ -18,6 +18,36 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://redis:6379/0"
     CACHE_TTL: int = 300  # 5 minutes
+    PROJECT_CARD_DESCRIPTION_LENGTH: int = 200  # view=card description snippet, in characters
+    PROJECT_COUNT_CACHE_TTL: int = 60  # list totals with count=cached; cleared on any project change
+    PROJECT_ACCESS_CACHE_TTL: int = 600  # rosters are invalidated on change; the TTL only bounds drift
+
+    # Project recommendations (in-memory index per worker)
+    RECOMMENDATION_CATEGORY_WEIGHT: float = 0.35  # credit for a missing skill in a category the user knows
+    RECOMMENDATION_URGENCY_WEIGHT: float = 0.5  # max boost for a deadline that is about to pass
+    RECOMMENDATION_URGENCY_DAYS: int = 14  # deadlines further out than this get no boost
+    RECOMMENDATION_REFRESH_INTERVAL: int = 600  # seconds between full rebuilds; 0 disables
+    RECOMMENDATION_OVERFETCH: int = 2  # candidates per requested slot, so stale index entries don't short a page
+
+    # Unread notification counters (rebuilt from MongoDB when missing)
+    UNREAD_COUNTER_TTL: int = 7 * 24 * 3600
+    UNREAD_RECONCILE_INTERVAL: int = 300  # seconds between drift-repair sweeps; 0 disables
+    UNREAD_RECONCILE_BATCH: int = 200  # counters checked per sweep
+
+    # Notification retention
+    NOTIFICATION_READ_RETENTION_DAYS: int = 30  # read notifications expire this long after being read; unread never do
+    NOTIFICATION_MAX_PER_USER: int = 500  # older notifications beyond this are trimmed
+    NOTIFICATION_TRIM_INTERVAL: int = 3600  # seconds between inbox trims for the same user
+    NOTIFICATION_GROUP_WINDOW: int = 3600  # grouped events within this many seconds collapse
+
+    # Activity log buffering
+    ACTIVITY_LOG_QUEUE_SIZE: int = 10000  # buffered activity events before overflow policy applies
+    ACTIVITY_LOG_BATCH_SIZE: int = 500
+    ACTIVITY_LOG_FLUSH_INTERVAL: float = 1.0  # seconds; max age of a partial batch
+    ACTIVITY_LOG_OVERFLOW: str = "drop"  # "drop" (count and discard) or "block" (caller waits)
+    ACTIVITY_LOG_RETENTION_DAYS: int = 90  # raw events; rollups outlive them
+    ACTIVITY_HOURLY_ROLLUP_RETENTION_DAYS: int = 90  # daily rollups are kept indefinitely
+    ACTIVITY_DAILY_USERS_RETENTION_DAYS: int = 400
 
     # JWT — no default: must be set via environment or .env
     SECRET_KEY: str
@@ -34,6 +64,25 @@ class Settings(BaseSettings):
     MINIO_BUCKET_PROJECTS: str = "project-files"
     MINIO_BUCKET_SUBMISSIONS: str = "submissions"
     MINIO_BUCKET_RESUMES: str = "resumes"
+    MINIO_PART_SIZE: int = 8 * 1024 * 1024  # multipart chunk for streamed uploads (S3 minimum is 5MB)
+    MINIO_REGION: str = "us-east-1"
+    # Object storage adapter (src/core/storage.py): "minio", "local" (STORAGE_LOCAL_ROOT) or "memory"
+    STORAGE_BACKEND: str = "minio"
+    STORAGE_LOCAL_ROOT: str = "./storage-data"
+    STORAGE_THREADS: int = 16  # dedicated pool for blocking storage calls
+    STORAGE_MAX_CONCURRENCY: int = 16  # storage calls in flight at once; others wait for a slot
+    STORAGE_OP_TIMEOUT: float = 10.0  # stat/remove/open, and the wait for a free slot
+    STORAGE_IO_TIMEOUT: float = 60.0  # per chunk read, or per part accepted during an upload
+    # Host browsers reach MinIO at (e.g. files.nexus-hub.asia); presigned URLs are signed for it.
+    # Empty means MINIO_ENDPOINT/MINIO_SECURE.
+    MINIO_PUBLIC_ENDPOINT: str = ""
+    MINIO_PUBLIC_SECURE: bool = True
+    # "proxy": file bytes pass through the API. "presigned": downloads redirect to a
+    # short-lived MinIO URL and uploads may go straight to MinIO (upload-url + finalize).
+    FILE_TRANSFER_MODE: str = "proxy"
+    PRESIGNED_URL_EXPIRY: int = 300  # seconds
+    # Signed export.zip links, opened by the browser as a plain navigation
+    EXPORT_LINK_EXPIRY: int = 60  # seconds
 
     # Email (Gmail SMTP)
     SMTP_HOST: str = "smtp.gmail.com"
@@ -43,12 +92,44 @@ class Settings(BaseSettings):
     EMAIL_FROM: str = "noreply@nexushub.com"
     EMAIL_FROM_NAME: str = "NexusHub"
     EMAIL_VERIFICATION_REQUIRED: bool = True
+    SMTP_STARTTLS: bool = True
+    SMTP_AUTH: bool = True  # False for the local aiosmtpd stand-in (scripts/dev_smtp_server.py)
+    SMTP_TIMEOUT: int = 30
+    SMTP_POOL_SIZE: int = 3  # authenticated sessions kept open by the outbox worker
+    SMTP_IDLE_TIMEOUT: int = 60  # sessions idle longer than this are reopened before use
+
+    # Email outbox (Redis) — drained by the worker started in the app lifespan
+    EMAIL_OUTBOX_BATCH: int = 20
+    EMAIL_OUTBOX_POLL_INTERVAL: float = 1.0
+    EMAIL_OUTBOX_LEASE: int = 120  # seconds before an unacknowledged claim is retried
+    EMAIL_MAX_ATTEMPTS: int = 6
+    EMAIL_RETRY_BASE_DELAY: int = 30  # doubles per attempt, capped at one hour
+    EMAIL_DEDUPE_WINDOW: int = 600  # identical messages to the same recipient are dropped
+    EMAIL_RATE_PER_RECIPIENT_HOUR: int = 20  # over the limit, sends are deferred
+    EMAIL_DIGEST_CHECK_INTERVAL: int = 60  # seconds between checks for a due hourly/daily digest
+    EMAIL_DIGEST_MAX_ITEMS: int = 20  # notifications listed per digest (the total is always shown)
+    EMAIL_DIGEST_USER_BATCH: int = 500  # subscribers aggregated per Mongo query
 
     # CORS
     ALLOWED_ORIGINS: list[str] = ["http://localhost:3000", "http://localhost:8080"]
 
     # File limits
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
+    # Resumable upload sessions: one multipart part per request, so the limit can exceed MAX_FILE_SIZE
+    MAX_RESUMABLE_FILE_SIZE: int = 500 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024  # S3 requires every part but the last to be >= 5MB
+    UPLOAD_SESSION_TTL: int = 24 * 3600
+    UPLOAD_SESSION_SWEEP_INTERVAL: int = 600
+
+    # Thumbnails / previews (src/files/previews.py), rendered in a process pool
+    PREVIEWS_ENABLED: bool = True
+    PREVIEW_WORKERS: int = 2
+    PREVIEW_QUEUE_SIZE: int = 1000
+    PREVIEW_TIMEOUT: float = 60.0  # per file
+    PREVIEW_SWEEP_INTERVAL: int = 300  # seconds between re-queues of files left pending
+    THUMBNAIL_SIZE: int = 320  # longest side, px
+    PDF_PREVIEW_SIZE: int = 1024
+    PREVIEW_QUALITY: int = 80
 
     class Config:
         env_file = ".env"
@@ -1,4 +1,5 @@
-from fastapi import Depends, HTTPException, status
+import asyncio
+from fastapi import Depends, HTTPException, WebSocket, status
 from fastapi.security import OAuth2PasswordBearer
 from src.core.config import settings
 from src.core.security import decode_token
@@ -35,3 +36,29 @@ def require_role(*roles):
             )
         return current_user
     return checker
+
+
+async def authenticate_websocket(ws: WebSocket) -> int | None:
+    """Resolve the user id for an accepted WebSocket, or close it and return None.
+
+    Authentication: send {"type": "auth", "token": "<jwt>"} as the first message.
+    Falls back to query param ?token= for backwards compatibility.
+    """
+    token = ws.query_params.get("token")
+    if not token:
+        try:
+            auth_msg = await asyncio.wait_for(ws.receive_json(), timeout=10.0)
+            if auth_msg.get("type") != "auth" or not auth_msg.get("token"):
+                await ws.close(code=4001, reason="First message must be {type: 'auth', token: '<jwt>'}")
+                return None
+            token = auth_msg["token"]
+        except (asyncio.TimeoutError, Exception):
+            await ws.close(code=4001, reason="Authentication timeout")
+            return None
+
+    try:
+        payload = decode_token(token)
+        return int(payload["sub"])
+    except Exception:
+        await ws.close(code=4001, reason="Invalid token")
+        return None
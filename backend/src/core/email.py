@@ -1,38 +1,52 @@
+import hashlib
+import html
 import logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from aiosmtplib import SMTP as AioSMTP
+import time
+import uuid
+from string import Template
+from typing import Optional
 from src.core.config import settings
+from src.core.outbox import outbox_push
+from src.core.redis import acquire_flags, cache_delete
 
 logger = logging.getLogger(__name__)
 
 
-async def _send_smtp(to_email: str, subject: str, html_body: str):
-    """Async SMTP send — called from BackgroundTasks."""
-    if not settings.SMTP_USER or not settings.SMTP_PASSWORD:
+async def enqueue_email(to_email: str, subject: str, html_body: str, dedupe_key: Optional[str] = None):
+    """Put an email on the Redis outbox; the worker in src.core.mailer sends it.
+
+    The same message (or the same `dedupe_key`) to the same recipient within
+    EMAIL_DEDUPE_WINDOW is sent only once.
+    """
+    if settings.SMTP_AUTH and (not settings.SMTP_USER or not settings.SMTP_PASSWORD):
         logger.warning(f"SMTP not configured. Would send to {to_email}: {subject}")
         return
 
-    msg = MIMEMultipart("alternative")
-    msg["From"] = f"{settings.EMAIL_FROM_NAME} <{settings.EMAIL_FROM}>"
-    msg["To"] = to_email
-    msg["Subject"] = subject
-    msg.attach(MIMEText(html_body, "html"))
-
+    fingerprint = hashlib.sha1(f"{to_email}\0{dedupe_key or subject + html_body}".encode()).hexdigest()
+    flag = f"email:dedupe:{fingerprint}"
     try:
-        smtp = AioSMTP(hostname=settings.SMTP_HOST, port=settings.SMTP_PORT, start_tls=True)
-        async with smtp:
-            await smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            await smtp.sendmail(settings.EMAIL_FROM, to_email, msg.as_string())
-        logger.info(f"Email sent to {to_email}: {subject}")
+        [fresh] = await acquire_flags([flag], settings.EMAIL_DEDUPE_WINDOW)
+        if not fresh:
+            logger.info(f"Duplicate email to {to_email} suppressed: {subject}")
+            return
+        payload = {"to": to_email, "subject": subject, "html": html_body, "attempts": 0}
+        try:
+            await outbox_push([(uuid.uuid4().hex, payload)], time.time())
+        except Exception:
+            # Nothing was queued: let a retry through instead of suppressing it for the window
+            await cache_delete(flag)
+            raise
     except Exception as e:
-        logger.error(f"Email send failed to {to_email}: {e}")
+        logger.error(f"Email enqueue failed for {to_email}: {e}")
 
 
 # ── Email Templates ──────────────────────────────────
+# Compiled once at import; `_render` HTML-escapes every substituted value.
+
+_BUTTON_STYLE = ("display:inline-block;padding:12px 24px;background:#e8a838;color:#0c0c0e;"
+                 "border-radius:8px;text-decoration:none;font-weight:bold")
 
-def _base_template(title: str, content: str) -> str:
-    return f"""
+_BASE = """
     <div style="font-family:'Segoe UI',sans-serif;max-width:600px;margin:0 auto;background:#0c0c0e;color:#f0ede8;padding:32px;border-radius:16px">
       <div style="text-align:center;margin-bottom:24px">
         <span style="display:inline-block;padding:8px 16px;background:#e8a838;color:#0c0c0e;border-radius:8px;font-weight:bold;font-size:18px">NexusHub</span>
@@ -45,88 +59,135 @@ def _base_template(title: str, content: str) -> str:
     """
 
 
+def _compile(title: str, content: str) -> Template:
+    return Template(_BASE.format(title=title, content=content))
+
+
+def _render(template: Template, **values) -> str:
+    return template.substitute({k: html.escape(str(v)) for k, v in values.items()})
+
+
+_VERIFICATION = _compile(
+    "Verify Your Email",
+    "<p>Hi <strong>$username</strong>,</p>"
+    "<p>Please verify your email address to activate your account:</p>"
+    f'<p><a href="$verify_url" style="{_BUTTON_STYLE}">Verify Email →</a></p>'
+    "<p>This link expires in 24 hours.</p>",
+)
+_WELCOME = _compile(
+    "Welcome to NexusHub!",
+    "<p>Hi <strong>$username</strong>,</p>"
+    "<p>Your account has been created successfully. Start exploring projects and building your portfolio!</p>"
+    '<p><a href="http://localhost:3000/dashboard" style="color:#e8a838">Go to Dashboard →</a></p>',
+)
+_APPLICATION_STATUS = _compile(
+    "Application Status Updated",
+    "<p>Hi <strong>$username</strong>,</p>"
+    '<p>Your application for <strong>"$project_title"</strong> has been updated:</p>'
+    '<p style="font-size:18px;color:$color;font-weight:bold">$status</p>',
+)
+_NEW_APPLICATION = _compile(
+    "New Application Received",
+    "<p>Hi <strong>$owner_name</strong>,</p>"
+    '<p><strong>$applicant_name</strong> has applied to your project <strong>"$project_title"</strong>.</p>'
+    '<p><a href="http://localhost:3000/dashboard" style="color:#e8a838">Review Application →</a></p>',
+)
+_CHAT = _compile(
+    "New Unread Message",
+    "<p>Hi <strong>$username</strong>,</p>"
+    "<p>You have an unread message from <strong>$sender_name</strong> "
+    'regarding project <strong>"$project_title"</strong>.</p>'
+    '<p><a href="http://localhost:3000/dashboard" style="color:#e8a838">Open Chat →</a></p>',
+)
+_SUBMISSION = _compile(
+    "Work Submitted for Review",
+    "<p>Hi <strong>$owner_name</strong>,</p>"
+    '<p><strong>$student_name</strong> has submitted their work for project <strong>"$project_title"</strong>.</p>'
+    "<p>Please review and approve or request revisions.</p>",
+)
+_REVIEW = _compile(
+    "New Review Received",
+    "<p>Hi <strong>$username</strong>,</p>"
+    "<p><strong>$reviewer_name</strong> left you a review:</p>"
+    '<p style="font-size:24px;color:#e8a838">$stars ($rating/5)</p>',
+)
+_INVITE = _compile(
+    "You've been invited to a project",
+    "<p>Hi <strong>$username</strong>,</p>"
+    '<p><strong>$company_name</strong> has invited you to join <strong>"$project_title"</strong>.</p>'
+    '<p><a href="http://localhost:3000/my-applications" style="color:#e8a838">Review Invitation →</a></p>',
+)
+_DIGEST = _compile(
+    "$heading",
+    "<p>Hi <strong>$username</strong>,</p>"
+    "<p>$summary</p>"
+    '<ul style="padding-left:18px">$items</ul>'
+    '<p><a href="http://localhost:3000/notifications" style="color:#e8a838">See all notifications →</a></p>',
+)
+_DIGEST_ITEM = Template('<li style="margin-bottom:8px"><strong>$title</strong>$times<br>$message</li>')
+
+
 async def send_verification_email(to_email: str, username: str, token: str):
     verify_url = f"http://localhost:3000/verify-email?token={token}"
-    html = _base_template(
-        "Verify Your Email",
-        f"<p>Hi <strong>{username}</strong>,</p>"
-        "<p>Please verify your email address to activate your account:</p>"
-        f'<p><a href="{verify_url}" style="display:inline-block;padding:12px 24px;background:#e8a838;color:#0c0c0e;border-radius:8px;text-decoration:none;font-weight:bold">Verify Email →</a></p>'
-        "<p>This link expires in 24 hours.</p>"
-    )
-    await _send_smtp(to_email, "Verify your NexusHub email", html)
+    html_body = _render(_VERIFICATION, username=username, verify_url=verify_url)
+    await enqueue_email(to_email, "Verify your NexusHub email", html_body)
 
 
 async def send_welcome_email(to_email: str, username: str):
-    html = _base_template(
-        "Welcome to NexusHub!",
-        f"<p>Hi <strong>{username}</strong>,</p>"
-        "<p>Your account has been created successfully. Start exploring projects and building your portfolio!</p>"
-        '<p><a href="http://localhost:3000/dashboard" style="color:#e8a838">Go to Dashboard →</a></p>'
-    )
-    await _send_smtp(to_email, "Welcome to NexusHub!", html)
+    await enqueue_email(to_email, "Welcome to NexusHub!", _render(_WELCOME, username=username))
 
 
 async def send_application_status_email(to_email: str, username: str, project_title: str, status: str):
     color_map = {"accepted": "#4ade80", "rejected": "#f87171", "completed": "#60a5fa"}
-    color = color_map.get(status, "#e8a838")
-    html = _base_template(
-        "Application Status Updated",
-        f"<p>Hi <strong>{username}</strong>,</p>"
-        f'<p>Your application for <strong>"{project_title}"</strong> has been updated:</p>'
-        f'<p style="font-size:18px;color:{color};font-weight:bold">{status.upper()}</p>'
-    )
-    await _send_smtp(to_email, f"Application {status}: {project_title}", html)
+    html_body = _render(_APPLICATION_STATUS, username=username, project_title=project_title,
+                        color=color_map.get(status, "#e8a838"), status=status.upper())
+    await enqueue_email(to_email, f"Application {status}: {project_title}", html_body)
 
 
 async def send_new_application_email(to_email: str, owner_name: str, project_title: str, applicant_name: str):
-    html = _base_template(
-        "New Application Received",
-        f"<p>Hi <strong>{owner_name}</strong>,</p>"
-        f'<p><strong>{applicant_name}</strong> has applied to your project <strong>"{project_title}"</strong>.</p>'
-        '<p><a href="http://localhost:3000/dashboard" style="color:#e8a838">Review Application →</a></p>'
-    )
-    await _send_smtp(to_email, f"New application: {project_title}", html)
+    html_body = _render(_NEW_APPLICATION, owner_name=owner_name, project_title=project_title,
+                        applicant_name=applicant_name)
+    await enqueue_email(to_email, f"New application: {project_title}", html_body)
 
 
 async def send_chat_notification_email(to_email: str, username: str, sender_name: str, project_title: str):
-    html = _base_template(
-        "New Unread Message",
-        f"<p>Hi <strong>{username}</strong>,</p>"
-        f'<p>You have an unread message from <strong>{sender_name}</strong> '
-        f'regarding project <strong>"{project_title}"</strong>.</p>'
-        '<p><a href="http://localhost:3000/dashboard" style="color:#e8a838">Open Chat →</a></p>'
-    )
-    await _send_smtp(to_email, f"New message from {sender_name}", html)
+    html_body = _render(_CHAT, username=username, sender_name=sender_name, project_title=project_title)
+    await enqueue_email(to_email, f"New message from {sender_name}", html_body)
 
 
 async def send_submission_email(to_email: str, owner_name: str, project_title: str, student_name: str):
-    html = _base_template(
-        "Work Submitted for Review",
-        f"<p>Hi <strong>{owner_name}</strong>,</p>"
-        f'<p><strong>{student_name}</strong> has submitted their work for project <strong>"{project_title}"</strong>.</p>'
-        "<p>Please review and approve or request revisions.</p>"
-    )
-    await _send_smtp(to_email, f"Submission ready: {project_title}", html)
+    html_body = _render(_SUBMISSION, owner_name=owner_name, project_title=project_title,
+                        student_name=student_name)
+    await enqueue_email(to_email, f"Submission ready: {project_title}", html_body)
 
 
 async def send_review_email(to_email: str, username: str, reviewer_name: str, rating: float):
     stars = "★" * int(rating) + "☆" * (5 - int(rating))
-    html = _base_template(
-        "New Review Received",
-        f"<p>Hi <strong>{username}</strong>,</p>"
-        f"<p><strong>{reviewer_name}</strong> left you a review:</p>"
-        f'<p style="font-size:24px;color:#e8a838">{stars} ({rating}/5)</p>'
-    )
-    await _send_smtp(to_email, f"New review from {reviewer_name}", html)
+    html_body = _render(_REVIEW, username=username, reviewer_name=reviewer_name, stars=stars, rating=rating)
+    await enqueue_email(to_email, f"New review from {reviewer_name}", html_body)
 
 
 async def send_application_invite_email(to_email: str, username: str,
                                         project_title: str, company_name: str):
-    html = _base_template(
-        "You've been invited to a project",
-        f"<p>Hi <strong>{username}</strong>,</p>"
-        f'<p><strong>{company_name}</strong> has invited you to join <strong>"{project_title}"</strong>.</p>'
-        '<p><a href="http://localhost:3000/my-applications" style="color:#e8a838">Review Invitation →</a></p>'
+    html_body = _render(_INVITE, username=username, project_title=project_title, company_name=company_name)
+    await enqueue_email(to_email, f"Invitation: {project_title}", html_body)
+
+
+async def send_digest_email(to_email: str, username: str, frequency: str, total: int, items: list[dict],
+                            period_key: str):
+    """One email summarising a user's unread notifications for the past hour or day."""
+    period = "hour" if frequency == "hourly" else "day"
+    rendered = "".join(
+        _render(_DIGEST_ITEM, title=item["title"], message=item["message"],
+                times=f" ×{item['count']}" if (item.get("count") or 1) > 1 else "")
+        for item in items
+    )
+    summary = f"You have {total} new notification{'s' if total != 1 else ''} from the past {period}."
+    if total > len(items):
+        summary += f" Here are the latest {len(items)}."
+    html_body = _DIGEST.substitute(
+        heading=f"Your {frequency} digest", username=html.escape(username),
+        summary=html.escape(summary), items=rendered,
     )
-    await _send_smtp(to_email, f"Invitation: {project_title}", html)
+    await enqueue_email(to_email, f"NexusHub {frequency} digest: {total} new", html_body,
+                        dedupe_key=f"digest:{frequency}:{period_key}")
@@ -0,0 +1,152 @@
+"""Outbox worker — drains the Redis email outbox over a small pool of SMTP sessions.
+
+Sessions are opened (STARTTLS + login) once and reused across messages; one that
+has been idle longer than SMTP_IDLE_TIMEOUT is reopened, since servers drop
+quiet connections. Failed sends are retried with exponential backoff, permanent
+(5xx) rejections and messages out of attempts go to the dead-letter list.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Optional
+from aiosmtplib import SMTP as AioSMTP, SMTPRecipientsRefused, SMTPResponseException
+from src.core.config import settings
+from src.core.outbox import outbox_push, outbox_claim, outbox_ack, outbox_dead_letter
+from src.core.redis import rate_limit_check
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPPool:
+    def __init__(self, size: int):
+        self.size = size
+        self._slots: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _queue(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Queue()
+            for _ in range(self.size):
+                self._slots.put_nowait((None, 0.0))
+        return self._slots
+
+    async def _open(self) -> AioSMTP:
+        smtp = AioSMTP(
+            hostname=settings.SMTP_HOST, port=settings.SMTP_PORT,
+            start_tls=settings.SMTP_STARTTLS, timeout=settings.SMTP_TIMEOUT,
+        )
+        await smtp.connect()
+        if settings.SMTP_AUTH:
+            await smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        return smtp
+
+    @asynccontextmanager
+    async def session(self):
+        """Borrow an authenticated session; it goes back to the pool unless it broke."""
+        slots = self._queue()
+        smtp, last_used = await slots.get()
+        try:
+            if smtp is not None and (not smtp.is_connected
+                                     or time.monotonic() - last_used > settings.SMTP_IDLE_TIMEOUT):
+                smtp.close()
+                smtp = None
+            if smtp is None:
+                smtp = await self._open()
+            yield smtp
+        except (SMTPResponseException, SMTPRecipientsRefused):
+            # The server answered (and the envelope was reset), so the session is still usable
+            raise
+        except BaseException:
+            if smtp is not None:
+                smtp.close()
+                smtp = None
+            raise
+        finally:
+            slots.put_nowait((smtp, time.monotonic()))
+
+    async def send(self, to_email: str, message: str):
+        async with self.session() as smtp:
+            await smtp.sendmail(settings.EMAIL_FROM, [to_email], message)
+
+    async def close(self):
+        if self._slots is None:
+            return
+        while not self._slots.empty():
+            smtp, _ = self._slots.get_nowait()
+            if smtp is not None:
+                try:
+                    await smtp.quit()
+                except Exception:
+                    smtp.close()
+        self._slots = None
+        self._loop = None
+
+
+smtp_pool = SMTPPool(settings.SMTP_POOL_SIZE)
+
+
+def build_message(payload: dict) -> str:
+    msg = MIMEMultipart("alternative")
+    msg["From"] = f"{settings.EMAIL_FROM_NAME} <{settings.EMAIL_FROM}>"
+    msg["To"] = payload["to"]
+    msg["Subject"] = payload["subject"]
+    msg.attach(MIMEText(payload["html"], "html"))
+    return msg.as_string()
+
+
+def _is_permanent(e: Exception) -> bool:
+    if isinstance(e, SMTPRecipientsRefused):
+        return all(r.code >= 500 for r in e.recipients)
+    return isinstance(e, SMTPResponseException) and e.code >= 500
+
+
+def retry_delay(attempts: int) -> int:
+    return min(settings.EMAIL_RETRY_BASE_DELAY * 2 ** (attempts - 1), 3600)
+
+
+async def _deliver(msg_id: str, payload: dict) -> bool:
+    """Send one claimed message; returns True when it can be acknowledged."""
+    to_email = payload["to"]
+    if not await rate_limit_check(f"email:rate:{to_email}", settings.EMAIL_RATE_PER_RECIPIENT_HOUR, 3600):
+        await outbox_push([(msg_id, payload)], time.time() + 600)
+        return False
+    try:
+        await smtp_pool.send(to_email, build_message(payload))
+        logger.info(f"Email sent to {to_email}: {payload['subject']}")
+        return True
+    except Exception as e:
+        payload["attempts"] = payload.get("attempts", 0) + 1
+        payload["last_error"] = str(e)
+        if _is_permanent(e) or payload["attempts"] >= settings.EMAIL_MAX_ATTEMPTS:
+            logger.error(f"Email to {to_email} failed permanently: {e}")
+            await outbox_dead_letter(msg_id, payload)
+        else:
+            logger.warning(f"Email to {to_email} failed (attempt {payload['attempts']}): {e}")
+            await outbox_push([(msg_id, payload)], time.time() + retry_delay(payload["attempts"]))
+        return False
+
+
+async def deliver_batch(messages: list[tuple[str, dict]]):
+    """Send a claimed batch concurrently (bounded by the pool) and ack the successes."""
+    results = await asyncio.gather(*(_deliver(msg_id, payload) for msg_id, payload in messages))
+    await outbox_ack([msg_id for (msg_id, _), ok in zip(messages, results) if ok])
+
+
+async def run_email_worker():
+    """Background loop started from the app lifespan."""
+    while True:
+        try:
+            batch = await outbox_claim(time.time(), settings.EMAIL_OUTBOX_LEASE, settings.EMAIL_OUTBOX_BATCH)
+            if batch:
+                await deliver_batch(batch)
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Email outbox worker error: {e}")
+        await asyncio.sleep(settings.EMAIL_OUTBOX_POLL_INTERVAL)
@@ -1,18 +1,13 @@
-import io
-import uuid
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
 from minio import Minio
+from minio.datatypes import Part, PostPolicy
 from minio.error import S3Error
 from src.core.config import settings
+from src.core.storage import StorageBackend, ObjectStat, ObjectNotFound, attachment_disposition
 
 _client: Optional[Minio] = None
-
-BUCKETS = [
-    settings.MINIO_BUCKET_AVATARS,
-    settings.MINIO_BUCKET_PROJECTS,
-    settings.MINIO_BUCKET_SUBMISSIONS,
-    settings.MINIO_BUCKET_RESUMES,
-]
+_public_client: Optional[Minio] = None
 
 
 def get_minio() -> Minio:
@@ -27,59 +22,126 @@ def get_minio() -> Minio:
     return _client
 
 
-def init_minio():
-    """Create buckets if they don't exist."""
-    client = get_minio()
-    for bucket in BUCKETS:
+def get_public_minio() -> Minio:
+    """Client that only signs URLs for browsers (MINIO_PUBLIC_ENDPOINT); it never calls MinIO itself."""
+    global _public_client
+    if _public_client is None:
+        public = bool(settings.MINIO_PUBLIC_ENDPOINT)
+        _public_client = Minio(
+            settings.MINIO_PUBLIC_ENDPOINT if public else settings.MINIO_ENDPOINT,
+            access_key=settings.MINIO_ACCESS_KEY,
+            secret_key=settings.MINIO_SECRET_KEY,
+            secure=settings.MINIO_PUBLIC_SECURE if public else settings.MINIO_SECURE,
+            region=settings.MINIO_REGION,
+        )
+    return _public_client
+
+
+_NOT_FOUND = {"NoSuchKey", "NoSuchBucket", "NoSuchObject", "ResourceNotFound"}
+
+
+class MinioBackend(StorageBackend):
+    """The blocking MinIO SDK behind `src.core.storage`."""
+    name = "minio"
+
+    def ensure_bucket(self, bucket: str) -> None:
+        client = get_minio()
+        if not client.bucket_exists(bucket):
+            client.make_bucket(bucket)
+
+    def put(self, bucket, object_name, reader, content_type):
+        # Unknown length: the SDK reads MINIO_PART_SIZE at a time into a multipart upload
+        get_minio().put_object(
+            bucket, object_name, reader, length=-1, content_type=content_type,
+            part_size=settings.MINIO_PART_SIZE, num_parallel_uploads=1,
+        )
+
+    def stat(self, bucket, object_name):
         try:
-            if not client.bucket_exists(bucket):
-                client.make_bucket(bucket)
+            st = get_minio().stat_object(bucket, object_name)
         except S3Error as e:
-            print(f"MinIO bucket init error ({bucket}): {e}")
-
-
-def upload_file(
-    bucket: str,
-    file_data: bytes,
-    original_filename: str,
-    content_type: str = "application/octet-stream",
-) -> str:
-    """Upload file, return unique object name."""
-    client = get_minio()
-    ext = original_filename.rsplit(".", 1)[-1] if "." in original_filename else ""
-    object_name = f"{uuid.uuid4().hex}.{ext}" if ext else uuid.uuid4().hex
-
-    client.put_object(
-        bucket,
-        object_name,
-        io.BytesIO(file_data),
-        length=len(file_data),
-        content_type=content_type,
-    )
-    return object_name
+            if e.code in _NOT_FOUND:
+                raise ObjectNotFound(f"{bucket}/{object_name}")
+            raise
+        return ObjectStat(size=st.size, etag=st.etag, content_type=getattr(st, "content_type", None))
 
+    def open(self, bucket, object_name, offset, length, chunk_size):
+        try:
+            response = get_minio().get_object(bucket, object_name, offset, length)
+        except S3Error as e:
+            if e.code in _NOT_FOUND:
+                raise ObjectNotFound(f"{bucket}/{object_name}")
+            raise
+        return self._read(response, chunk_size)
 
-def get_file_url(bucket: str, object_name: str, expires_hours: int = 1) -> str:
-    """Get presigned URL for file download."""
-    from datetime import timedelta
-    client = get_minio()
-    return client.presigned_get_object(bucket, object_name, expires=timedelta(hours=expires_hours))
+    @staticmethod
+    def _read(response, chunk_size: int) -> Iterator[bytes]:
+        try:
+            yield from response.stream(chunk_size)
+        finally:
+            response.close()
+            response.release_conn()
+
+    def remove(self, bucket, object_name):
+        get_minio().remove_object(bucket, object_name)
+
+    # The SDK only exposes the individual multipart calls with a leading underscore;
+    # they are the plain S3 operations (CreateMultipartUpload, UploadPart, ...).
+
+    def create_multipart(self, bucket, object_name, content_type):
+        return get_minio()._create_multipart_upload(bucket, object_name, {"Content-Type": content_type})
+
+    def upload_part(self, bucket, object_name, upload_id, part_number, data):
+        try:
+            return get_minio()._upload_part(bucket, object_name, data, None, upload_id, part_number)
+        except S3Error as e:
+            if e.code == "NoSuchUpload":
+                raise ObjectNotFound(f"upload {upload_id}")
+            raise
 
+    def complete_multipart(self, bucket, object_name, upload_id, parts):
+        get_minio()._complete_multipart_upload(
+            bucket, object_name, upload_id, [Part(number, etag) for number, etag in parts],
+        )
+
+    def abort_multipart(self, bucket, object_name, upload_id):
+        try:
+            get_minio()._abort_multipart_upload(bucket, object_name, upload_id)
+        except S3Error as e:
+            if e.code != "NoSuchUpload":
+                raise
+
+
+def get_file_url(bucket: str, object_name: str, expires_seconds: int,
+                 filename: Optional[str] = None, content_type: Optional[str] = None) -> str:
+    """Presigned GET URL; `filename`/`content_type` override the response headers MinIO sends."""
+    response_headers = {}
+    if filename:
+        response_headers["response-content-disposition"] = attachment_disposition(filename)
+    if content_type:
+        response_headers["response-content-type"] = content_type
+    return get_public_minio().presigned_get_object(
+        bucket, object_name, expires=timedelta(seconds=expires_seconds),
+        response_headers=response_headers or None,
+    )
 
-def delete_file(bucket: str, object_name: str):
-    """Delete file from bucket."""
-    client = get_minio()
-    try:
-        client.remove_object(bucket, object_name)
-    except S3Error:
-        pass
 
+def presigned_post(bucket: str, object_name: str, max_size: int, expires_seconds: int,
+                   content_type: Optional[str] = None) -> tuple[str, dict]:
+    """Browser form upload for exactly `object_name`, capped at `max_size` bytes.
 
-def download_file(bucket: str, object_name: str) -> bytes:
-    """Download file as bytes."""
-    client = get_minio()
-    response = client.get_object(bucket, object_name)
-    data = response.read()
-    response.close()
-    response.release_conn()
-    return data
+    Returns (url, form fields); the file goes in a final `file` field.
+    """
+    policy = PostPolicy(bucket, datetime.now(timezone.utc) + timedelta(seconds=expires_seconds))
+    policy.add_equals_condition("key", object_name)
+    policy.add_content_length_range_condition(1, max_size)
+    fields = {"key": object_name}
+    if content_type:
+        policy.add_equals_condition("Content-Type", content_type)
+        fields["Content-Type"] = content_type
+    client = get_public_minio()
+    fields.update(client.presigned_post_policy(policy))
+    public = bool(settings.MINIO_PUBLIC_ENDPOINT)
+    secure = settings.MINIO_PUBLIC_SECURE if public else settings.MINIO_SECURE
+    host = settings.MINIO_PUBLIC_ENDPOINT if public else settings.MINIO_ENDPOINT
+    return f"{'https' if secure else 'http'}://{host}/{bucket}", fields
@@ -0,0 +1,65 @@
+"""Redis-backed email outbox, drained by the worker in `src.core.mailer`."""
+import json
+from src.core.redis import get_redis
+
+# Pending messages live in a hash (id -> JSON payload) and a sorted set scored by
+# the time they become due. Claiming re-scores a message one lease into the
+# future, so a worker that dies mid-send leaves it to be picked up again.
+
+OUTBOX_QUEUE = "email:outbox"
+OUTBOX_PAYLOADS = "email:outbox:payloads"
+OUTBOX_DEAD = "email:outbox:dead"
+
+_OUTBOX_CLAIM = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[3]))
+local out = {}
+for _, id in ipairs(ids) do
+  redis.call('ZADD', KEYS[1], ARGV[2], id)
+  local payload = redis.call('HGET', KEYS[2], id)
+  if payload then
+    table.insert(out, id)
+    table.insert(out, payload)
+  else
+    redis.call('ZREM', KEYS[1], id)
+  end
+end
+return out
+"""
+
+
+async def outbox_push(messages: list[tuple[str, dict]], due_at: float):
+    r = await get_redis()
+    async with r.pipeline(transaction=True) as pipe:
+        for msg_id, payload in messages:
+            pipe.hset(OUTBOX_PAYLOADS, msg_id, json.dumps(payload))
+            pipe.zadd(OUTBOX_QUEUE, {msg_id: due_at})
+        await pipe.execute()
+
+
+async def outbox_claim(now: float, lease: int, limit: int) -> list[tuple[str, dict]]:
+    """Take up to `limit` due messages, leasing each for `lease` seconds."""
+    r = await get_redis()
+    flat = await r.register_script(_OUTBOX_CLAIM)(
+        keys=[OUTBOX_QUEUE, OUTBOX_PAYLOADS], args=[now, now + lease, limit],
+    )
+    return [(flat[i], json.loads(flat[i + 1])) for i in range(0, len(flat), 2)]
+
+
+async def outbox_ack(msg_ids: list[str]):
+    if not msg_ids:
+        return
+    r = await get_redis()
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.zrem(OUTBOX_QUEUE, *msg_ids)
+        pipe.hdel(OUTBOX_PAYLOADS, *msg_ids)
+        await pipe.execute()
+
+
+async def outbox_dead_letter(msg_id: str, payload: dict, keep: int = 1000):
+    r = await get_redis()
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.zrem(OUTBOX_QUEUE, msg_id)
+        pipe.hdel(OUTBOX_PAYLOADS, msg_id)
+        pipe.lpush(OUTBOX_DEAD, json.dumps(payload))
+        pipe.ltrim(OUTBOX_DEAD, 0, keep - 1)
+        await pipe.execute()
@@ -55,6 +55,42 @@ async def cache_delete_pattern(pattern: str):
         await r.delete(*keys)
 
 
+# ── Versioned cache entries ──────────────────────────
+# A cache filled from the database can race with its invalidation: the fill
+# reads the old rows, the invalidation deletes the key, then the fill writes
+# the old rows back. Invalidation bumps a version key, and a fill only lands if
+# the version is still the one it read before going to the database.
+
+_SET_IF_VERSION = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+  redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+  return 1
+end
+return 0
+"""
+
+
+async def cache_version(version_key: str) -> int:
+    r = await get_redis()
+    val = await r.get(version_key)
+    return int(val) if val else 0
+
+
+async def cache_set_if_version(key: str, value: Any, ttl: int, version_key: str, version: int) -> bool:
+    """cache_set, unless `version_key` moved past `version` since it was read."""
+    r = await get_redis()
+    script = r.register_script(_SET_IF_VERSION)
+    return bool(await script(keys=[key, version_key], args=[version, json.dumps(value, default=str), ttl]))
+
+
+async def cache_invalidate_versioned(key: str, version_key: str):
+    r = await get_redis()
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.incr(version_key)
+        pipe.delete(key)
+        await pipe.execute()
+
+
 # ── JWT Blacklist ────────────────────────────────────
 
 async def blacklist_token(token: str, ttl: int):
@@ -74,6 +110,17 @@ async def publish_message(channel: str, data: dict):
     await r.publish(channel, json.dumps(data, default=str))
 
 
+async def publish_messages(messages: list[tuple[str, dict]]):
+    """Publish many (channel, data) pairs in one pipelined round trip."""
+    if not messages:
+        return
+    r = await get_redis()
+    async with r.pipeline(transaction=False) as pipe:
+        for channel, data in messages:
+            pipe.publish(channel, json.dumps(data, default=str))
+        await pipe.execute()
+
+
 def get_pubsub():
     """Returns a pubsub instance — caller must subscribe and listen."""
     import asyncio
@@ -93,19 +140,109 @@ async def rate_limit_check(key: str, max_requests: int, window: int) -> bool:
     return current <= max_requests
 
 
+async def acquire_flags(keys: list[str], ttl: int) -> list[bool]:
+    """SET NX each key with a TTL in one round trip; True where this call set it.
+
+    Used to run occasional housekeeping at most once per key per TTL window.
+    """
+    if not keys:
+        return []
+    r = await get_redis()
+    async with r.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.set(key, "1", ex=ttl, nx=True)
+        return [bool(v) for v in await pipe.execute()]
+
+
+async def take_flags(keys: list[str]) -> list[bool]:
+    """GETDEL each key in one round trip; True where this call removed a set flag."""
+    if not keys:
+        return []
+    r = await get_redis()
+    async with r.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.getdel(key)
+        return [v is not None for v in await pipe.execute()]
+
+
 # ── Counters (e.g. unread notifications) ─────────────
 
-async def incr_counter(key: str) -> int:
+# Counters that can be rebuilt from a source of truth are never created by
+# INCR/DECR: a missing key means "unknown, recompute", not "zero".
+_INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+  return redis.call('INCR', KEYS[1])
+end
+return nil
+"""
+
+_DECR_WITH_FLOOR = """
+local v = redis.call('GET', KEYS[1])
+if not v then
+  return nil
+end
+local n = math.min(tonumber(v), tonumber(ARGV[1]))
+if n > 0 then
+  return redis.call('DECRBY', KEYS[1], n)
+end
+return tonumber(v)
+"""
+
+_COMPARE_AND_SET = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+  return 1
+end
+return 0
+"""
+
+
+async def incr_existing_counters(keys: list[str]) -> list[Optional[int]]:
+    """INCR each key that exists, in one pipelined round trip.
+
+    Returns the new values in order, with None for keys that are missing.
+    """
+    if not keys:
+        return []
     r = await get_redis()
-    return await r.incr(key)
+    script = r.register_script(_INCR_IF_EXISTS)
+    async with r.pipeline(transaction=False) as pipe:
+        for key in keys:
+            await script(keys=[key], client=pipe)
+        return await pipe.execute()
 
 
-async def get_counter(key: str) -> int:
+async def decr_counter_floor(key: str, amount: int = 1) -> Optional[int]:
+    """Atomically DECRBY without going below zero. Returns None if the key is missing."""
+    r = await get_redis()
+    return await r.register_script(_DECR_WITH_FLOOR)(keys=[key], args=[amount])
+
+
+async def get_counter_or_none(key: str) -> Optional[int]:
     r = await get_redis()
     val = await r.get(key)
-    return int(val) if val else 0
+    return int(val) if val is not None else None
 
 
-async def reset_counter(key: str):
+async def get_counters(keys: list[str]) -> list[Optional[int]]:
+    if not keys:
+        return []
     r = await get_redis()
-    await r.set(key, 0)
+    return [int(v) if v is not None else None for v in await r.mget(keys)]
+
+
+async def set_counter(key: str, value: int, ttl: int, only_if_missing: bool = False):
+    r = await get_redis()
+    await r.set(key, value, ex=ttl, nx=only_if_missing)
+
+
+async def compare_and_set_counter(key: str, expected: int, value: int) -> bool:
+    """Overwrite the counter only if it still holds `expected` (keeps its TTL)."""
+    r = await get_redis()
+    return bool(await r.register_script(_COMPARE_AND_SET)(keys=[key], args=[expected, value]))
+
+
+async def scan_keys(pattern: str, cursor: int, count: int) -> tuple[int, list[str]]:
+    r = await get_redis()
+    return await r.scan(cursor=cursor, match=pattern, count=count)
+
@@ -40,6 +40,14 @@ def create_refresh_token(data: dict) -> str:
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
+def create_link_token(data: dict, expires_seconds: int) -> str:
+    """Short-lived token for URLs the browser opens itself, where no auth header is sent."""
+    to_encode = data.copy()
+    expire = datetime.now(timezone.utc) + timedelta(seconds=expires_seconds)
+    to_encode.update({"exp": expire, "type": "link"})
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
 def decode_token(token: str) -> dict:
     try:
         return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
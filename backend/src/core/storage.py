@@ -0,0 +1,632 @@
+"""Object storage — an async facade over blocking storage backends.
+
+The MinIO SDK (and plain file I/O) blocks, so every backend call runs in a
+dedicated, bounded thread pool rather than on the event loop or the default
+executor. At most STORAGE_MAX_CONCURRENCY calls are in flight; the rest wait
+(up to STORAGE_OP_TIMEOUT) for a slot. Metadata calls are bounded by
+STORAGE_OP_TIMEOUT, and streamed transfers by STORAGE_IO_TIMEOUT per chunk or
+part, so a stalled MinIO surfaces as StorageTimeout instead of a hung request.
+
+Backends: "minio" (production), "local" (a directory tree) and "memory" (tests).
+"""
+import abc
+import asyncio
+import hashlib
+import logging
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+import unicodedata
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import partial
+from typing import AsyncIterator, BinaryIO, Iterator, Optional
+from urllib.parse import quote
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = [
+    settings.MINIO_BUCKET_AVATARS,
+    settings.MINIO_BUCKET_PROJECTS,
+    settings.MINIO_BUCKET_SUBMISSIONS,
+    settings.MINIO_BUCKET_RESUMES,
+]
+
+
+class StorageError(Exception):
+    pass
+
+
+class ObjectNotFound(StorageError):
+    pass
+
+
+class StorageTimeout(StorageError):
+    pass
+
+
+class UploadTooLarge(StorageError):
+    pass
+
+
+def new_object_name(original_filename: str) -> str:
+    ext = original_filename.rsplit(".", 1)[-1] if "." in original_filename else ""
+    return f"{uuid.uuid4().hex}.{ext}" if ext else uuid.uuid4().hex
+
+
+def attachment_disposition(filename: str) -> str:
+    """Content-Disposition for a download (RFC 6266).
+
+    Header values must be latin-1, so `filename` gets an ASCII approximation
+    and `filename*` carries the real name, percent-encoded UTF-8.
+    """
+    ascii_name = "".join(c for c in unicodedata.normalize("NFKD", filename) if not unicodedata.combining(c))
+    ascii_name = re.sub(r'[^\w\s\-.()]', "_", ascii_name, flags=re.ASCII).strip() or "download"
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+@dataclass
+class ObjectStat:
+    size: int
+    etag: str
+    content_type: Optional[str] = None
+
+
+# ── Backends (blocking; only ever called from the storage thread pool) ──
+
+class StorageBackend(abc.ABC):
+    name = "base"
+
+    @abc.abstractmethod
+    def ensure_bucket(self, bucket: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def put(self, bucket: str, object_name: str, reader: BinaryIO, content_type: str) -> None:
+        """Store everything `reader.read()` yields until it returns b""."""
+
+    @abc.abstractmethod
+    def stat(self, bucket: str, object_name: str) -> ObjectStat:
+        ...
+
+    @abc.abstractmethod
+    def open(self, bucket: str, object_name: str, offset: int, length: int,
+             chunk_size: int) -> Iterator[bytes]:
+        """Open the object (or a byte range of it); the returned iterator yields its chunks."""
+
+    @abc.abstractmethod
+    def remove(self, bucket: str, object_name: str) -> None:
+        """Delete the object; deleting a missing object is not an error."""
+
+    # Multipart uploads whose parts arrive separately (resumable upload sessions)
+
+    @abc.abstractmethod
+    def create_multipart(self, bucket: str, object_name: str, content_type: str) -> str:
+        ...
+
+    @abc.abstractmethod
+    def upload_part(self, bucket: str, object_name: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """Store one part (re-uploading a part number replaces it); returns its etag."""
+
+    @abc.abstractmethod
+    def complete_multipart(self, bucket: str, object_name: str, upload_id: str,
+                           parts: list[tuple[int, str]]) -> None:
+        """Assemble the object from (part_number, etag) pairs, in that order."""
+
+    @abc.abstractmethod
+    def abort_multipart(self, bucket: str, object_name: str, upload_id: str) -> None:
+        ...
+
+
+def _drain(reader: BinaryIO, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    while chunk := reader.read(chunk_size):
+        yield chunk
+
+
+def _slice(data: bytes, offset: int, length: int, chunk_size: int) -> Iterator[bytes]:
+    end = offset + length if length else len(data)
+    for i in range(offset, min(end, len(data)), chunk_size):
+        yield data[i:min(i + chunk_size, end)]
+
+
+class MemoryBackend(StorageBackend):
+    """Keeps objects in a dict; for tests and local experiments."""
+    name = "memory"
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], tuple[bytes, str]] = {}
+        self.uploads: dict[str, tuple[str, str, str, dict[int, bytes]]] = {}
+        self._lock = threading.Lock()
+
+    def ensure_bucket(self, bucket: str) -> None:
+        pass
+
+    def put(self, bucket, object_name, reader, content_type):
+        data = b"".join(_drain(reader))
+        with self._lock:
+            self.objects[(bucket, object_name)] = (data, content_type)
+
+    def _get(self, bucket: str, object_name: str) -> tuple[bytes, str]:
+        try:
+            return self.objects[(bucket, object_name)]
+        except KeyError:
+            raise ObjectNotFound(f"{bucket}/{object_name}")
+
+    def stat(self, bucket, object_name):
+        data, content_type = self._get(bucket, object_name)
+        return ObjectStat(size=len(data), etag=hashlib.md5(data).hexdigest(), content_type=content_type)
+
+    def open(self, bucket, object_name, offset, length, chunk_size):
+        data, _ = self._get(bucket, object_name)
+        return _slice(data, offset, length, chunk_size)
+
+    def remove(self, bucket, object_name):
+        with self._lock:
+            self.objects.pop((bucket, object_name), None)
+
+    def create_multipart(self, bucket, object_name, content_type):
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = (bucket, object_name, content_type, {})
+        return upload_id
+
+    def _upload(self, upload_id: str) -> dict[int, bytes]:
+        try:
+            return self.uploads[upload_id][3]
+        except KeyError:
+            raise ObjectNotFound(f"upload {upload_id}")
+
+    def upload_part(self, bucket, object_name, upload_id, part_number, data):
+        with self._lock:
+            self._upload(upload_id)[part_number] = data
+        return hashlib.md5(data).hexdigest()
+
+    def complete_multipart(self, bucket, object_name, upload_id, parts):
+        with self._lock:
+            received = self._upload(upload_id)
+            for number, etag in parts:
+                if number not in received or hashlib.md5(received[number]).hexdigest() != etag:
+                    raise StorageError(f"Part {number} is missing or does not match")
+            content_type = self.uploads.pop(upload_id)[2]
+            self.objects[(bucket, object_name)] = (b"".join(received[n] for n, _ in parts), content_type)
+
+    def abort_multipart(self, bucket, object_name, upload_id):
+        with self._lock:
+            self.uploads.pop(upload_id, None)
+
+
+class _ConcatReader:
+    """Reads a list of files back to back, one open at a time."""
+
+    def __init__(self, paths: list[str]):
+        self._pending = iter(paths)
+        self._current: Optional[BinaryIO] = None
+
+    def read(self, size: int = -1) -> bytes:
+        while True:
+            if self._current is None:
+                path = next(self._pending, None)
+                if path is None:
+                    return b""
+                self._current = open(path, "rb")
+            chunk = self._current.read(size)
+            if chunk:
+                return chunk
+            self._current.close()
+            self._current = None
+
+
+class LocalBackend(StorageBackend):
+    """Stores objects as files under `root/<bucket>/<object_name>`.
+
+    An object's content type is kept beside it in `root/.meta/<bucket>/<object_name>`.
+    """
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, bucket: str, object_name: str) -> str:
+        if os.path.basename(object_name) != object_name or object_name in ("", ".", ".."):
+            raise StorageError(f"Invalid object name: {object_name!r}")
+        return os.path.join(self.root, bucket, object_name)
+
+    def _meta_path(self, bucket: str, object_name: str) -> str:
+        return os.path.join(self.root, ".meta", bucket, object_name)
+
+    def ensure_bucket(self, bucket):
+        os.makedirs(os.path.join(self.root, bucket), exist_ok=True)
+
+    def put(self, bucket, object_name, reader, content_type):
+        path = self._path(bucket, object_name)
+        self.ensure_bucket(bucket)
+        # Written beside the target and renamed, so readers never see a partial object
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in _drain(reader):
+                    f.write(chunk)
+            self._write_meta(bucket, object_name, content_type)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _write_meta(self, bucket: str, object_name: str, content_type: str) -> None:
+        path = self._meta_path(bucket, object_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content_type)
+
+    def _read_meta(self, path: str) -> Optional[str]:
+        try:
+            with open(path) as f:
+                return f.read() or None
+        except FileNotFoundError:
+            return None
+
+    def stat(self, bucket, object_name):
+        try:
+            st = os.stat(self._path(bucket, object_name))
+        except FileNotFoundError:
+            raise ObjectNotFound(f"{bucket}/{object_name}")
+        return ObjectStat(size=st.st_size, etag=f"{st.st_size:x}-{st.st_mtime_ns:x}",
+                          content_type=self._read_meta(self._meta_path(bucket, object_name)))
+
+    def open(self, bucket, object_name, offset, length, chunk_size):
+        try:
+            f = open(self._path(bucket, object_name), "rb")
+        except FileNotFoundError:
+            raise ObjectNotFound(f"{bucket}/{object_name}")
+        return self._read(f, offset, length, chunk_size)
+
+    @staticmethod
+    def _read(f, offset: int, length: int, chunk_size: int) -> Iterator[bytes]:
+        with f:
+            f.seek(offset)
+            remaining = length or None
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def remove(self, bucket, object_name):
+        for path in (self._path(bucket, object_name), self._meta_path(bucket, object_name)):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def _parts_dir(self, upload_id: str) -> str:
+        if not upload_id.isalnum():
+            raise StorageError(f"Invalid upload id: {upload_id!r}")
+        return os.path.join(self.root, ".multipart", upload_id)
+
+    def create_multipart(self, bucket, object_name, content_type):
+        upload_id = uuid.uuid4().hex
+        parts_dir = self._parts_dir(upload_id)
+        os.makedirs(parts_dir)
+        with open(os.path.join(parts_dir, "content-type"), "w") as f:
+            f.write(content_type)
+        return upload_id
+
+    def upload_part(self, bucket, object_name, upload_id, part_number, data):
+        parts_dir = self._parts_dir(upload_id)
+        if not os.path.isdir(parts_dir):
+            raise ObjectNotFound(f"upload {upload_id}")
+        fd, tmp = tempfile.mkstemp(dir=parts_dir, prefix=".part-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, os.path.join(parts_dir, str(part_number)))
+        return hashlib.md5(data).hexdigest()
+
+    def complete_multipart(self, bucket, object_name, upload_id, parts):
+        parts_dir = self._parts_dir(upload_id)
+        if not os.path.isdir(parts_dir):
+            raise ObjectNotFound(f"upload {upload_id}")
+        files = []
+        for number, etag in parts:
+            path = os.path.join(parts_dir, str(number))
+            if not os.path.exists(path) or self._md5(path) != etag:
+                raise StorageError(f"Part {number} is missing or does not match")
+            files.append(path)
+
+        content_type = self._read_meta(os.path.join(parts_dir, "content-type")) or "application/octet-stream"
+        self.put(bucket, object_name, _ConcatReader(files), content_type)
+        self.abort_multipart(bucket, object_name, upload_id)
+
+    @staticmethod
+    def _md5(path: str) -> str:
+        digest = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in _drain(f):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def abort_multipart(self, bucket, object_name, upload_id):
+        shutil.rmtree(self._parts_dir(upload_id), ignore_errors=True)
+
+
+def create_backend(kind: str) -> StorageBackend:
+    if kind == "minio":
+        from src.core.minio_client import MinioBackend
+        return MinioBackend()
+    if kind == "local":
+        return LocalBackend(settings.STORAGE_LOCAL_ROOT)
+    if kind == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {kind!r}")
+
+
+# ── Async facade ──
+
+class _ChunkPipe:
+    """File-like bridge from an async producer to a blocking backend thread."""
+
+    def __init__(self, depth: int = 8):
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        self._buffer = b""
+        self._eof = False
+        self.error: Optional[BaseException] = None
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._buffer and not self._eof:
+            if self.error is not None:
+                raise self.error
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is None:
+                self._eof = True
+            else:
+                self._buffer = item
+        if self.error is not None:
+            raise self.error
+        if size < 0 or size >= len(self._buffer):
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    async def put(self, item: Optional[bytes], upload: asyncio.Future, timeout: float):
+        deadline = time.monotonic() + timeout
+        while True:
+            if upload.done():
+                upload.result()  # re-raises the storage error
+                raise StorageError("Upload finished before the stream ended")
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                if time.monotonic() > deadline:
+                    raise StorageTimeout("Storage stopped accepting upload data")
+                await asyncio.sleep(0.01)
+
+
+class _OpMetrics:
+    __slots__ = ("calls", "errors", "timeouts", "total_seconds", "max_seconds")
+
+    def __init__(self):
+        self.calls = self.errors = self.timeouts = 0
+        self.total_seconds = self.max_seconds = 0.0
+
+
+class ObjectStorage:
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self._backend = backend
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.metrics: dict[str, _OpMetrics] = {}
+
+    @property
+    def backend(self) -> StorageBackend:
+        if self._backend is None:
+            self._backend = create_backend(settings.STORAGE_BACKEND)
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend: StorageBackend):
+        self._backend = backend
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=settings.STORAGE_THREADS,
+                                                thread_name_prefix="storage")
+        return self._executor
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(settings.STORAGE_MAX_CONCURRENCY)
+        return self._slots
+
+    def _metric(self, op: str) -> _OpMetrics:
+        if op not in self.metrics:
+            self.metrics[op] = _OpMetrics()
+        return self.metrics[op]
+
+    @asynccontextmanager
+    async def _slot(self, op: str):
+        """Hold one of the concurrency slots for `op`, recording its latency and outcome."""
+        metric = self._metric(op)
+        semaphore = self._semaphore()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), settings.STORAGE_OP_TIMEOUT)
+        except asyncio.TimeoutError:
+            metric.calls += 1
+            metric.timeouts += 1
+            raise StorageTimeout(f"Storage busy: no free slot for {op}")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            yield
+        except StorageTimeout:
+            metric.timeouts += 1
+            raise
+        except (ObjectNotFound, UploadTooLarge):
+            raise
+        except Exception:
+            metric.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metric.calls += 1
+            metric.total_seconds += elapsed
+            metric.max_seconds = max(metric.max_seconds, elapsed)
+            self.in_flight -= 1
+            semaphore.release()
+
+    def _submit(self, fn, *args) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(self._pool(), partial(fn, *args))
+
+    async def _run(self, fn, *args, timeout: float):
+        # On timeout the worker thread still finishes its call; only the caller stops waiting
+        future = self._submit(fn, *args)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise StorageTimeout(f"Storage call {getattr(fn, '__name__', fn)} timed out")
+
+    async def _call(self, op: str, fn, *args, timeout: Optional[float] = None):
+        async with self._slot(op):
+            return await self._run(fn, *args, timeout=timeout or settings.STORAGE_OP_TIMEOUT)
+
+    # ── Operations ──
+
+    async def ensure_buckets(self, buckets: list[str]) -> None:
+        for bucket in buckets:
+            await self._call("ensure_bucket", self.backend.ensure_bucket, bucket)
+
+    async def stat(self, bucket: str, object_name: str) -> ObjectStat:
+        return await self._call("stat", self.backend.stat, bucket, object_name)
+
+    async def remove(self, bucket: str, object_name: str) -> None:
+        await self._call("remove", self.backend.remove, bucket, object_name)
+
+    async def put_stream(self, bucket: str, object_name: str, chunks: AsyncIterator[bytes],
+                         content_type: str = "application/octet-stream",
+                         max_size: Optional[int] = None) -> tuple[int, str]:
+        """Stream chunks into storage, holding one slot for the whole upload.
+
+        Memory stays at a few chunks plus whatever the backend buffers (one
+        MINIO_PART_SIZE part for MinIO). Raises UploadTooLarge (and aborts the
+        upload) as soon as more than `max_size` bytes have arrived.
+        Returns (size, sha256 hex digest).
+        """
+        async with self._slot("put"):
+            pipe = _ChunkPipe()
+            upload = self._submit(self.backend.put, bucket, object_name, pipe, content_type)
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise UploadTooLarge()
+                    digest.update(chunk)
+                    await pipe.put(chunk, upload, settings.STORAGE_IO_TIMEOUT)
+                await pipe.put(None, upload, settings.STORAGE_IO_TIMEOUT)
+                try:
+                    await asyncio.wait_for(asyncio.shield(upload), settings.STORAGE_IO_TIMEOUT)
+                except asyncio.TimeoutError:
+                    raise StorageTimeout("Storage did not complete the upload")
+            except BaseException as e:
+                pipe.error = e if isinstance(e, Exception) else StorageError("Upload cancelled")
+                # Let the backend abort its partial upload before the slot is released
+                try:
+                    await asyncio.wait_for(asyncio.shield(upload), settings.STORAGE_OP_TIMEOUT)
+                except BaseException:
+                    pass
+                raise
+        return size, digest.hexdigest()
+
+    async def create_multipart(self, bucket: str, object_name: str,
+                               content_type: str = "application/octet-stream") -> str:
+        return await self._call("create_multipart", self.backend.create_multipart, bucket, object_name, content_type)
+
+    async def upload_part(self, bucket: str, object_name: str, upload_id: str, part_number: int,
+                          data: bytes) -> str:
+        return await self._call("upload_part", self.backend.upload_part, bucket, object_name, upload_id,
+                                part_number, data, timeout=settings.STORAGE_IO_TIMEOUT)
+
+    async def complete_multipart(self, bucket: str, object_name: str, upload_id: str,
+                                 parts: list[tuple[int, str]]) -> None:
+        await self._call("complete_multipart", self.backend.complete_multipart, bucket, object_name, upload_id,
+                         parts, timeout=settings.STORAGE_IO_TIMEOUT)
+
+    async def abort_multipart(self, bucket: str, object_name: str, upload_id: str) -> None:
+        await self._call("abort_multipart", self.backend.abort_multipart, bucket, object_name, upload_id)
+
+    async def put_bytes(self, bucket: str, object_name: str, data: bytes,
+                        content_type: str = "application/octet-stream") -> None:
+        async def one_chunk():
+            yield data
+        await self.put_stream(bucket, object_name, one_chunk(), content_type)
+
+    async def read_bytes(self, bucket: str, object_name: str) -> bytes:
+        return b"".join([chunk async for chunk in self.stream(bucket, object_name, chunk_size=1024 * 1024)])
+
+    async def stream(self, bucket: str, object_name: str, offset: int = 0, length: int = 0,
+                     chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        """Yield an object (or the byte range offset..offset+length) chunk by chunk.
+
+        Each chunk is read in the pool under its own slot, so a slow client
+        doesn't hold a slot between chunks and nothing beyond the current chunk
+        is kept in memory.
+        """
+        chunks = await self._call("open", self.backend.open, bucket, object_name, offset, length, chunk_size)
+        try:
+            while True:
+                chunk = await self._call("read", next, chunks, None, timeout=settings.STORAGE_IO_TIMEOUT)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                try:
+                    await self._run(close, timeout=settings.STORAGE_OP_TIMEOUT)
+                except Exception as e:
+                    logger.warning(f"Closing storage stream {bucket}/{object_name} failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "max_concurrency": settings.STORAGE_MAX_CONCURRENCY,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "operations": {
+                op: {
+                    "calls": m.calls, "errors": m.errors, "timeouts": m.timeouts,
+                    "avg_ms": round(m.total_seconds / m.calls * 1000, 2) if m.calls else 0.0,
+                    "max_ms": round(m.max_seconds * 1000, 2),
+                }
+                for op, m in self.metrics.items()
+            },
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+storage = ObjectStorage()
@@ -1,4 +1,5 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
 from typing import Optional
 from src.core.config import settings
 
@@ -36,13 +37,58 @@ async def init_mongodb():
     await db.chat_messages.create_index([("sender_id", 1)])
 
     # Chat rooms
-    await db.chat_rooms.create_index([("participants", 1)])
+    await db.chat_rooms.create_index([("participants", 1), ("last_message_at", -1), ("_id", -1)])
     await db.chat_rooms.create_index([("project_id", 1)])
+    # One room per (project, kind, canonical participant key). Legacy rooms without
+    # a key are left out of the unique constraint until they are backfilled.
+    await db.chat_rooms.create_index(
+        [("project_id", 1), ("kind", 1), ("key", 1)],
+        unique=True,
+        partialFilterExpression={"key": {"$type": "string"}},
+    )
 
-    # Activity logs
+    # Activity logs — raw events expire; analytics read the rollups below
     await db.activity_logs.create_index([("user_id", 1), ("created_at", -1)])
     await db.activity_logs.create_index([("action", 1)])
-    await db.activity_logs.create_index([("created_at", -1)])
+    await _ensure_ttl_index(
+        db.activity_logs, "created_at", "activity_logs_ttl",
+        settings.ACTIVITY_LOG_RETENTION_DAYS * 86400,
+    )
+    await db.activity_rollups.create_index([("granularity", 1), ("action", 1), ("bucket", 1)])
+    await _ensure_ttl_index(
+        db.activity_rollups, "bucket", "activity_rollups_hourly_ttl",
+        settings.ACTIVITY_HOURLY_ROLLUP_RETENTION_DAYS * 86400,
+        partialFilterExpression={"granularity": "hour"},
+    )
+    await db.activity_daily_users.create_index([("day", 1), ("user_id", 1)])
+    await _ensure_ttl_index(
+        db.activity_daily_users, "day", "activity_daily_users_ttl",
+        settings.ACTIVITY_DAILY_USERS_RETENTION_DAYS * 86400,
+    )
 
-    # Notifications
-    await db.notifications.create_index([("user_id", 1), ("is_read", 1), ("created_at", -1)])
+    # Notifications — listed, paged and trimmed by latest activity (latest_at, _id)
+    await db.notifications.create_index([("user_id", 1), ("latest_at", -1), ("_id", -1)])
+    await db.notifications.create_index([("user_id", 1), ("is_read", 1), ("latest_at", -1), ("_id", -1)])
+    # At most one open group per (user, key)
+    await db.notifications.create_index(
+        [("user_id", 1), ("group_key", 1)],
+        unique=True,
+        partialFilterExpression={"open": True},
+    )
+    # Read notifications expire counting from when they were read; unread ones
+    # never expire (NOTIFICATION_MAX_PER_USER bounds them instead). Existing data
+    # is brought in line once by scripts/migrate_notifications.py.
+    await _ensure_ttl_index(
+        db.notifications, "read_at", "notifications_read_at_ttl",
+        settings.NOTIFICATION_READ_RETENTION_DAYS * 86400,
+    )
+
+
+async def _ensure_ttl_index(collection, field: str, name: str, seconds: int, **kwargs):
+    """Create a TTL index, or retune expireAfterSeconds if it already exists."""
+    try:
+        await collection.create_index([(field, 1)], name=name, expireAfterSeconds=seconds, **kwargs)
+    except OperationFailure:
+        await collection.database.command(
+            "collMod", collection.name, index={"name": name, "expireAfterSeconds": seconds},
+        )
@@ -0,0 +1,188 @@
+"""Background thumbnails and previews for uploaded images and PDFs.
+
+Uploads only mark a previewable file `pending` and queue its id; workers here
+fetch the original, render it in a process pool (`src.files.render`, so
+decoding never holds the event loop or the GIL) and store WebP derivatives next
+to it as `<object_name>.thumb.webp` / `<object_name>.preview.webp`. Names are
+derived from the stored object, so files sharing a deduplicated blob share
+their derivatives too.
+
+The queue is in-process; `pending` in the database is the source of truth, and
+`run_preview_sweeper` re-queues whatever a restart or a full queue left behind.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Optional
+from src.core.config import settings
+from src.core.storage import storage
+from src.files import render
+from src.projects.models import ProjectFile
+
+logger = logging.getLogger(__name__)
+
+PENDING, READY, FAILED = "pending", "ready", "failed"
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif"}
+PDF_EXTENSIONS = {".pdf"}
+
+
+def is_previewable(filename: str) -> bool:
+    ext = os.path.splitext(filename)[1].lower()
+    return ext in IMAGE_EXTENSIONS or ext in PDF_EXTENSIONS
+
+
+def derived_object_names(object_name: str) -> dict[str, str]:
+    return {"thumbnail": f"{object_name}.thumb.webp", "preview": f"{object_name}.preview.webp"}
+
+
+class PreviewQueue:
+    def __init__(self, max_size: int, workers: int):
+        self.max_size = max_size
+        self.workers = workers
+        self.generated = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queued: set[int] = set()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        """Start the workers on the running loop; called from the lifespan and lazily on submit."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._queued = set()
+            self._tasks = []
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._run()))
+
+    def submit(self, file_id: int) -> bool:
+        """Queue a file; False when the queue is full (it stays pending for the sweeper)."""
+        if not settings.PREVIEWS_ENABLED:
+            return False
+        self.start()
+        if file_id in self._queued:
+            return True
+        try:
+            self._queue.put_nowait(file_id)
+        except asyncio.QueueFull:
+            return False
+        self._queued.add(file_id)
+        return True
+
+    async def join(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and storage threads is unsafe
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Kill a broken or hung pool; the next job starts a fresh one."""
+        if self._pool is pool:
+            self._pool = None
+        # A worker stuck in a decoder never returns, so shutting down alone would leak it
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    async def _render(self, job) -> dict[str, bytes]:
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            pool = self._executor()
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(pool, job), settings.PREVIEW_TIMEOUT)
+            except asyncio.TimeoutError:
+                self._discard_pool(pool)
+                raise
+            except BrokenProcessPool:
+                # Jobs that only shared the pool with the one that broke it get one retry
+                replaced = self._pool is not pool
+                self._discard_pool(pool)
+                if not replaced or attempt:
+                    raise
+
+    async def _run(self):
+        while True:
+            file_id = await self._queue.get()
+            try:
+                await self._generate(file_id)
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Preview generation for file {file_id} failed: {e}")
+                await ProjectFile.filter(id=file_id).update(preview_status=FAILED)
+            finally:
+                self._queued.discard(file_id)
+                self._queue.task_done()
+
+    async def _generate(self, file_id: int):
+        pf = await ProjectFile.filter(id=file_id, preview_status=PENDING).first()
+        if pf is None:
+            return
+        names = derived_object_names(pf.object_name)
+
+        # Same stored object already rendered for another file (deduplicated upload)
+        twin = await ProjectFile.filter(object_name=pf.object_name, preview_status=READY).exclude(id=pf.id).first()
+        if twin is not None:
+            await ProjectFile.filter(id=pf.id).update(
+                thumbnail_object=twin.thumbnail_object, preview_object=twin.preview_object, preview_status=READY,
+            )
+            return
+
+        from src.files.service import _get_bucket
+        bucket = _get_bucket(pf.file_type)
+        data = await storage.read_bytes(bucket, pf.object_name)
+        ext = os.path.splitext(pf.filename)[1].lower()
+        if ext in PDF_EXTENSIONS:
+            job = partial(render.pdf_preview, data, settings.THUMBNAIL_SIZE, settings.PREVIEW_QUALITY,
+                          settings.PDF_PREVIEW_SIZE)
+        else:
+            job = partial(render.image_thumbnail, data, settings.THUMBNAIL_SIZE, settings.PREVIEW_QUALITY)
+        rendered = await self._render(job)
+
+        for kind, body in rendered.items():
+            await storage.put_bytes(bucket, names[kind], body, "image/webp")
+        await ProjectFile.filter(id=pf.id).update(
+            thumbnail_object=names["thumbnail"] if "thumbnail" in rendered else None,
+            preview_object=names["preview"] if "preview" in rendered else None,
+            preview_status=READY,
+        )
+        self.generated += 1
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._pool is not None:
+            self._discard_pool(self._pool)
+
+
+preview_queue = PreviewQueue(settings.PREVIEW_QUEUE_SIZE, settings.PREVIEW_WORKERS)
+
+
+async def run_preview_sweeper():
+    """Background loop started from the app lifespan: re-queue files left pending."""
+    while True:
+        try:
+            for file_id in await ProjectFile.filter(preview_status=PENDING).order_by("id").values_list("id", flat=True):
+                if not preview_queue.submit(file_id):
+                    break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Preview sweeper error: {e}")
+        await asyncio.sleep(settings.PREVIEW_SWEEP_INTERVAL)
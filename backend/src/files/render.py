@@ -0,0 +1,39 @@
+"""Thumbnail and preview rendering.
+
+These functions run inside the preview process pool (see `src.files.previews`),
+so they take and return plain bytes and import nothing from the app.
+"""
+import io
+
+
+def _to_webp(image, max_size: int, quality: int) -> bytes:
+    from PIL import Image
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P", "PA") else "RGB")
+    out = io.BytesIO()
+    image.save(out, "WEBP", quality=quality, method=4)
+    return out.getvalue()
+
+
+def image_thumbnail(data: bytes, thumb_size: int, quality: int) -> dict[str, bytes]:
+    """WebP thumbnail of an image (first frame for animations), EXIF orientation applied."""
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (thumb_size, thumb_size))  # JPEG: decode at a reduced scale
+        return {"thumbnail": _to_webp(ImageOps.exif_transpose(image), thumb_size, quality)}
+
+
+def pdf_preview(data: bytes, thumb_size: int, quality: int, preview_size: int) -> dict[str, bytes]:
+    """WebP preview of a PDF's first page, plus a thumbnail of it."""
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(data)
+    try:
+        page = pdf[0]
+        width, height = page.get_size()
+        image = page.render(scale=preview_size / max(width, height, 1)).to_pil()
+    finally:
+        pdf.close()
+    return {
+        "preview": _to_webp(image.copy(), preview_size, quality),
+        "thumbnail": _to_webp(image, thumb_size, quality),
+    }
@@ -1,23 +1,67 @@
-from src.projects.models import Project, ProjectFile
+from tortoise.exceptions import IntegrityError
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
+from src.projects.models import FileBlob, Project, ProjectFile
 
 
-async def get_project_with_applications(project_id: int) -> Project | None:
-    return await Project.filter(id=project_id).prefetch_related("applications").first()
+async def get_project(project_id: int) -> Project | None:
+    return await Project.filter(id=project_id).first()
+
+
+async def list_files_with_uploaders(project_id: int, file_type: str) -> list[ProjectFile]:
+    return await ProjectFile.filter(project_id=project_id, file_type=file_type) \
+        .select_related("uploader").order_by("id")
 
 
 async def get_file_by_id(file_id: int) -> ProjectFile | None:
     return await ProjectFile.filter(id=file_id).first()
 
 
-async def create_file(project_id: int, uploader_id: int, filename: str,
-                      object_name: str, file_size: int, content_type: str | None,
-                      file_type: str) -> ProjectFile:
-    return await ProjectFile.create(
-        project_id=project_id, uploader_id=uploader_id,
-        filename=filename, object_name=object_name,
-        file_size=file_size, content_type=content_type,
-        file_type=file_type,
-    )
+async def get_blob(bucket: str, sha256: str) -> FileBlob | None:
+    return await FileBlob.filter(bucket=bucket, sha256=sha256).first()
+
+
+async def _reference_blob(project_id: int, uploader_id: int, filename: str, content_type: str | None,
+                          file_type: str, bucket: str, sha256: str, size: int,
+                          object_name: str | None, preview_status: str | None) -> tuple[ProjectFile | None, bool]:
+    async with in_transaction():
+        blob = await FileBlob.filter(bucket=bucket, sha256=sha256).select_for_update().first()
+        stored = False
+        if blob:
+            await FileBlob.filter(id=blob.id).update(ref_count=F("ref_count") + 1)
+        elif object_name is None:
+            return None, False
+        else:
+            blob = await FileBlob.create(bucket=bucket, sha256=sha256, object_name=object_name,
+                                         size=size, ref_count=1)
+            stored = True
+        pf = await ProjectFile.create(
+            project_id=project_id, uploader_id=uploader_id,
+            filename=filename, object_name=blob.object_name,
+            file_size=blob.size, content_type=content_type,
+            file_type=file_type, sha256=sha256, blob=blob, preview_status=preview_status,
+        )
+    return pf, stored
+
+
+async def create_blob_file(project_id: int, uploader_id: int, filename: str, content_type: str | None,
+                           file_type: str, bucket: str, sha256: str, size: int,
+                           object_name: str | None,
+                           preview_status: str | None = None) -> tuple[ProjectFile | None, bool]:
+    """Add a ProjectFile referencing the blob for `sha256`, bumping its ref count.
+
+    `object_name` is a freshly stored copy of the content: it becomes the blob if
+    none exists yet. With `object_name=None` the blob must already exist.
+    Returns (file, stored): `stored` is False when the fresh copy was not needed
+    (the caller should delete it); the file is None if there was nothing to reference.
+    """
+    args = (project_id, uploader_id, filename, content_type, file_type, bucket, sha256, size, object_name,
+            preview_status)
+    try:
+        return await _reference_blob(*args)
+    except IntegrityError:
+        # A concurrent upload of the same content created the blob first; reference it instead
+        return await _reference_blob(*args)
 
 
 async def list_files(project_id: int, file_type: str | None = None) -> list[ProjectFile]:
@@ -27,5 +71,21 @@ async def list_files(project_id: int, file_type: str | None = None) -> list[Proj
     return await ProjectFile.filter(**filters).order_by("-created_at")
 
 
-async def delete_file(pf: ProjectFile) -> None:
-    await pf.delete()
+async def delete_file(pf: ProjectFile) -> str | None:
+    """Delete the file and drop its blob reference.
+
+    Returns the object name to remove from storage — the file's own object, or
+    the blob's once its last reference is gone — or None while it is still shared.
+    """
+    async with in_transaction():
+        await pf.delete()
+        if pf.blob_id is None:
+            return pf.object_name
+        blob = await FileBlob.filter(id=pf.blob_id).select_for_update().first()
+        if blob is None:
+            return None
+        if blob.ref_count <= 1:
+            await blob.delete()
+            return blob.object_name
+        await FileBlob.filter(id=blob.id).update(ref_count=F("ref_count") - 1)
+        return None
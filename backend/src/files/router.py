@@ -1,25 +1,87 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, UploadFile, File, Query
+from fastapi import APIRouter, Depends, Header, Query, Request
 from src.core.dependencies import get_current_user
 from src.users.models import User
 from src.files import service
-from src.files.schemas import FileResponse
+from src.files.schemas import (
+    FileResponse, UploadUrlRequest, UploadUrlResponse, DownloadUrlResponse,
+    UploadSessionCreate, UploadSessionResponse, UploadPartResponse,
+)
 
 router = APIRouter(prefix="/files", tags=["Files"])
 
 
-@router.post("/project/{project_id}", response_model=FileResponse, status_code=201)
+# The body is parsed incrementally by the service, so the multipart schema is declared by hand
+_UPLOAD_BODY = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object", "required": ["file"],
+    "properties": {"file": {"type": "string", "format": "binary"}},
+}}}}}
+
+
+@router.post("/project/{project_id}", response_model=FileResponse, status_code=201, openapi_extra=_UPLOAD_BODY)
 async def upload_project_file(
     project_id: int,
-    file: UploadFile = File(...),
+    request: Request,
     file_type: str = Query("attachment", pattern="^(attachment|submission)$"),
+    sha256: Optional[str] = Query(None, pattern="^[0-9a-fA-F]{64}$",
+                                  description="SHA-256 of the file; lets already-stored content skip the upload to storage"),
+    current_user: User = Depends(get_current_user),
+):
+    return await service.upload_project_file(project_id, current_user, request, file_type, sha256)
+
+
+@router.post("/project/{project_id}/upload-url", response_model=UploadUrlResponse)
+async def create_upload_url(
+    project_id: int,
+    data: UploadUrlRequest,
+    current_user: User = Depends(get_current_user),
+):
+    return await service.create_upload_url(project_id, current_user, data)
+
+
+@router.post("/uploads/{upload_id}/finalize", response_model=FileResponse, status_code=201)
+async def finalize_upload(upload_id: str, current_user: User = Depends(get_current_user)):
+    return await service.finalize_upload(upload_id, current_user)
+
+
+@router.post("/project/{project_id}/upload-sessions", response_model=UploadSessionResponse, status_code=201)
+async def create_upload_session(
+    project_id: int,
+    data: UploadSessionCreate,
+    current_user: User = Depends(get_current_user),
+):
+    return await service.create_upload_session(project_id, current_user, data)
+
+
+@router.get("/upload-sessions/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(session_id: str, current_user: User = Depends(get_current_user)):
+    return await service.get_upload_session(session_id, current_user)
+
+
+_PART_BODY = {"requestBody": {"required": True, "content": {"application/octet-stream": {"schema": {
+    "type": "string", "format": "binary",
+}}}}}
+
+
+@router.put("/upload-sessions/{session_id}/parts/{part_number}", response_model=UploadPartResponse,
+            openapi_extra=_PART_BODY)
+async def upload_session_part(
+    session_id: str,
+    part_number: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
 ):
-    content = await file.read()
-    return await service.upload_project_file(
-        project_id, current_user, content,
-        file.filename or "unnamed_file", file.content_type, file_type,
-    )
+    return await service.upload_session_part(session_id, part_number, current_user, request)
+
+
+@router.post("/upload-sessions/{session_id}/complete", response_model=FileResponse, status_code=201)
+async def complete_upload_session(session_id: str, current_user: User = Depends(get_current_user)):
+    return await service.complete_upload_session(session_id, current_user)
+
+
+@router.delete("/upload-sessions/{session_id}", status_code=204)
+async def abort_upload_session(session_id: str, current_user: User = Depends(get_current_user)):
+    await service.abort_upload_session(session_id, current_user)
 
 
 @router.get("/project/{project_id}", response_model=list[FileResponse])
@@ -31,9 +93,56 @@ async def list_project_files(
     return await service.list_project_files(project_id, file_type)
 
 
+@router.post("/project/{project_id}/export-url", response_model=DownloadUrlResponse)
+async def create_export_url(
+    project_id: int,
+    file_type: str = Query("submission", pattern="^(submission|attachment)$"),
+    current_user: User = Depends(get_current_user),
+):
+    return await service.create_export_url(project_id, current_user, file_type)
+
+
+@router.get("/project/{project_id}/export.zip")
+async def export_project_files(
+    project_id: int,
+    token: str = Query(..., description="Signed link token from export-url"),
+    file_type: str = Query("submission", pattern="^(submission|attachment)$"),
+):
+    return await service.export_project_files(project_id, token, file_type)
+
+
 @router.get("/{file_id}/download")
-async def download_project_file(file_id: int, current_user: User = Depends(get_current_user)):
-    return await service.download_project_file(file_id)
+async def download_project_file(
+    file_id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    return await service.download_project_file(file_id, range_header, if_none_match, if_range)
+
+
+@router.get("/{file_id}/thumbnail")
+async def get_thumbnail(
+    file_id: int,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    return await service.download_derived_file(file_id, "thumbnail", if_none_match)
+
+
+@router.get("/{file_id}/preview")
+async def get_preview(
+    file_id: int,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    return await service.download_derived_file(file_id, "preview", if_none_match)
+
+
+@router.get("/{file_id}/download-url", response_model=DownloadUrlResponse)
+async def get_download_url(file_id: int, current_user: User = Depends(get_current_user)):
+    return await service.get_download_url(file_id)
 
 
 @router.delete("/{file_id}", status_code=204)
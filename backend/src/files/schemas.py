@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class FileResponse(BaseModel):
@@ -11,9 +11,55 @@ class FileResponse(BaseModel):
     object_name: str
     file_size: Optional[int] = None
     content_type: Optional[str] = None
+    sha256: Optional[str] = None
     file_type: str
+    preview_status: Optional[str] = None
     download_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    preview_url: Optional[str] = None
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class UploadUrlRequest(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    file_size: int = Field(gt=0)
+    content_type: Optional[str] = Field(None, max_length=100)
+    file_type: str = Field("attachment", pattern="^(attachment|submission)$")
+
+
+class UploadUrlResponse(BaseModel):
+    upload_id: str
+    url: str
+    fields: dict[str, str]
+    expires_in: int
+
+
+class DownloadUrlResponse(BaseModel):
+    url: str
+    expires_in: int
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    file_size: int = Field(gt=0)
+    content_type: Optional[str] = Field(None, max_length=100)
+    file_type: str = Field("attachment", pattern="^(attachment|submission)$")
+
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    filename: str
+    file_size: int
+    chunk_size: int
+    total_parts: int
+    received_parts: list[int]
+    expires_at: float
+
+
+class UploadPartResponse(BaseModel):
+    part_number: int
+    size: int
+    etag: str
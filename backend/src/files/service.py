@@ -1,15 +1,40 @@
-import io
+import asyncio
+import hashlib
+import logging
 import os
 import re
-from fastapi import HTTPException
-from fastapi.responses import StreamingResponse
+import secrets
+import time
+from functools import partial
+from typing import AsyncIterator, Optional
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
 from src.core.config import settings
-from src.core.minio_client import upload_file as minio_upload, delete_file as minio_delete, download_file as minio_download
+from src.core.minio_client import get_file_url, presigned_post
+from src.core.storage import (
+    storage, attachment_disposition, new_object_name, ObjectNotFound, StorageTimeout, UploadTooLarge,
+)
+from src.core.redis import cache_delete, acquire_flags
+from src.core.security import create_link_token, decode_token
 from src.files import repository
-from src.files.schemas import FileResponse
+from src.files.previews import PENDING, derived_object_names, is_previewable, preview_queue
+from src.files.streaming import MultipartFileStream
+from src.files.upload_store import (
+    upload_session_create, upload_session_get, upload_session_add_part, upload_session_delete,
+    upload_sessions_expired, pending_upload_create, pending_upload_get, pending_upload_claim,
+    pending_uploads_expired,
+)
+from src.files.zipstream import ZipEntry, archive_size, stream_zip
+from src.files.schemas import (
+    FileResponse, UploadUrlRequest, UploadUrlResponse, DownloadUrlResponse,
+    UploadSessionCreate, UploadSessionResponse, UploadPartResponse,
+)
+from src.projects.access import project_access_or_404
 from src.projects.models import ProjectFile
 from src.users.models import User, RoleEnum
 
+logger = logging.getLogger(__name__)
+
 ALLOWED_EXTENSIONS = {
     ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",
     ".txt", ".csv", ".zip", ".rar", ".7z",
@@ -30,73 +55,645 @@ def _get_bucket(file_type: str) -> str:
     return settings.MINIO_BUCKET_PROJECTS if file_type == "attachment" else settings.MINIO_BUCKET_SUBMISSIONS
 
 
-async def upload_project_file(project_id: int, user: User, file_content: bytes,
-                              filename: str, content_type: str | None,
-                              file_type: str) -> ProjectFile:
-    project = await repository.get_project_with_applications(project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+# Headroom for multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _too_large(limit: Optional[int] = None) -> HTTPException:
+    limit = limit or settings.MAX_FILE_SIZE
+    return HTTPException(status_code=413, detail=f"File too large (max {limit // 1024 // 1024}MB)")
+
+
+def _storage_unavailable() -> HTTPException:
+    return HTTPException(status_code=503, detail="File storage is temporarily unavailable")
+
+
+def _presigned_mode() -> bool:
+    # Signed URLs only exist for MinIO; other storage backends always proxy
+    return settings.FILE_TRANSFER_MODE == "presigned" and settings.STORAGE_BACKEND == "minio"
 
-    is_owner = project.owner_id == user.id
-    applications = await project.applications.all()
-    is_applicant = any(a.applicant_id == user.id for a in applications)
 
-    if file_type == "attachment" and not (is_owner or user.role == RoleEnum.admin):
+async def _check_upload_access(project_id: int, user: User, file_type: str) -> None:
+    access = await project_access_or_404(project_id)
+    if access.can_upload(user, file_type):
+        return
+    if file_type == "attachment":
         raise HTTPException(status_code=403, detail="Only project owner can upload attachments")
-    if file_type == "submission" and not is_applicant:
-        raise HTTPException(status_code=403, detail="Only applicants can upload submissions")
+    raise HTTPException(status_code=403, detail="Only applicants can upload submissions")
 
+
+def _validated_filename(filename: str) -> str:
     safe_filename = sanitize_filename(filename)
     ext = os.path.splitext(safe_filename)[1].lower()
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail=f"File type '{ext}' not allowed")
-    if len(file_content) > settings.MAX_FILE_SIZE:
-        raise HTTPException(status_code=413, detail=f"File too large (max {settings.MAX_FILE_SIZE // 1024 // 1024}MB)")
+    return safe_filename
+
+
+async def _hash_stream(chunks: AsyncIterator[bytes], max_size: int) -> tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_size:
+            raise _too_large()
+        digest.update(chunk)
+    return size, digest.hexdigest()
+
+
+async def _stored_sha256(bucket: str, object_name: str) -> str:
+    """SHA-256 of an object assembled in storage, read back one chunk at a time.
 
+    Direct and resumable uploads never pass through us whole, so this is the
+    only way to key them by content.
+    """
+    digest = hashlib.sha256()
+    async for chunk in storage.stream(bucket, object_name, chunk_size=1024 * 1024):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def _record_blob_file(project_id: int, user: User, filename: str, content_type: Optional[str],
+                            file_type: str, bucket: str, object_name: str, size: int, sha256: str,
+                            preview_status: Optional[str]) -> ProjectFile:
+    """Reference the blob for `sha256`, keeping `object_name` only if the content is new.
+
+    Identical content already stored (or racing us in) keeps its one copy.
+    """
+    pf, stored = await repository.create_blob_file(
+        project_id, user.id, filename, content_type, file_type, bucket, sha256, size, object_name,
+        preview_status=preview_status,
+    )
+    if not stored:
+        await _remove_object(bucket, object_name)
+    return _queue_preview(pf)
+
+
+def _hash_mismatch() -> HTTPException:
+    return HTTPException(status_code=400, detail="Uploaded content does not match the declared SHA-256")
+
+
+async def _remove_object(bucket: str, object_name: str) -> None:
+    """Remove a stored object and any thumbnails/previews derived from it."""
+    for name in (object_name, *derived_object_names(object_name).values()):
+        try:
+            await storage.remove(bucket, name)
+        except Exception as e:
+            logger.warning(f"Could not remove {bucket}/{name} from storage: {e}")
+
+
+def _preview_status(filename: str) -> Optional[str]:
+    return PENDING if settings.PREVIEWS_ENABLED and is_previewable(filename) else None
+
+
+def _queue_preview(pf: ProjectFile) -> ProjectFile:
+    # Rendering happens in the background workers, never on the request path
+    if pf.preview_status == PENDING:
+        preview_queue.submit(pf.id)
+    return pf
+
+
+async def upload_project_file(project_id: int, user: User, request: Request,
+                              file_type: str, sha256: Optional[str] = None) -> ProjectFile:
+    """Stream the request's `file` part into MinIO; nothing is buffered beyond one upload part.
+
+    Permissions, the declared Content-Length and the extension are all checked
+    before any file data is read; the size limit is enforced again while streaming.
+
+    Storage is content-addressed: files with the same SHA-256 share one blob.
+    When the client declares the hash of content that is already stored, the
+    body is only hashed to prove it matches and the MinIO PUT is skipped.
+    """
+    await _check_upload_access(project_id, user, file_type)
+
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+        raise _too_large()
+
+    stream = MultipartFileStream(request)
+    filename, content_type = await stream.open()
+    safe_filename = _validated_filename(filename)
     bucket = _get_bucket(file_type)
-    object_name = minio_upload(bucket, file_content, safe_filename, content_type or "application/octet-stream")
+    sha256 = sha256.lower() if sha256 else None
+
+    if sha256 and await repository.get_blob(bucket, sha256):
+        _, digest = await _hash_stream(stream.chunks(), settings.MAX_FILE_SIZE)
+        if digest != sha256:
+            raise _hash_mismatch()
+        pf, _ = await repository.create_blob_file(
+            project_id, user.id, safe_filename, content_type, file_type, bucket, sha256, 0, object_name=None,
+            preview_status=_preview_status(safe_filename),
+        )
+        if pf is None:
+            raise HTTPException(status_code=409, detail="Stored copy was removed meanwhile; upload again")
+        return _queue_preview(pf)
+
+    object_name = new_object_name(safe_filename)
+    try:
+        size, digest = await storage.put_stream(
+            bucket, object_name, stream.chunks(),
+            content_type or "application/octet-stream", max_size=settings.MAX_FILE_SIZE,
+        )
+    except UploadTooLarge:
+        raise _too_large()
+    except StorageTimeout:
+        raise _storage_unavailable()
+    if sha256 and digest != sha256:
+        await _remove_object(bucket, object_name)
+        raise _hash_mismatch()
 
-    return await repository.create_file(
-        project_id, user.id, safe_filename, object_name, len(file_content), content_type, file_type,
+    return await _record_blob_file(project_id, user, safe_filename, content_type, file_type,
+                                   bucket, object_name, size, digest, _preview_status(safe_filename))
+
+
+# ── Presigned (direct-to-MinIO) transfers ──
+
+# How long after the URL is issued a direct upload can still be finalized
+FINALIZE_WINDOW = 300
+
+
+async def create_upload_url(project_id: int, user: User, data: UploadUrlRequest) -> UploadUrlResponse:
+    """Hand the browser a POST policy for one object; it then calls finalize_upload.
+
+    The policy pins the object key, content type and a size range, so MinIO itself
+    enforces the limit. The pending upload is remembered in Redis until finalized;
+    if it never is, run_upload_session_sweeper removes the object.
+    """
+    if not _presigned_mode():
+        raise HTTPException(status_code=400, detail="Direct uploads are disabled; upload through the API")
+    await _check_upload_access(project_id, user, data.file_type)
+    if data.file_size > settings.MAX_FILE_SIZE:
+        raise _too_large()
+    safe_filename = _validated_filename(data.filename)
+    content_type = data.content_type or "application/octet-stream"
+
+    bucket = _get_bucket(data.file_type)
+    object_name = new_object_name(safe_filename)
+    url, fields = presigned_post(bucket, object_name, settings.MAX_FILE_SIZE,
+                                 settings.PRESIGNED_URL_EXPIRY, content_type)
+    upload_id = secrets.token_urlsafe(24)
+    expires_at = time.time() + settings.PRESIGNED_URL_EXPIRY + FINALIZE_WINDOW
+    await pending_upload_create(upload_id, {
+        "project_id": project_id, "user_id": user.id, "filename": safe_filename,
+        "object_name": object_name, "content_type": content_type, "file_type": data.file_type,
+        "expires_at": expires_at,
+    }, expires_at, settings.PRESIGNED_URL_EXPIRY + FINALIZE_WINDOW + UPLOAD_SESSION_GRACE)
+    return UploadUrlResponse(upload_id=upload_id, url=url, fields=fields,
+                             expires_in=settings.PRESIGNED_URL_EXPIRY)
+
+
+async def finalize_upload(upload_id: str, user: User) -> ProjectFile:
+    """Record a direct upload once the object is actually in MinIO.
+
+    The pending upload is claimed (removed from Redis) before the row is created,
+    so concurrent finalize calls and the sweeper can't record or remove it twice.
+    """
+    not_found = HTTPException(status_code=404, detail="Upload not found or expired")
+    pending = await pending_upload_get(upload_id)
+    if not pending or pending["user_id"] != user.id or pending["expires_at"] < time.time():
+        raise not_found
+
+    bucket, object_name = _get_bucket(pending["file_type"]), pending["object_name"]
+    try:
+        stat = await storage.stat(bucket, object_name)
+    except StorageTimeout:
+        raise _storage_unavailable()
+    except Exception:
+        raise HTTPException(status_code=400, detail="File has not been uploaded yet")
+
+    if not await pending_upload_claim(upload_id):
+        raise not_found
+    try:
+        # Membership may have changed since the URL was issued
+        await _check_upload_access(pending["project_id"], user, pending["file_type"])
+        if stat.size > settings.MAX_FILE_SIZE:
+            raise _too_large()
+        sha256 = await _stored_sha256(bucket, object_name)
+    except Exception as e:
+        # The claim is gone, so nothing else would ever remove this object
+        await _remove_object(bucket, object_name)
+        if isinstance(e, StorageTimeout):
+            raise _storage_unavailable()
+        raise
+
+    return await _record_blob_file(
+        pending["project_id"], user, pending["filename"], pending["content_type"], pending["file_type"],
+        bucket, object_name, stat.size, sha256, _preview_status(pending["filename"]),
     )
 
 
+async def sweep_pending_uploads(now: Optional[float] = None, limit: int = 100) -> int:
+    """Remove the objects of direct uploads that were never finalized; returns how many."""
+    cleaned = 0
+    for upload_id in await pending_uploads_expired(now or time.time(), limit):
+        pending = await pending_upload_claim(upload_id)
+        if not pending:
+            continue
+        await _remove_object(_get_bucket(pending["file_type"]), pending["object_name"])
+        cleaned += 1
+    return cleaned
+
+
+async def _get_file_or_404(file_id: int) -> ProjectFile:
+    pf = await repository.get_file_by_id(file_id)
+    if not pf:
+        raise HTTPException(status_code=404, detail="File not found")
+    return pf
+
+
+def _download_url(pf: ProjectFile) -> str:
+    return get_file_url(_get_bucket(pf.file_type), pf.object_name, settings.PRESIGNED_URL_EXPIRY,
+                        filename=pf.filename, content_type=pf.content_type)
+
+
+async def get_download_url(file_id: int) -> DownloadUrlResponse:
+    if not _presigned_mode():
+        raise HTTPException(status_code=400, detail="Direct downloads are disabled; use the download endpoint")
+    pf = await _get_file_or_404(file_id)
+    return DownloadUrlResponse(url=_download_url(pf), expires_in=settings.PRESIGNED_URL_EXPIRY)
+
+
 async def list_project_files(project_id: int, file_type: str | None) -> list[FileResponse]:
     files = await repository.list_files(project_id, file_type)
     result = []
+    presigned = _presigned_mode()
     for f in files:
         data = FileResponse.model_validate(f)
         data.download_url = f"{settings.API_PREFIX}/files/{f.id}/download"
+        for kind, object_name in (("thumbnail", f.thumbnail_object), ("preview", f.preview_object)):
+            if object_name:
+                # Signed URLs let <img> load straight from storage; API paths need the auth header
+                url = (get_file_url(_get_bucket(f.file_type), object_name, settings.PRESIGNED_URL_EXPIRY)
+                       if presigned else f"{settings.API_PREFIX}/files/{f.id}/{kind}")
+                setattr(data, f"{kind}_url", url)
         result.append(data)
     return result
 
 
-async def download_project_file(file_id: int) -> StreamingResponse:
-    pf = await repository.get_file_by_id(file_id)
-    if not pf:
-        raise HTTPException(status_code=404, detail="File not found")
+async def download_derived_file(file_id: int, kind: str, if_none_match: Optional[str] = None) -> Response:
+    """Serve a file's WebP thumbnail or preview."""
+    pf = await _get_file_or_404(file_id)
+    object_name = pf.thumbnail_object if kind == "thumbnail" else pf.preview_object
+    if not object_name:
+        raise HTTPException(status_code=404, detail=f"No {kind} for this file")
+    bucket = _get_bucket(pf.file_type)
+    if _presigned_mode():
+        return RedirectResponse(get_file_url(bucket, object_name, settings.PRESIGNED_URL_EXPIRY), status_code=302)
+
+    try:
+        stat = await storage.stat(bucket, object_name)
+    except StorageTimeout:
+        raise _storage_unavailable()
+    except Exception:
+        raise HTTPException(status_code=404, detail=f"No {kind} for this file")
+    etag = f'"{stat.etag}"'
+    # Derived objects are immutable for a given name, so clients may cache them
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    headers["Content-Length"] = str(stat.size)
+    return StreamingResponse(storage.stream(bucket, object_name), media_type="image/webp", headers=headers)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """Parse a single `bytes=` range into inclusive (start, end).
+
+    Returns None when the whole object should be sent (no header, or several
+    ranges, which we don't serve as multipart/byteranges); raises 416 when the
+    range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_s, _, end_s = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_s:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+        else:
+            start, end = size - int(end_s), size - 1  # suffix: the last N bytes
+    except ValueError:
+        return None
+    start, end = max(start, 0), min(end, size - 1)
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+async def download_project_file(file_id: int, range_header: Optional[str] = None,
+                                if_none_match: Optional[str] = None,
+                                if_range: Optional[str] = None) -> Response:
+    """Stream a file straight from MinIO, honouring Range (206) and If-None-Match (304).
+
+    In presigned mode the client is redirected to MinIO instead, which serves
+    ranges and conditional requests itself.
+    """
+    pf = await _get_file_or_404(file_id)
+    if _presigned_mode():
+        return RedirectResponse(_download_url(pf), status_code=302)
 
     bucket = _get_bucket(pf.file_type)
     try:
-        file_data = minio_download(bucket, pf.object_name)
+        stat = await storage.stat(bucket, pf.object_name)
+    except StorageTimeout:
+        raise _storage_unavailable()
     except Exception:
         raise HTTPException(status_code=404, detail="File not found in storage")
 
+    etag = f'"{stat.etag}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": attachment_disposition(pf.filename),
+    }
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    size = stat.size
+    byte_range = parse_range(range_header, size) if (not if_range or if_range == etag) else None
     content_type = pf.content_type or "application/octet-stream"
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(storage.stream(bucket, pf.object_name), media_type=content_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
     return StreamingResponse(
-        io.BytesIO(file_data),
-        media_type=content_type,
-        headers={"Content-Disposition": f'attachment; filename="{pf.filename}"'},
+        storage.stream(bucket, pf.object_name, offset=start, length=end - start + 1),
+        status_code=206, media_type=content_type, headers=headers,
     )
 
 
+def _archive_name(name: str, taken: set[str]) -> str:
+    stem, ext = os.path.splitext(name)
+    n = 1
+    while name in taken:
+        n += 1
+        name = f"{stem} ({n}){ext}"
+    taken.add(name)
+    return name
+
+
+async def _logged(chunks: AsyncIterator[bytes], project_id: int) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception as e:
+        # Headers are already sent; all we can do is cut the response short
+        logger.warning(f"Export of project {project_id} aborted: {e}")
+        raise
+
+
+async def _get_exportable_project(project_id: int, user: User):
+    project = await repository.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if project.owner_id != user.id and user.role != RoleEnum.admin:
+        raise HTTPException(status_code=403, detail="Only the project owner can export files")
+    return project
+
+
+async def create_export_url(project_id: int, user: User, file_type: str) -> DownloadUrlResponse:
+    """Signed export.zip link, so the browser downloads the archive natively instead of buffering it."""
+    await _get_exportable_project(project_id, user)
+    token = create_link_token(
+        {"sub": str(user.id), "project_id": project_id, "file_type": file_type}, settings.EXPORT_LINK_EXPIRY,
+    )
+    url = f"{settings.API_PREFIX}/files/project/{project_id}/export.zip?file_type={file_type}&token={token}"
+    return DownloadUrlResponse(url=url, expires_in=settings.EXPORT_LINK_EXPIRY)
+
+
+async def _export_link_user(token: str, project_id: int, file_type: str) -> User:
+    payload = decode_token(token)
+    if (payload.get("type") != "link" or payload.get("project_id") != project_id
+            or payload.get("file_type") != file_type):
+        raise HTTPException(status_code=401, detail="Invalid export link")
+    user = await User.filter(id=int(payload["sub"])).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    if user.is_blocked:
+        raise HTTPException(status_code=403, detail="Account is blocked")
+    return user
+
+
+async def export_project_files(project_id: int, token: str, file_type: str) -> StreamingResponse:
+    """Stream all of a project's submissions (or attachments) as one ZIP archive.
+
+    The archive is built on the fly from storage with stored (uncompressed)
+    entries, so memory use stays at one chunk whatever the total size, and the
+    exact Content-Length is known before the first byte is read. Authorized by
+    a link from `create_export_url`; ownership is checked again here.
+    """
+    user = await _export_link_user(token, project_id, file_type)
+    project = await _get_exportable_project(project_id, user)
+
+    bucket = _get_bucket(file_type)
+    entries, taken = [], set()
+    for pf in await repository.list_files_with_uploaders(project_id, file_type):
+        size = pf.file_size
+        if size is None:
+            try:
+                size = (await storage.stat(bucket, pf.object_name)).size
+            except StorageTimeout:
+                raise _storage_unavailable()
+            except Exception:
+                raise HTTPException(status_code=404, detail=f"File '{pf.filename}' not found in storage")
+        # Submissions are grouped by the student who sent them
+        name = f"{pf.uploader.username}/{pf.filename}" if file_type == "submission" else pf.filename
+        entries.append(ZipEntry(_archive_name(name, taken), size, pf.created_at,
+                                partial(storage.stream, bucket, pf.object_name)))
+
+    archive = f"{sanitize_filename(project.title)} - {file_type}s.zip"
+    headers = {
+        "Content-Length": str(archive_size(entries)),
+        "Content-Disposition": attachment_disposition(archive),
+    }
+    return StreamingResponse(_logged(stream_zip(entries), project_id), media_type="application/zip",
+                             headers=headers)
+
+
 async def delete_project_file(file_id: int, user: User) -> None:
-    pf = await repository.get_file_by_id(file_id)
-    if not pf:
-        raise HTTPException(status_code=404, detail="File not found")
+    pf = await _get_file_or_404(file_id)
     if pf.uploader_id != user.id and user.role != RoleEnum.admin:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    bucket = _get_bucket(pf.file_type)
-    minio_delete(bucket, pf.object_name)
-    await repository.delete_file(pf)
+    object_name = await repository.delete_file(pf)
+    if object_name:
+        await _remove_object(_get_bucket(pf.file_type), object_name)
+
+
+async def delete_project_files(project_id: int) -> None:
+    """Release every file of a project before it is deleted, so blob ref counts stay exact."""
+    for pf in await repository.list_files(project_id):
+        object_name = await repository.delete_file(pf)
+        if object_name:
+            await _remove_object(_get_bucket(pf.file_type), object_name)
+
+
+# ── Resumable upload sessions ──
+# The client creates a session, PUTs numbered chunks (each one a storage multipart
+# part, so a dropped connection only costs the chunk in flight), checks which parts
+# arrived, then completes. Sessions live in Redis; abandoned ones are aborted by
+# run_upload_session_sweeper once they expire.
+
+UPLOAD_SESSION_GRACE = 3600  # session data outlives its expiry so the sweeper can still abort it
+
+
+def _session_response(session_id: str, session: dict, parts: dict[int, dict]) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        upload_id=session_id, filename=session["filename"], file_size=session["file_size"],
+        chunk_size=session["chunk_size"], total_parts=session["total_parts"],
+        received_parts=sorted(parts), expires_at=session["expires_at"],
+    )
+
+
+async def _get_session(session_id: str, user: User) -> tuple[dict, dict[int, dict]]:
+    session, parts = await upload_session_get(session_id)
+    # Past expires_at the data only lingers for the sweeper to abort it
+    if not session or session["user_id"] != user.id or session["expires_at"] < time.time():
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    return session, parts
+
+
+async def create_upload_session(project_id: int, user: User, data: UploadSessionCreate) -> UploadSessionResponse:
+    await _check_upload_access(project_id, user, data.file_type)
+    if data.file_size > settings.MAX_RESUMABLE_FILE_SIZE:
+        raise _too_large(settings.MAX_RESUMABLE_FILE_SIZE)
+    safe_filename = _validated_filename(data.filename)
+    content_type = data.content_type or "application/octet-stream"
+
+    bucket = _get_bucket(data.file_type)
+    object_name = new_object_name(safe_filename)
+    try:
+        storage_upload_id = await storage.create_multipart(bucket, object_name, content_type)
+    except StorageTimeout:
+        raise _storage_unavailable()
+
+    chunk_size = settings.UPLOAD_CHUNK_SIZE
+    session_id = secrets.token_urlsafe(24)
+    session = {
+        "user_id": user.id, "project_id": project_id, "file_type": data.file_type,
+        "filename": safe_filename, "content_type": content_type, "file_size": data.file_size,
+        "bucket": bucket, "object_name": object_name, "storage_upload_id": storage_upload_id,
+        "chunk_size": chunk_size, "total_parts": -(-data.file_size // chunk_size),
+        "expires_at": time.time() + settings.UPLOAD_SESSION_TTL,
+    }
+    await upload_session_create(session_id, session, session["expires_at"],
+                                settings.UPLOAD_SESSION_TTL + UPLOAD_SESSION_GRACE)
+    return _session_response(session_id, session, {})
+
+
+async def get_upload_session(session_id: str, user: User) -> UploadSessionResponse:
+    session, parts = await _get_session(session_id, user)
+    return _session_response(session_id, session, parts)
+
+
+async def upload_session_part(session_id: str, part_number: int, user: User, request: Request) -> UploadPartResponse:
+    """Store one chunk as multipart part `part_number`; re-sending a part replaces it.
+
+    Only this chunk is held in memory (at most UPLOAD_CHUNK_SIZE bytes).
+    """
+    session, _ = await _get_session(session_id, user)
+    total, chunk_size = session["total_parts"], session["chunk_size"]
+    if not 1 <= part_number <= total:
+        raise HTTPException(status_code=400, detail=f"Part number must be between 1 and {total}")
+    expected = chunk_size if part_number < total else session["file_size"] - chunk_size * (total - 1)
+    wrong_size = HTTPException(status_code=400, detail=f"Part {part_number} must be exactly {expected} bytes")
+
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) != expected:
+        raise wrong_size
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > expected:
+            raise wrong_size
+    if len(body) != expected:
+        raise wrong_size
+
+    try:
+        etag = await storage.upload_part(session["bucket"], session["object_name"], session["storage_upload_id"],
+                                         part_number, bytes(body))
+    except ObjectNotFound:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    except StorageTimeout:
+        raise _storage_unavailable()
+    ttl = max(int(session["expires_at"] - time.time()), 0) + UPLOAD_SESSION_GRACE
+    await upload_session_add_part(session_id, part_number, {"etag": etag, "size": expected}, ttl)
+    return UploadPartResponse(part_number=part_number, size=expected, etag=etag)
+
+
+async def complete_upload_session(session_id: str, user: User) -> ProjectFile:
+    session, parts = await _get_session(session_id, user)
+    missing = [n for n in range(1, session["total_parts"] + 1) if n not in parts]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing parts: {missing[:20]}")
+    try:
+        # Membership may have changed while the parts were uploading
+        await _check_upload_access(session["project_id"], user, session["file_type"])
+    except HTTPException:
+        await abort_upload_session(session_id, user)
+        raise
+    if not (await acquire_flags([f"upload_session:{session_id}:completing"], 60))[0]:
+        raise HTTPException(status_code=409, detail="Upload is already being completed")
+
+    bucket, object_name = session["bucket"], session["object_name"]
+    try:
+        await storage.complete_multipart(bucket, object_name, session["storage_upload_id"],
+                                         [(n, parts[n]["etag"]) for n in sorted(parts)])
+        stat = await storage.stat(bucket, object_name)
+        sha256 = await _stored_sha256(bucket, object_name) if stat.size == session["file_size"] else None
+    except Exception as e:
+        await cache_delete(f"upload_session:{session_id}:completing")  # let the client retry
+        if isinstance(e, StorageTimeout):
+            raise _storage_unavailable()
+        raise
+    if stat.size != session["file_size"]:
+        await _remove_object(bucket, object_name)
+        await upload_session_delete(session_id)
+        raise HTTPException(status_code=400, detail="Assembled file size does not match the session")
+
+    filename = session["filename"]
+    pf = await _record_blob_file(
+        session["project_id"], user, filename, session["content_type"], session["file_type"],
+        bucket, object_name, stat.size, sha256,
+        # Previews read the whole original into memory, so oversize resumable uploads skip them
+        _preview_status(filename) if stat.size <= settings.MAX_FILE_SIZE else None,
+    )
+    await upload_session_delete(session_id)
+    return pf
+
+
+async def abort_upload_session(session_id: str, user: User) -> None:
+    session, _ = await _get_session(session_id, user)
+    if await upload_session_delete(session_id):
+        await storage.abort_multipart(session["bucket"], session["object_name"], session["storage_upload_id"])
+
+
+async def sweep_upload_sessions(now: Optional[float] = None, limit: int = 100) -> int:
+    """Abort the storage-side uploads of expired sessions; returns how many were cleaned up."""
+    cleaned = 0
+    for session_id in await upload_sessions_expired(now or time.time(), limit):
+        session, _ = await upload_session_get(session_id)
+        if not await upload_session_delete(session_id) or not session:
+            continue
+        try:
+            await storage.abort_multipart(session["bucket"], session["object_name"], session["storage_upload_id"])
+            cleaned += 1
+        except Exception as e:
+            logger.warning(f"Aborting expired upload session {session_id} failed: {e}")
+    return cleaned
+
+
+async def run_upload_session_sweeper():
+    """Background loop started from the app lifespan; also clears unfinalized direct uploads."""
+    while True:
+        try:
+            await sweep_upload_sessions()
+            await sweep_pending_uploads()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Upload session sweeper error: {e}")
+        await asyncio.sleep(settings.UPLOAD_SESSION_SWEEP_INTERVAL)
@@ -0,0 +1,97 @@
+"""Incremental multipart parsing for uploads that go straight to object storage.
+
+FastAPI's `UploadFile` only reaches the endpoint after the whole body has been
+received and spooled. `MultipartFileStream` instead parses the request body as
+it arrives, so the file part's headers (name, content type) are known before any
+of its data has been read, and its bytes can be forwarded chunk by chunk.
+"""
+from collections import deque
+from typing import AsyncIterator, Optional
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+
+class MultipartFileStream:
+    def __init__(self, request: Request, field_name: str = "file"):
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+        self.field_name = field_name
+        self._body = request.stream().__aiter__()
+        self._finished = False
+        self._events: deque = deque()
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    # ── Parser callbacks ──
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self):
+        self._events.append(("part", self._headers))
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        self._events.append(("data", bytes(data[start:end])))
+
+    def _on_part_end(self):
+        self._events.append(("end", None))
+
+    # ── Reading ──
+
+    async def _next_event(self) -> Optional[tuple]:
+        while not self._events:
+            if self._finished:
+                return None
+            try:
+                chunk = await self._body.__anext__()
+            except StopAsyncIteration:
+                self._parser.finalize()
+                self._finished = True
+                continue
+            self._parser.write(chunk)
+        return self._events.popleft()
+
+    async def open(self) -> tuple[str, Optional[str]]:
+        """Advance to the file part; returns its (filename, content_type)."""
+        while True:
+            event = await self._next_event()
+            if event is None:
+                raise HTTPException(status_code=400, detail=f"Missing '{self.field_name}' file field")
+            kind, headers = event
+            if kind != "part":
+                continue
+            _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+            if disposition.get(b"name", b"").decode() == self.field_name and b"filename" in disposition:
+                content_type = headers.get(b"content-type")
+                return (disposition[b"filename"].decode("utf-8", "replace"),
+                        content_type.decode() if content_type else None)
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Bytes of the current file part, as they arrive from the client."""
+        while True:
+            event = await self._next_event()
+            if event is None or event[0] == "end":
+                return
+            if event[0] == "data" and event[1]:
+                yield event[1]
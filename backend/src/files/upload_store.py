@@ -0,0 +1,106 @@
+"""Redis persistence for in-progress uploads: resumable sessions and pending direct uploads."""
+import json
+from typing import Optional
+from src.core.redis import get_redis
+
+
+# ── Upload sessions ──────────────────────────────────
+# A resumable upload is a JSON session plus a hash of received parts
+# (part number -> JSON), both expiring a grace period after the session itself.
+# A sorted set scored by session expiry lets the sweeper find abandoned sessions
+# while their data is still readable, so it can abort the storage-side upload.
+
+UPLOAD_SESSIONS_BY_EXPIRY = "upload_sessions:expiry"
+
+
+def _upload_session_key(session_id: str) -> str:
+    return f"upload_session:{session_id}"
+
+
+def _upload_parts_key(session_id: str) -> str:
+    return f"upload_session:{session_id}:parts"
+
+
+async def upload_session_create(session_id: str, data: dict, expires_at: float, ttl: int):
+    r = await get_redis()
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.set(_upload_session_key(session_id), json.dumps(data), ex=ttl)
+        pipe.zadd(UPLOAD_SESSIONS_BY_EXPIRY, {session_id: expires_at})
+        await pipe.execute()
+
+
+async def upload_session_get(session_id: str) -> tuple[Optional[dict], dict[int, dict]]:
+    """The session (None if unknown or expired) and its received parts by number."""
+    r = await get_redis()
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.get(_upload_session_key(session_id))
+        pipe.hgetall(_upload_parts_key(session_id))
+        raw, parts = await pipe.execute()
+    if raw is None:
+        return None, {}
+    return json.loads(raw), {int(n): json.loads(v) for n, v in parts.items()}
+
+
+async def upload_session_add_part(session_id: str, part_number: int, info: dict, ttl: int):
+    r = await get_redis()
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.hset(_upload_parts_key(session_id), str(part_number), json.dumps(info))
+        pipe.expire(_upload_parts_key(session_id), ttl)
+        await pipe.execute()
+
+
+async def upload_session_delete(session_id: str) -> bool:
+    """Remove a session; True only for the caller that actually removed it."""
+    r = await get_redis()
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.zrem(UPLOAD_SESSIONS_BY_EXPIRY, session_id)
+        pipe.delete(_upload_session_key(session_id), _upload_parts_key(session_id))
+        removed, _ = await pipe.execute()
+    return bool(removed)
+
+
+async def upload_sessions_expired(now: float, limit: int) -> list[str]:
+    r = await get_redis()
+    return await r.zrangebyscore(UPLOAD_SESSIONS_BY_EXPIRY, "-inf", now, start=0, num=limit)
+
+
+# ── Pending direct uploads ───────────────────────────
+# A presigned upload is remembered as JSON until it is finalized. As with upload
+# sessions, a sorted set scored by the finalize deadline lets the sweeper find
+# uploads that were never finalized and remove their objects. Claiming is a
+# GETDEL, so finalize and the sweeper can never both act on the same upload.
+
+PENDING_UPLOADS_BY_EXPIRY = "file_uploads:expiry"
+
+
+def _pending_upload_key(upload_id: str) -> str:
+    return f"file_upload:{upload_id}"
+
+
+async def pending_upload_create(upload_id: str, data: dict, expires_at: float, ttl: int):
+    r = await get_redis()
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.set(_pending_upload_key(upload_id), json.dumps(data), ex=ttl)
+        pipe.zadd(PENDING_UPLOADS_BY_EXPIRY, {upload_id: expires_at})
+        await pipe.execute()
+
+
+async def pending_upload_get(upload_id: str) -> Optional[dict]:
+    r = await get_redis()
+    raw = await r.get(_pending_upload_key(upload_id))
+    return json.loads(raw) if raw else None
+
+
+async def pending_upload_claim(upload_id: str) -> Optional[dict]:
+    """Remove a pending upload and return it; None for every caller but the first."""
+    r = await get_redis()
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.getdel(_pending_upload_key(upload_id))
+        pipe.zrem(PENDING_UPLOADS_BY_EXPIRY, upload_id)
+        raw, _ = await pipe.execute()
+    return json.loads(raw) if raw else None
+
+
+async def pending_uploads_expired(now: float, limit: int) -> list[str]:
+    r = await get_redis()
+    return await r.zrangebyscore(PENDING_UPLOADS_BY_EXPIRY, "-inf", now, start=0, num=limit)
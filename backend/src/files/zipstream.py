@@ -0,0 +1,118 @@
+"""Streaming ZIP archives of stored (uncompressed) entries.
+
+Entries are written as their bytes arrive, so building an archive holds no more
+than one chunk in memory whatever its total size. Because entries are stored,
+not deflated, the archive's exact length follows from the entry names and sizes
+alone (`archive_size`) and can be sent as Content-Length before any data is read.
+
+Sizes are known up front and go into each local header; the CRC is only known
+after the data, so it follows in a data descriptor (general purpose flag bit 3).
+Entries or offsets past 4 GiB switch to ZIP64 records.
+"""
+import struct
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Callable
+
+ZIP32_LIMIT = 0xFFFFFFFF
+ZIP32_MAX_ENTRIES = 0xFFFF
+
+_FLAGS = 0x0008 | 0x0800  # data descriptor follows the data; names are UTF-8
+_STORED = 0
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_DESCRIPTOR = struct.Struct("<IIII")
+_DESCRIPTOR64 = struct.Struct("<IIQQ")
+_END = struct.Struct("<IHHHHIIH")
+_END64 = struct.Struct("<IQHHIIQQQQ")
+_END64_LOCATOR = struct.Struct("<IIQI")
+
+
+@dataclass
+class ZipEntry:
+    name: str
+    size: int
+    modified: datetime
+    # Called when the entry is written; yields exactly `size` bytes
+    open: Callable[[], AsyncIterator[bytes]]
+
+
+def _dos_time(dt: datetime) -> tuple[int, int]:
+    if dt.year < 1980:
+        return 0, (1 << 5) | 1  # 1980-01-01, the earliest DOS date
+    return ((dt.hour << 11) | (dt.minute << 5) | (dt.second // 2),
+            ((dt.year - 1980) << 9) | (dt.month << 5) | dt.day)
+
+
+def _layout(entries: list[ZipEntry]) -> tuple[list[int], int, int]:
+    """Offsets of each local header, plus the central directory's offset and size."""
+    offsets, offset, cd_size = [], 0, 0
+    for entry in entries:
+        name_len = len(entry.name.encode())
+        zip64 = entry.size >= ZIP32_LIMIT or offset >= ZIP32_LIMIT
+        offsets.append(offset)
+        offset += (_LOCAL_HEADER.size + name_len + (20 if zip64 else 0) + entry.size
+                   + (_DESCRIPTOR64.size if zip64 else _DESCRIPTOR.size))
+        cd_size += _CENTRAL_HEADER.size + name_len + (28 if zip64 else 0)
+    return offsets, offset, cd_size
+
+
+def _needs_zip64_end(count: int, cd_offset: int, cd_size: int) -> bool:
+    return count >= ZIP32_MAX_ENTRIES or cd_offset >= ZIP32_LIMIT or cd_size >= ZIP32_LIMIT
+
+
+def archive_size(entries: list[ZipEntry]) -> int:
+    _, cd_offset, cd_size = _layout(entries)
+    end = _END.size
+    if _needs_zip64_end(len(entries), cd_offset, cd_size):
+        end += _END64.size + _END64_LOCATOR.size
+    return cd_offset + cd_size + end
+
+
+async def stream_zip(entries: list[ZipEntry]) -> AsyncIterator[bytes]:
+    """Yield the archive; raises ValueError if an entry's data doesn't match its declared size."""
+    offsets, cd_offset, cd_size = _layout(entries)
+    central = []
+    for entry, offset in zip(entries, offsets):
+        name = entry.name.encode()
+        zip64 = entry.size >= ZIP32_LIMIT or offset >= ZIP32_LIMIT
+        version = 45 if zip64 else 20
+        dos_time, dos_date = _dos_time(entry.modified)
+        size32 = ZIP32_LIMIT if zip64 else entry.size
+        extra = struct.pack("<HHQQ", 0x0001, 16, entry.size, entry.size) if zip64 else b""
+        yield _LOCAL_HEADER.pack(0x04034B50, version, _FLAGS, _STORED, dos_time, dos_date,
+                                 0, size32, size32, len(name), len(extra)) + name + extra
+
+        crc, written = 0, 0
+        async for chunk in entry.open():
+            written += len(chunk)
+            if written > entry.size:
+                break
+            crc = zlib.crc32(chunk, crc)
+            yield chunk
+        if written != entry.size:
+            # The length is already promised to the client; a short archive must not look complete
+            raise ValueError(f"{entry.name}: stored object does not match its {entry.size} byte size")
+
+        if zip64:
+            yield _DESCRIPTOR64.pack(0x08074B50, crc, entry.size, entry.size)
+            cd_extra = struct.pack("<HHQQQ", 0x0001, 24, entry.size, entry.size, offset)
+        else:
+            yield _DESCRIPTOR.pack(0x08074B50, crc, entry.size, entry.size)
+            cd_extra = b""
+        central.append(_CENTRAL_HEADER.pack(
+            0x02014B50, version, version, _FLAGS, _STORED, dos_time, dos_date, crc, size32, size32,
+            len(name), len(cd_extra), 0, 0, 0, 0, ZIP32_LIMIT if zip64 else offset,
+        ) + name + cd_extra)
+
+    yield b"".join(central)
+    count = len(entries)
+    if _needs_zip64_end(count, cd_offset, cd_size):
+        end64_offset = cd_offset + cd_size
+        yield _END64.pack(0x06064B50, _END64.size - 12, 45, 45, 0, 0, count, count, cd_size, cd_offset)
+        yield _END64_LOCATOR.pack(0x07064B50, 0, end64_offset, 1)
+        yield _END.pack(0x06054B50, 0, 0, min(count, ZIP32_MAX_ENTRIES), min(count, ZIP32_MAX_ENTRIES),
+                        min(cd_size, ZIP32_LIMIT), min(cd_offset, ZIP32_LIMIT), 0)
+    else:
+        yield _END.pack(0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0)
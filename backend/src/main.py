@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -7,7 +8,15 @@ from src.core.config import settings
 from src.database.postgres import init_postgres, close_postgres
 from src.database.mongodb import init_mongodb, close_mongodb
 from src.core.redis import close_redis
-from src.core.minio_client import init_minio
+from src.core.storage import storage, BUCKETS
+from src.core.activity import activity_writer
+from src.core.mailer import smtp_pool, run_email_worker
+from src.notifications.push import hub as notification_hub
+from src.notifications.service import run_unread_counter_reconciler
+from src.notifications.digest import run_digest_scheduler
+from src.files.previews import preview_queue, run_preview_sweeper
+from src.files.service import run_upload_session_sweeper
+from src.projects.recommendations import run_recommendation_refresher
 
 from src.auth.router import router as auth_router
 from src.users.router import router as users_router
@@ -35,14 +44,35 @@ async def lifespan(app: FastAPI):
     await init_mongodb()
     logger.info("MongoDB initialized")
     try:
-        init_minio()
-        logger.info("MinIO initialized")
+        await storage.ensure_buckets(BUCKETS)
+        logger.info(f"Object storage initialized ({settings.STORAGE_BACKEND})")
     except Exception as e:
-        logger.warning(f"MinIO init warning: {e}")
+        logger.warning(f"Object storage init warning: {e}")
+    activity_writer.start()
+    background = [
+        asyncio.create_task(run_email_worker()),
+        asyncio.create_task(run_digest_scheduler()),
+        asyncio.create_task(run_upload_session_sweeper()),
+    ]
+    if settings.UNREAD_RECONCILE_INTERVAL > 0:
+        background.append(asyncio.create_task(run_unread_counter_reconciler()))
+    if settings.PREVIEWS_ENABLED:
+        background.append(asyncio.create_task(run_preview_sweeper()))
+    if settings.RECOMMENDATION_REFRESH_INTERVAL > 0:
+        background.append(asyncio.create_task(run_recommendation_refresher()))
     yield
+    for task in background:
+        task.cancel()
+    # Let every loop unwind (e.g. an email batch mid-delivery) before the pools go away
+    await asyncio.gather(*background, return_exceptions=True)
+    await preview_queue.stop()
+    await smtp_pool.close()
+    await notification_hub.close()
+    await activity_writer.stop()
     await close_postgres()
     await close_mongodb()
     await close_redis()
+    storage.close()
     logger.info("Shutdown complete")
 
 
@@ -0,0 +1,70 @@
+"""Hourly and daily notification digests for users who opted out of instant email.
+
+Each period is claimed once across workers with a Redis flag, and covers the
+previous full hour/day (UTC): subscribers are paged from Postgres and their
+unread notifications for that window are aggregated per user in one Mongo query
+per page, then sent as a single templated email each.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from src.core.config import settings
+from src.core.email import send_digest_email
+from src.core.redis import acquire_flags
+from src.notifications import repository
+from src.users.models import User, EmailFrequency
+
+logger = logging.getLogger(__name__)
+
+DIGEST_PERIODS = {EmailFrequency.hourly: 3600, EmailFrequency.daily: 86400}
+
+
+def wants_instant_email(user: User) -> bool:
+    """Per-event emails go only to users on instant delivery; the rest get them in their digest."""
+    return user.email_frequency == EmailFrequency.instant
+
+
+async def send_digests(frequency: EmailFrequency, now: Optional[datetime] = None) -> int:
+    """Send the digest for the last completed period if no worker has yet; returns emails sent."""
+    period = DIGEST_PERIODS[frequency]
+    now = now or datetime.now(timezone.utc)
+    end_ts = int(now.timestamp()) // period * period
+    [claimed] = await acquire_flags([f"email:digest:{frequency.value}:{end_ts}"], period * 2)
+    if not claimed:
+        return 0
+
+    end = datetime.fromtimestamp(end_ts, timezone.utc)
+    start = end - timedelta(seconds=period)
+    sent = 0
+    last_id = 0
+    while True:
+        users = await (
+            User.filter(email_frequency=frequency, is_active=True, is_blocked=False, id__gt=last_id)
+            .order_by("id").limit(settings.EMAIL_DIGEST_USER_BATCH)
+            .values("id", "email", "username")
+        )
+        if not users:
+            break
+        last_id = users[-1]["id"]
+        by_id = {u["id"]: u for u in users}
+        rows = await repository.aggregate_digest(list(by_id), start, end, settings.EMAIL_DIGEST_MAX_ITEMS)
+        for row in rows:
+            user = by_id[row["_id"]]
+            await send_digest_email(user["email"], user["username"], frequency.value,
+                                    row["total"], row["items"], str(end_ts))
+            sent += 1
+    if sent:
+        logger.info(f"Sent {sent} {frequency.value} digest(s) for {start:%Y-%m-%d %H:%M}")
+    return sent
+
+
+async def run_digest_scheduler():
+    """Background loop started from the app lifespan."""
+    while True:
+        for frequency in DIGEST_PERIODS:
+            try:
+                await send_digests(frequency)
+            except Exception as e:
+                logger.warning(f"{frequency.value.capitalize()} digest failed: {e}")
+        await asyncio.sleep(settings.EMAIL_DIGEST_CHECK_INTERVAL)
@@ -0,0 +1,85 @@
+"""Per-worker fan-out of notification events to connected WebSockets.
+
+Every worker holds a single Redis pub/sub connection and subscribes to
+`notifications:{user_id}` only while that user has at least one socket open on
+the worker, so one subscription serves every connected tab and device.
+"""
+import asyncio
+import json
+import logging
+from typing import Optional
+from fastapi import WebSocket
+from redis.asyncio.client import PubSub
+from src.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def user_channel(user_id: int) -> str:
+    return f"notifications:{user_id}"
+
+
+class NotificationHub:
+    def __init__(self):
+        self.active: dict[int, set[WebSocket]] = {}
+        self._pubsub: Optional[PubSub] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self, user_id: int, ws: WebSocket):
+        async with self._lock:
+            sockets = self.active.setdefault(user_id, set())
+            sockets.add(ws)
+            if len(sockets) == 1:
+                if self._pubsub is None:
+                    self._pubsub = (await get_redis()).pubsub()
+                await self._pubsub.subscribe(user_channel(user_id))
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read_loop())
+
+    async def disconnect(self, user_id: int, ws: WebSocket):
+        async with self._lock:
+            sockets = self.active.get(user_id)
+            if not sockets:
+                return
+            sockets.discard(ws)
+            if not sockets:
+                del self.active[user_id]
+                if self._pubsub is not None:
+                    await self._pubsub.unsubscribe(user_channel(user_id))
+
+    async def send_local(self, user_id: int, event: dict):
+        for ws in list(self.active.get(user_id, ())):
+            try:
+                await ws.send_json(event)
+            except Exception:
+                pass
+
+    async def _read_loop(self):
+        while True:
+            try:
+                if not self._pubsub or not self._pubsub.subscribed:
+                    await asyncio.sleep(0.5)
+                    continue
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not message or message["type"] != "message":
+                    continue
+                user_id = int(message["channel"].rsplit(":", 1)[1])
+                await self.send_local(user_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Notification hub read error: {e}")
+                await asyncio.sleep(1.0)
+
+    async def close(self):
+        if self._reader:
+            self._reader.cancel()
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+        self.active.clear()
+
+
+hub = NotificationHub()
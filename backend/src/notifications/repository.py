@@ -1,45 +1,195 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+import logging
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from src.database.mongodb import get_mongodb
 
+logger = logging.getLogger(__name__)
 
-async def insert_notification(user_id: int, title: str, message: str,
-                              notification_type: str, link: str | None) -> None:
+_SLICE_REST = 2 ** 31 - 1  # $slice count meaning "everything after the position"
+
+
+async def insert_notifications(user_ids: list[int], title: str, message: str,
+                               notification_type: str, link: str | None) -> list[dict]:
+    """Insert one notification per user; returns only the documents that were written."""
     db = await get_mongodb()
-    doc = {
+    now = datetime.now(timezone.utc)
+    docs = [{
         "user_id": user_id,
         "title": title,
         "message": message,
         "is_read": False,
         "notification_type": notification_type,
         "link": link,
-        "created_at": datetime.now(timezone.utc),
+        "created_at": now,
+        "latest_at": now,
+    } for user_id in user_ids]
+    try:
+        await db.notifications.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        failed = {err["index"] for err in e.details.get("writeErrors", [])}
+        logger.warning(f"Failed to insert {len(failed)} of {len(docs)} notifications")
+        docs = [d for i, d in enumerate(docs) if i not in failed]
+    return docs
+
+
+async def upsert_grouped_notification(user_id: int, group_key: str, title: str, message: str,
+                                      notification_type: str, link: str | None,
+                                      window_seconds: int) -> tuple[dict, bool]:
+    """Fold an event into the user's open (unread, recent) group, or start a new one.
+
+    A group is open while it carries `open: True`; reading it or letting it go
+    quiet for `window_seconds` closes it. A unique partial index allows one open
+    group per (user, key), so concurrent events cannot open two.
+
+    Returns (document, created).
+    """
+    db = await get_mongodb()
+    now = datetime.now(timezone.utc)
+    await db.notifications.update_many(
+        {"user_id": user_id, "group_key": group_key, "open": True,
+         "latest_at": {"$lt": now - timedelta(seconds=window_seconds)}},
+        {"$unset": {"open": ""}},
+    )
+    query = {"user_id": user_id, "group_key": group_key, "open": True}
+    update = {
+        "$set": {
+            "title": title,
+            "message": message,
+            "notification_type": notification_type,
+            "link": link,
+            "latest_at": now,
+        },
+        "$inc": {"count": 1},
+        "$setOnInsert": {"is_read": False, "created_at": now},
     }
-    await db.notifications.insert_one(doc)
+    try:
+        doc = await db.notifications.find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # A concurrent event opened the group first — fold into it
+        doc = await db.notifications.find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.AFTER,
+        )
+    return doc, doc["count"] == 1
+
 
+async def find_notifications(user_id: int, unread_only: bool, skip: int, limit: int,
+                             before: tuple[datetime, ObjectId] | None = None) -> list[dict]:
+    """Newest activity first: a group bumped by a new event moves back to the top.
 
-async def find_notifications(user_id: int, unread_only: bool,
-                             skip: int, limit: int) -> list[dict]:
+    `before` is the (latest_at, _id) of the last notification already seen.
+    """
     db = await get_mongodb()
     query: dict = {"user_id": user_id}
     if unread_only:
         query["is_read"] = False
-    cursor = db.notifications.find(query).sort("created_at", -1).skip(skip).limit(limit)
+    if before is not None:
+        latest_at, before_id = before
+        query["$or"] = [
+            {"latest_at": {"$lt": latest_at}},
+            {"latest_at": latest_at, "_id": {"$lt": before_id}},
+        ]
+    cursor = (db.notifications.find(query)
+              .sort([("latest_at", -1), ("_id", -1)])
+              .skip(skip).limit(limit))
     return [doc async for doc in cursor]
 
 
+async def get_sort_key(user_id: int, notification_id: ObjectId) -> tuple[datetime, ObjectId] | None:
+    db = await get_mongodb()
+    doc = await db.notifications.find_one({"_id": notification_id, "user_id": user_id}, {"latest_at": 1})
+    return (doc["latest_at"], doc["_id"]) if doc else None
+
+
+async def count_unread(user_id: int) -> int:
+    db = await get_mongodb()
+    return await db.notifications.count_documents({"user_id": user_id, "is_read": False})
+
+
+async def count_unread_many(user_ids: list[int]) -> dict[int, int]:
+    """Unread totals for several users in one aggregation; users with none map to 0."""
+    db = await get_mongodb()
+    counts = {user_id: 0 for user_id in user_ids}
+    cursor = db.notifications.aggregate([
+        {"$match": {"user_id": {"$in": list(user_ids)}, "is_read": False}},
+        {"$group": {"_id": "$user_id", "count": {"$sum": 1}}},
+    ])
+    async for row in cursor:
+        counts[row["_id"]] = row["count"]
+    return counts
+
+
+async def aggregate_digest(user_ids: list[int], start: datetime, end: datetime,
+                           per_user: int) -> list[dict]:
+    """Unread notifications raised or bumped in [start, end), grouped per user in one aggregation.
+
+    Each row is {"_id": user_id, "total": n, "items": [newest `per_user` notifications]};
+    a grouped notification counts once per collapsed event.
+    """
+    db = await get_mongodb()
+    window = {"$gte": start, "$lt": end}
+    cursor = db.notifications.aggregate([
+        {"$match": {"user_id": {"$in": list(user_ids)}, "is_read": False,
+                    "$or": [{"created_at": window}, {"latest_at": window}]}},
+        {"$sort": {"latest_at": -1, "_id": -1}},
+        {"$group": {
+            "_id": "$user_id",
+            "total": {"$sum": {"$ifNull": ["$count", 1]}},
+            "items": {"$push": {"title": "$title", "message": "$message", "link": "$link", "count": "$count"}},
+        }},
+        {"$project": {"total": 1, "items": {"$slice": ["$items", per_user]}}},
+    ])
+    return [row async for row in cursor]
+
+
 async def mark_read(notification_id: str, user_id: int) -> dict | None:
     db = await get_mongodb()
     return await db.notifications.find_one_and_update(
         {"_id": ObjectId(notification_id), "user_id": user_id, "is_read": False},
-        {"$set": {"is_read": True}},
+        {"$set": {"is_read": True, "read_at": datetime.now(timezone.utc)}, "$unset": {"open": ""}},
         return_document=True,
     )
 
 
+async def mark_many_read(notification_ids: list[ObjectId], user_id: int) -> int:
+    db = await get_mongodb()
+    result = await db.notifications.update_many(
+        {"_id": {"$in": notification_ids}, "user_id": user_id, "is_read": False},
+        {"$set": {"is_read": True, "read_at": datetime.now(timezone.utc)}, "$unset": {"open": ""}},
+    )
+    return result.modified_count
+
+
+async def trim_inboxes(user_ids: list[int], keep: int) -> dict[int, int]:
+    """Delete everything past each user's `keep` most recently active notifications.
+
+    One aggregation finds the excess for every user and one delete removes it.
+    Returns {user_id: unread notifications deleted} for users who lost any.
+    """
+    db = await get_mongodb()
+    cursor = db.notifications.aggregate([
+        {"$match": {"user_id": {"$in": list(user_ids)}}},
+        {"$sort": {"user_id": 1, "latest_at": -1, "_id": -1}},
+        {"$group": {"_id": "$user_id", "docs": {"$push": {"id": "$_id", "is_read": "$is_read"}}}},
+        {"$project": {"excess": {"$slice": ["$docs", keep, _SLICE_REST]}}},
+    ])
+    excess, deleted_unread = [], {}
+    async for row in cursor:
+        for doc in row["excess"]:
+            excess.append(doc["id"])
+            if not doc["is_read"]:
+                deleted_unread[row["_id"]] = deleted_unread.get(row["_id"], 0) + 1
+    if excess:
+        await db.notifications.delete_many({"_id": {"$in": excess}})
+    return deleted_unread
+
+
 async def mark_all_read(user_id: int) -> None:
     db = await get_mongodb()
     await db.notifications.update_many(
         {"user_id": user_id, "is_read": False},
-        {"$set": {"is_read": True}},
+        {"$set": {"is_read": True, "read_at": datetime.now(timezone.utc)}, "$unset": {"open": ""}},
     )
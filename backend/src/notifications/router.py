@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, Query
-from src.core.dependencies import get_current_user
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+from src.core.dependencies import get_current_user, authenticate_websocket
 from src.users.models import User
 from src.notifications import service
-from src.notifications.schemas import NotificationResponse, UnreadCountResponse
+from src.notifications.push import hub
+from src.notifications.schemas import NotificationResponse, UnreadCountResponse, MarkReadRequest
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
@@ -12,9 +14,10 @@ async def get_notifications(
     unread_only: bool = Query(False),
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    before: Optional[str] = Query(None, description="Return notifications older than this id"),
     current_user: User = Depends(get_current_user),
 ):
-    return await service.get_notifications(current_user.id, unread_only, page, size)
+    return await service.get_notifications(current_user.id, unread_only, page, size, before)
 
 
 @router.get("/unread-count", response_model=UnreadCountResponse)
@@ -27,6 +30,35 @@ async def mark_as_read(notification_id: str, current_user: User = Depends(get_cu
     return await service.mark_as_read(notification_id, current_user.id)
 
 
+@router.post("/read", response_model=UnreadCountResponse)
+async def mark_many_read(data: MarkReadRequest, current_user: User = Depends(get_current_user)):
+    return await service.mark_many_read(data.ids, current_user.id)
+
+
 @router.post("/read-all", status_code=204)
 async def mark_all_read(current_user: User = Depends(get_current_user)):
     await service.mark_all_read(current_user.id)
+
+
+@router.websocket("/ws")
+async def notifications_ws(ws: WebSocket):
+    """Server push for new notifications and unread-count changes.
+
+    Sends the current unread count on connect, then relays events published on
+    the user's channel. Clients only need to poll for occasional reconciliation.
+    """
+    await ws.accept()
+    user_id = await authenticate_websocket(ws)
+    if user_id is None:
+        return
+
+    await hub.connect(user_id, ws)
+    try:
+        unread = await service.get_unread_count(user_id)
+        await ws.send_json({"type": "unread_count", "count": unread.count})
+        while True:
+            await ws.receive_text()  # keepalive pings; nothing is accepted from clients
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await hub.disconnect(user_id, ws)
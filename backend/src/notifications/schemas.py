@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class NotificationResponse(BaseModel):
@@ -10,8 +10,14 @@ class NotificationResponse(BaseModel):
     is_read: bool
     notification_type: str = "info"
     link: Optional[str] = None
+    count: int = 1
     created_at: datetime
+    latest_at: Optional[datetime] = None
 
 
 class UnreadCountResponse(BaseModel):
     count: int
+
+
+class MarkReadRequest(BaseModel):
+    ids: list[str] = Field(..., min_length=1, max_length=100)
@@ -1,14 +1,125 @@
+import asyncio
+import logging
+from bson import ObjectId
+from bson.errors import InvalidId
 from fastapi import HTTPException
-from src.core.redis import incr_counter, get_counter, reset_counter, get_redis
+from src.core.config import settings
+from src.core.redis import (
+    incr_existing_counters, decr_counter_floor, get_counter_or_none, get_counters,
+    set_counter, compare_and_set_counter, scan_keys, publish_message, publish_messages,
+    acquire_flags, take_flags,
+)
 from src.notifications import repository
+from src.notifications.push import user_channel
 from src.notifications.schemas import NotificationResponse, UnreadCountResponse
 
+logger = logging.getLogger(__name__)
+
+
+def _unread_key(user_id: int) -> str:
+    return f"unread:{user_id}"
+
+
+def _stale_key(user_id: int) -> str:
+    # Outside unread:* so the reconciler's scan only sees counters
+    return f"unread_stale:{user_id}"
+
+
+async def _flag_stale(user_ids: list[int]) -> None:
+    """Mark counters that a failed write may have left wrong; the next read recomputes them."""
+    try:
+        await acquire_flags([_stale_key(u) for u in user_ids], settings.UNREAD_COUNTER_TTL)
+    except Exception as e:
+        # Without the flag, the reconciler still repairs them on its next pass
+        logger.warning(f"Could not flag unread counters stale: {e}")
+
 
 async def create_notification(user_id: int, title: str, message: str = "",
-                              notification_type: str = "info", link: str = None):
-    """Create a notification. Called from other modules (reviews, applications, etc.)."""
-    await repository.insert_notification(user_id, title, message, notification_type, link)
-    await incr_counter(f"unread:{user_id}")
+                              notification_type: str = "info", link: str = None,
+                              group_key: str = None):
+    """Create a notification. Called from other modules (reviews, applications, etc.).
+
+    Events sharing a `group_key` collapse into one unread entry per user while
+    they keep arriving within NOTIFICATION_GROUP_WINDOW.
+    """
+    await create_notifications_bulk([user_id], title, message, notification_type, link, group_key)
+
+
+async def create_notifications_bulk(user_ids: list[int], title: str, message: str = "",
+                                    notification_type: str = "info", link: str = None,
+                                    group_key: str = None):
+    """Fan the same notification out to many users.
+
+    Ungrouped: one insert_many, one pipelined INCR batch and one pipelined
+    PUBLISH batch, regardless of how many users are notified. Grouped: one
+    upsert per user (run concurrently); the unread counter only moves when a
+    new group is opened.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return
+    try:
+        if group_key:
+            results = await asyncio.gather(*(
+                repository.upsert_grouped_notification(
+                    u, group_key, title, message, notification_type, link,
+                    settings.NOTIFICATION_GROUP_WINDOW,
+                )
+                for u in user_ids
+            ))
+            docs = [doc for doc, _ in results]
+            created = [doc["user_id"] for doc, is_new in results if is_new]
+        else:
+            docs = await repository.insert_notifications(user_ids, title, message, notification_type, link)
+            created = [d["user_id"] for d in docs]
+        counts = await _unread_counts_after_insert(created, [d["user_id"] for d in docs])
+    except Exception:
+        # Some entries may have landed without their counter moving
+        await _flag_stale(user_ids)
+        raise
+    await publish_messages([
+        (user_channel(d["user_id"]), {
+            "type": "notification",
+            "notification": _doc_to_response(d).model_dump(mode="json"),
+            "unread_count": counts[d["user_id"]],
+        })
+        for d in docs
+    ])
+    await _trim_inboxes(created)
+
+
+async def _unread_counts_after_insert(created: list[int], notified: list[int]) -> dict[int, int]:
+    """Bump counters for users who got a new unread entry and read the rest.
+
+    Missing counters are rebuilt from MongoDB, which already includes the new entry.
+    """
+    counts = dict(zip(created, await incr_existing_counters([_unread_key(u) for u in created])))
+    untouched = [u for u in notified if u not in counts]
+    counts.update(zip(untouched, await get_counters([_unread_key(u) for u in untouched])))
+    missing = [u for u, count in counts.items() if count is None]
+    if missing:
+        counts.update(await _rebuild_unread_counters(missing))
+    return counts
+
+
+async def _trim_inboxes(user_ids: list[int]) -> None:
+    """Enforce NOTIFICATION_MAX_PER_USER, at most once per user per trim interval.
+
+    A fixed number of round trips for the whole fan-out: one flag batch, one
+    aggregation and one delete. Counters are only touched for the few users who
+    were actually over the cap.
+    """
+    due = await acquire_flags([f"inbox_trim:{u}" for u in user_ids], settings.NOTIFICATION_TRIM_INTERVAL)
+    due_ids = [user_id for user_id, is_due in zip(user_ids, due) if is_due]
+    if not due_ids:
+        return
+    deleted_unread = await repository.trim_inboxes(due_ids, settings.NOTIFICATION_MAX_PER_USER)
+    for user_id, count in deleted_unread.items():
+        await decr_counter_floor(_unread_key(user_id), count)
+
+
+async def _publish_unread_count(user_id: int, count: int) -> None:
+    await publish_message(user_channel(user_id), {"type": "unread_count", "count": count})
 
 
 def _doc_to_response(doc: dict) -> NotificationResponse:
@@ -19,19 +130,49 @@ def _doc_to_response(doc: dict) -> NotificationResponse:
         is_read=doc["is_read"],
         notification_type=doc.get("notification_type", "info"),
         link=doc.get("link"),
+        count=doc.get("count", 1),
         created_at=doc["created_at"],
+        latest_at=doc.get("latest_at", doc["created_at"]),
     )
 
 
-async def get_notifications(user_id: int, unread_only: bool, page: int,
-                            size: int) -> list[NotificationResponse]:
-    skip = (page - 1) * size
-    docs = await repository.find_notifications(user_id, unread_only, skip, size)
+def _parse_ids(values: list[str]) -> list[ObjectId]:
+    try:
+        return [ObjectId(v) for v in values]
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid notification id")
+
+
+async def get_notifications(user_id: int, unread_only: bool, page: int, size: int,
+                            before: str | None = None) -> list[NotificationResponse]:
+    if before:
+        # Keyset mode: `page` is ignored, the cursor is the last id already seen.
+        [cursor_id] = _parse_ids([before])
+        # A trimmed or expired cursor still pages from (about) where it was created
+        key = await repository.get_sort_key(user_id, cursor_id) or (cursor_id.generation_time, cursor_id)
+        docs = await repository.find_notifications(user_id, unread_only, 0, size, key)
+    else:
+        docs = await repository.find_notifications(user_id, unread_only, (page - 1) * size, size)
     return [_doc_to_response(doc) for doc in docs]
 
 
+async def _rebuild_unread_counters(user_ids: list[int]) -> dict[int, int]:
+    """Recompute counters from MongoDB and cache them (without clobbering a fresher value)."""
+    counts = await repository.count_unread_many(user_ids)
+    for user_id, count in counts.items():
+        await set_counter(_unread_key(user_id), count, settings.UNREAD_COUNTER_TTL, only_if_missing=True)
+    return counts
+
+
 async def get_unread_count(user_id: int) -> UnreadCountResponse:
-    count = await get_counter(f"unread:{user_id}")
+    count, stale = await get_counters([_unread_key(user_id), _stale_key(user_id)])
+    if stale is not None and (await take_flags([_stale_key(user_id)]))[0]:
+        # Flag taken before counting: a write failing meanwhile flags it again
+        count = await repository.count_unread(user_id)
+        await set_counter(_unread_key(user_id), count, settings.UNREAD_COUNTER_TTL)
+    elif count is None:
+        count = await repository.count_unread(user_id)
+        await set_counter(_unread_key(user_id), count, settings.UNREAD_COUNTER_TTL, only_if_missing=True)
     return UnreadCountResponse(count=count)
 
 
@@ -40,14 +181,63 @@ async def mark_as_read(notification_id: str, user_id: int) -> NotificationRespon
     if not result:
         raise HTTPException(status_code=404, detail="Notification not found or already read")
 
-    count = await get_counter(f"unread:{user_id}")
-    if count > 0:
-        redis = await get_redis()
-        await redis.decr(f"unread:{user_id}")
+    count = await decr_counter_floor(_unread_key(user_id))
+    if count is None:
+        count = (await get_unread_count(user_id)).count
+    await _publish_unread_count(user_id, count)
 
     return _doc_to_response(result)
 
 
+async def mark_many_read(notification_ids: list[str], user_id: int) -> UnreadCountResponse:
+    modified = await repository.mark_many_read(_parse_ids(notification_ids), user_id)
+    count = await decr_counter_floor(_unread_key(user_id), modified) if modified else None
+    if count is None:
+        count = (await get_unread_count(user_id)).count
+    await _publish_unread_count(user_id, count)
+    return UnreadCountResponse(count=count)
+
+
 async def mark_all_read(user_id: int) -> None:
     await repository.mark_all_read(user_id)
-    await reset_counter(f"unread:{user_id}")
+    await set_counter(_unread_key(user_id), 0, settings.UNREAD_COUNTER_TTL)
+    await _publish_unread_count(user_id, 0)
+
+
+# ── Drift repair ─────────────────────────────────────
+
+_reconcile_cursor = 0
+
+
+async def reconcile_unread_counters(batch: int) -> int:
+    """Check the next slice of cached counters against MongoDB and fix drift.
+
+    Walks the `unread:*` keyspace with a persistent SCAN cursor, so repeated
+    sweeps eventually cover every counter. Returns the number repaired.
+    """
+    global _reconcile_cursor
+    _reconcile_cursor, keys = await scan_keys("unread:*", _reconcile_cursor, batch)
+    if not keys:
+        return 0
+    cached = await get_counters(keys)
+    user_ids = [int(k.split(":", 1)[1]) for k in keys]
+    actual = await repository.count_unread_many(user_ids)
+
+    repaired = 0
+    for key, user_id, value in zip(keys, user_ids, cached):
+        if value is not None and value != actual[user_id]:
+            if await compare_and_set_counter(key, value, actual[user_id]):
+                repaired += 1
+    if repaired:
+        logger.info(f"Repaired {repaired} drifted unread counter(s)")
+    return repaired
+
+
+async def run_unread_counter_reconciler():
+    """Background loop started from the app lifespan."""
+    while True:
+        await asyncio.sleep(settings.UNREAD_RECONCILE_INTERVAL)
+        try:
+            await reconcile_unread_counters(settings.UNREAD_RECONCILE_BATCH)
+        except Exception as e:
+            logger.warning(f"Unread counter reconcile failed: {e}")
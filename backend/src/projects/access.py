@@ -0,0 +1,121 @@
+"""Project access policy: who may view, edit, delete or upload on a project.
+
+`get_project_access` loads a project's owner, team (with lead flags) and
+applicants in a single query and caches the result in Redis. Services that
+change any of them (team membership, applications, project deletion) call
+`invalidate_project_access`, so permission checks stay exact while most
+requests never touch the database for them. Invalidation also bumps a
+per-project version, and a fill that started before it is not stored.
+"""
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import HTTPException
+from tortoise import connections
+from src.core.config import settings
+from src.core.redis import cache_get, cache_invalidate_versioned, cache_set_if_version, cache_version
+from src.users.models import User, RoleEnum
+
+# One round trip for all three rosters; `{p}` is the dialect's first positional parameter
+_ROSTER_SQL = """
+SELECT owner_id AS user_id, 'owner' AS kind, FALSE AS is_lead FROM projects WHERE id = {p}
+UNION ALL
+SELECT user_id, 'team', is_lead FROM project_teams WHERE project_id = {p}
+UNION ALL
+SELECT applicant_id, 'applicant', FALSE FROM applications WHERE project_id = {p}
+"""
+
+
+@dataclass(frozen=True)
+class ProjectAccess:
+    project_id: int
+    owner_id: int
+    team: frozenset[int]
+    leads: frozenset[int]
+    applicants: frozenset[int]
+
+    def is_owner(self, user: User) -> bool:
+        return user.id == self.owner_id
+
+    def is_member(self, user_id: int) -> bool:
+        return user_id in self.team
+
+    def is_lead(self, user: User) -> bool:
+        return user.id in self.leads
+
+    def can_view(self, user: User) -> bool:
+        return user.role == RoleEnum.admin or self.is_owner(user) or self.is_member(user.id)
+
+    def can_edit(self, user: User) -> bool:
+        # Same rule as view for now — team members can move/edit cards, owner/admin always can.
+        return self.can_view(user)
+
+    def can_delete(self, user: User) -> bool:
+        return user.role == RoleEnum.admin or self.is_owner(user) or self.is_lead(user)
+
+    def can_manage_team(self, user: User) -> bool:
+        return self.can_delete(user)
+
+    def can_upload(self, user: User, file_type: str) -> bool:
+        if file_type == "attachment":
+            return self.is_owner(user) or user.role == RoleEnum.admin
+        return user.id in self.applicants
+
+    def to_cache(self) -> dict:
+        return {"owner_id": self.owner_id, "team": sorted(self.team),
+                "leads": sorted(self.leads), "applicants": sorted(self.applicants)}
+
+    @classmethod
+    def from_cache(cls, project_id: int, data: dict) -> "ProjectAccess":
+        return cls(project_id, data["owner_id"], frozenset(data["team"]),
+                   frozenset(data["leads"]), frozenset(data["applicants"]))
+
+
+def _access_key(project_id: int) -> str:
+    return f"project_access:{project_id}"
+
+
+def _version_key(project_id: int) -> str:
+    return f"project_access:{project_id}:version"
+
+
+async def load_project_access(project_id: int) -> Optional[ProjectAccess]:
+    """Uncached roster read; request paths use `get_project_access`."""
+    db = connections.get("default")
+    placeholder = "$1" if db.capabilities.dialect == "postgres" else "?1"
+    rows = await db.execute_query_dict(_ROSTER_SQL.format(p=placeholder), [project_id])
+    owner_id = next((r["user_id"] for r in rows if r["kind"] == "owner"), None)
+    if owner_id is None:
+        return None
+    team = [r for r in rows if r["kind"] == "team"]
+    return ProjectAccess(
+        project_id=project_id,
+        owner_id=owner_id,
+        team=frozenset(r["user_id"] for r in team),
+        leads=frozenset(r["user_id"] for r in team if r["is_lead"]),
+        applicants=frozenset(r["user_id"] for r in rows if r["kind"] == "applicant"),
+    )
+
+
+async def get_project_access(project_id: int) -> Optional[ProjectAccess]:
+    """The project's access roster, or None if the project doesn't exist."""
+    cached = await cache_get(_access_key(project_id))
+    if isinstance(cached, dict):
+        return ProjectAccess.from_cache(project_id, cached)
+    version = await cache_version(_version_key(project_id))
+    access = await load_project_access(project_id)
+    if access is not None:
+        await cache_set_if_version(_access_key(project_id), access.to_cache(), settings.PROJECT_ACCESS_CACHE_TTL,
+                                   _version_key(project_id), version)
+    return access
+
+
+async def project_access_or_404(project_id: int) -> ProjectAccess:
+    access = await get_project_access(project_id)
+    if access is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return access
+
+
+async def invalidate_project_access(project_id: int) -> None:
+    """Call after any change to the project's owner, team or applications."""
+    await cache_invalidate_versioned(_access_key(project_id), _version_key(project_id))
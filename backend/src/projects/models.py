@@ -28,6 +28,21 @@ class Project(models.Model):
         table = "projects"
 
 
+class FileBlob(models.Model):
+    """One stored object per distinct content (SHA-256) per bucket, shared by every ProjectFile with that content."""
+    id = fields.IntField(primary_key=True)
+    bucket = fields.CharField(max_length=100)
+    sha256 = fields.CharField(max_length=64)
+    object_name = fields.CharField(max_length=500)
+    size = fields.BigIntField()
+    ref_count = fields.IntField(default=0)
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "file_blobs"
+        unique_together = (("bucket", "sha256"),)
+
+
 class ProjectFile(models.Model):
     id = fields.IntField(primary_key=True)
     project = fields.ForeignKeyField("models.Project", related_name="attachments", on_delete=fields.CASCADE)
@@ -36,7 +51,14 @@ class ProjectFile(models.Model):
     object_name = fields.CharField(max_length=500)
     file_size = fields.IntField(null=True)
     content_type = fields.CharField(max_length=255, null=True)
+    sha256 = fields.CharField(max_length=64, null=True)
+    # Null only for files stored before deduplication: they own object_name
+    blob = fields.ForeignKeyField("models.FileBlob", related_name="files", null=True, on_delete=fields.RESTRICT)
     file_type = fields.CharField(max_length=50, default="attachment")
+    # Derived WebP objects (same bucket), filled in by the background preview workers
+    preview_status = fields.CharField(max_length=10, null=True)  # pending / ready / failed; null: not previewable
+    thumbnail_object = fields.CharField(max_length=500, null=True)
+    preview_object = fields.CharField(max_length=500, null=True)
     created_at = fields.DatetimeField(auto_now_add=True)
 
     class Meta:
@@ -0,0 +1,232 @@
+"""Skill-based project recommendations.
+
+Every worker keeps the open projects in memory as a sparse project-by-skill
+matrix in ELLPACK layout: for each project, its skill column numbers, padded
+with column 0, which always weighs nothing. The layout is slot-major (one
+contiguous array per skill slot), so scoring a caller is a handful of
+vectorised gathers and adds followed by a partial sort: a few milliseconds for
+100k projects.
+
+A project's score is the share of its required skills, weighted by rarity
+(inverse document frequency over open projects), that the caller covers. A
+skill the caller lacks but whose category they know counts for
+RECOMMENDATION_CATEGORY_WEIGHT of a match. Deadlines within
+RECOMMENDATION_URGENCY_DAYS raise the score by up to
+RECOMMENDATION_URGENCY_WEIGHT; projects whose deadline has passed are skipped.
+
+Project create/update/delete keep the index current on the worker that served
+them. Other workers pick the change up on the periodic rebuild
+(RECOMMENDATION_REFRESH_INTERVAL), and results are re-checked against the
+database before they are returned.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+import numpy as np
+from src.core.config import settings
+from src.projects.models import Project, ProjectStatus
+from src.skills.models import Skill
+
+logger = logging.getLogger(__name__)
+
+_INITIAL_ROWS = 1024
+_INITIAL_WIDTH = 4
+
+
+def _timestamp(dt: Optional[datetime]) -> float:
+    if dt is None:
+        return np.nan
+    # Deadlines are stored as naive UTC
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class RecommendationIndex:
+    def __init__(self):
+        self.loaded = False
+        self._lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._row_of: dict[int, int] = {}
+        self._free: list[int] = []
+        self._used = 0  # rows ever handed out; rows past this are untouched
+        self._project_id = np.zeros(_INITIAL_ROWS, dtype=np.int64)  # 0: free row
+        self._owner_id = np.zeros(_INITIAL_ROWS, dtype=np.int64)
+        self._deadline = np.full(_INITIAL_ROWS, np.nan)
+        self._skills = np.zeros((_INITIAL_WIDTH, _INITIAL_ROWS), dtype=np.int32)  # [slot, row]
+        # Per column; column 0 is the padding column
+        self._col_of: dict[int, int] = {}
+        self._category_code = [-1]
+        self._category_codes: dict[str, int] = {}
+        self._df = np.zeros(1, dtype=np.int64)
+        # Rarity weights and each project's total, kept until the index changes
+        self._idf: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+
+    def clear(self) -> None:
+        self._reset()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    # ── Maintenance ──────────────────────────────────
+
+    def _column(self, skill_id: int, category: Optional[str]) -> int:
+        col = self._col_of.get(skill_id)
+        if col is None:
+            col = self._col_of[skill_id] = len(self._category_code)
+            code = self._category_codes.setdefault(category, len(self._category_codes)) if category else -1
+            self._category_code.append(code)
+            if col >= len(self._df):
+                self._df = np.concatenate([self._df, np.zeros(len(self._df), dtype=np.int64)])
+        return col
+
+    def _grow(self, rows: int, width: int) -> None:
+        if rows > len(self._project_id):
+            extra = max(rows, 2 * len(self._project_id)) - len(self._project_id)
+            self._project_id = np.concatenate([self._project_id, np.zeros(extra, dtype=np.int64)])
+            self._owner_id = np.concatenate([self._owner_id, np.zeros(extra, dtype=np.int64)])
+            self._deadline = np.concatenate([self._deadline, np.full(extra, np.nan)])
+            self._skills = np.hstack([self._skills, np.zeros((len(self._skills), extra), dtype=np.int32)])
+        if width > len(self._skills):
+            pad = np.zeros((width - len(self._skills), self._skills.shape[1]), dtype=np.int32)
+            self._skills = np.vstack([self._skills, pad])
+
+    def set_project(self, project_id: int, owner_id: int, deadline: Optional[datetime],
+                    skills: list[tuple[int, Optional[str]]]) -> None:
+        """Add or replace an open project; `skills` are its (skill id, category) pairs."""
+        cols = sorted({self._column(skill_id, category) for skill_id, category in skills})
+        row = self._row_of.get(project_id)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                row = self._used
+                self._used += 1
+            self._row_of[project_id] = row
+        self._grow(row + 1, len(cols))
+        old = self._skills[:, row]
+        np.subtract.at(self._df, old[old > 0], 1)
+        self._skills[:, row] = 0
+        self._skills[:len(cols), row] = cols
+        np.add.at(self._df, cols, 1)
+        self._idf = self._norms = None
+        self._project_id[row] = project_id
+        self._owner_id[row] = owner_id
+        self._deadline[row] = _timestamp(deadline)
+
+    def remove_project(self, project_id: int) -> None:
+        row = self._row_of.pop(project_id, None)
+        if row is None:
+            return
+        old = self._skills[:, row]
+        np.subtract.at(self._df, old[old > 0], 1)
+        self._skills[:, row] = 0
+        self._idf = self._norms = None
+        self._project_id[row] = 0
+        self._owner_id[row] = 0
+        self._deadline[row] = np.nan
+        self._free.append(row)
+
+    def update(self, project: Project) -> None:
+        """Apply a saved project; its `required_skills` must be fetched."""
+        if not self.loaded:
+            return  # the first query loads everything anyway
+        if project.status != ProjectStatus.open:
+            self.remove_project(project.id)
+            return
+        self.set_project(project.id, project.owner_id, project.deadline,
+                         [(s.id, s.category) for s in project.required_skills])
+
+    async def load(self) -> None:
+        """Rebuild from the database: open projects and their required skills, in two queries."""
+        fresh = RecommendationIndex()
+        projects = await Project.filter(status=ProjectStatus.open).values_list("id", "owner_id", "deadline")
+        pairs = await Skill.filter(projects__status=ProjectStatus.open).values_list(
+            "projects__id", "id", "category",
+        )
+        skills: dict[int, list[tuple[int, Optional[str]]]] = {}
+        for project_id, skill_id, category in pairs:
+            skills.setdefault(project_id, []).append((skill_id, category))
+        for project_id, owner_id, deadline in projects:
+            fresh.set_project(project_id, owner_id, deadline, skills.get(project_id, []))
+        # Swap the finished state in at once, keeping our lock
+        vars(self).update(vars(fresh), _lock=self._lock, loaded=True)
+
+    async def ensure_loaded(self) -> None:
+        if self.loaded:
+            return
+        async with self._lock:
+            if not self.loaded:
+                await self.load()
+                logger.info(f"Recommendation index loaded ({len(self)} open projects)")
+
+    # ── Scoring ──────────────────────────────────────
+
+    def _row_sums(self, values: np.ndarray) -> np.ndarray:
+        """Sum of `values[col]` over each project's skills: the sparse matrix-vector product."""
+        slots = self._skills[:, :self._used]
+        total = np.take(values, slots[0])
+        for slot in slots[1:]:
+            total += np.take(values, slot)
+        return total
+
+    def _rarity(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._idf is None:
+            df = self._df[:len(self._category_code)]
+            idf = np.log((len(self._row_of) + 1) / (df + 1)) + 1.0
+            idf[0] = 0.0
+            self._idf, self._norms = idf, self._row_sums(idf)
+        return self._idf, self._norms
+
+    def top(self, skills: dict[int, Optional[str]], k: int, user_id: int = 0,
+            exclude: set[int] = frozenset(), now: Optional[float] = None) -> list[tuple[int, float]]:
+        """The k best (project id, score) pairs for someone with `skills` ({skill id: category})."""
+        if not self._row_of or not skills or k <= 0:
+            return []
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        n_cols = len(self._category_code)
+        idf, total = self._rarity()
+
+        known = np.zeros(n_cols, dtype=bool)
+        known[[self._col_of[s] for s in skills if s in self._col_of]] = True
+        user_codes = [self._category_codes[c] for c in set(skills.values()) if c in self._category_codes]
+        related = np.isin(np.asarray(self._category_code), user_codes) if user_codes else np.zeros(n_cols, bool)
+        weights = idf * np.where(known, 1.0, np.where(related, settings.RECOMMENDATION_CATEGORY_WEIGHT, 0.0))
+
+        covered = self._row_sums(weights)
+        score = np.divide(covered, total, out=np.zeros(self._used), where=total > 0)
+
+        deadline = self._deadline[:self._used]
+        days_left = (deadline - now) / 86400
+        urgency = np.clip(1 - days_left / settings.RECOMMENDATION_URGENCY_DAYS, 0.0, 1.0)
+        score *= 1 + settings.RECOMMENDATION_URGENCY_WEIGHT * np.nan_to_num(urgency)
+        with np.errstate(invalid="ignore"):
+            score[deadline < now] = 0.0
+        if user_id:
+            score[self._owner_id[:self._used] == user_id] = 0.0
+        excluded = [self._row_of[p] for p in exclude if p in self._row_of]
+        score[excluded] = 0.0
+
+        candidates = np.flatnonzero(score > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-score[candidates], k - 1)[:k]]
+        # Best first; newer projects (higher ids) win ties
+        order = np.lexsort((-self._project_id[candidates], -score[candidates]))
+        best = candidates[order]
+        return [(int(p), float(s)) for p, s in zip(self._project_id[best], score[best])]
+
+
+index = RecommendationIndex()
+
+
+async def run_recommendation_refresher():
+    """Background loop started from the app lifespan."""
+    while True:
+        await asyncio.sleep(settings.RECOMMENDATION_REFRESH_INTERVAL)
+        try:
+            await index.load()
+        except Exception as e:
+            logger.warning(f"Recommendation index refresh failed: {e}")
@@ -1,11 +1,64 @@
+from pypika_tortoise import functions
+from pypika_tortoise.terms import LiteralValue, Term, ValueWrapper
+from pypika_tortoise.utils import format_alias_sql
+from tortoise.expressions import Case, Subquery, When
+from tortoise.functions import Function
 from tortoise.queryset import Q, QuerySet
+from src.applications.models import Application
 from src.projects.models import Project, ProjectStatus
 from src.skills.models import Skill
+from src.teams.models import ProjectTeam
+
+# Must match the configuration the search_vector triggers use (migration 7)
+SEARCH_CONFIG = "english"
+
+# Columns a project card needs; the description comes back as `description_snippet`
+CARD_FIELDS = ("id", "title", "owner_id", "status", "max_participants", "deadline",
+               "is_student_project", "created_at")
+
+
+class _Substring(Function):
+    # Bounds go in as literals: as untyped parameters Postgres would resolve
+    # SUBSTRING to its regular-expression (text, text, text) form
+    database_func = functions.Substring
+
+    def __init__(self, field: str, start: int, length: int) -> None:
+        super().__init__(field, LiteralValue(str(int(start))), LiteralValue(str(int(length))))
+
+
+class _SearchTerm(Term):
+    """SQL built around websearch_to_tsquery(<search>), with the search text bound as a parameter."""
+
+    def __init__(self, template: str, search: str) -> None:
+        super().__init__()
+        self.template = template
+        self.search = ValueWrapper(search)
+
+    def get_sql(self, ctx) -> str:
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}',{self.search.get_sql(ctx)})"
+        sql = self.template.format(tsquery=tsquery)
+        if ctx.with_alias:
+            return format_alias_sql(sql=sql, alias=self.alias, ctx=ctx)
+        return sql
+
+
+def full_text_search_enabled() -> bool:
+    # search_vector (tsvector column, GIN index, triggers) only exists on PostgreSQL
+    return Project._meta.db.capabilities.dialect == "postgres"
 
 
 def build_filter(status: ProjectStatus | None = None, owner_id: int | None = None,
                  is_student_project: bool | None = None, search: str | None = None,
                  skill_ids: list[int] | None = None) -> QuerySet:
+    """Projects matching the filters.
+
+    On PostgreSQL `search` is a full-text match against search_vector (web
+    search syntax: quotes, `or`, `-word`) and rows are annotated with
+    `search_rank`; elsewhere it falls back to substring matching.
+
+    Skill filters and skill-name matches are subqueries on ids rather than
+    joins, so a project appears once and no DISTINCT is needed.
+    """
     filters = {}
     if status:
         filters["status"] = status
@@ -15,16 +68,97 @@ def build_filter(status: ProjectStatus | None = None, owner_id: int | None = Non
         filters["is_student_project"] = is_student_project
     q = Project.filter(**filters)
     if skill_ids:
-        q = q.filter(required_skills__id__in=skill_ids)
-    if search:
+        q = q.filter(id__in=Subquery(Project.filter(required_skills__id__in=skill_ids).values("id")))
+    if search and full_text_search_enabled():
+        q = q.annotate(
+            search_match=_SearchTerm('("projects"."search_vector" @@ {tsquery})', search),
+            search_rank=_SearchTerm('ts_rank("projects"."search_vector",{tsquery})', search),
+        ).filter(search_match=True)
+    elif search:
         q = q.filter(
             Q(title__icontains=search) |
             Q(description__icontains=search) |
-            Q(required_skills__name__icontains=search)
+            Q(id__in=Subquery(Project.filter(required_skills__name__icontains=search).values("id")))
         )
     return q
 
 
+async def fetch(q: QuerySet, card: bool = False, snippet_length: int = 0) -> list:
+    """Run a listing query: full Project objects, or CARD_FIELDS rows for `card`.
+
+    Card rows skip attachments and skills (see `skills_by_project`) and carry at
+    most `snippet_length` characters of the description, cut by the database.
+    """
+    if not card:
+        return await q.prefetch_related("required_skills", "attachments")
+    return await q.annotate(
+        description_snippet=_Substring("description", 1, snippet_length),
+    ).values(*CARD_FIELDS, "description_snippet")
+
+
+async def skills_by_project(project_ids: list[int]) -> dict[int, list[dict]]:
+    """Required skills of many projects in one join query."""
+    result: dict[int, list[dict]] = {pid: [] for pid in project_ids}
+    if project_ids:
+        rows = await Skill.filter(projects__id__in=project_ids).order_by("name") \
+            .values("id", "name", "category", project_id="projects__id")
+        for row in rows:
+            result[row.pop("project_id")].append(row)
+    return result
+
+
+async def user_skills(user_id: int) -> dict[int, str | None]:
+    """The user's skills as {skill id: category}."""
+    return dict(await Skill.filter(users__id=user_id).values_list("id", "category"))
+
+
+async def engaged_project_ids(user_id: int) -> set[int]:
+    """Projects the user has applied or been invited to, or is on the team of."""
+    applied = await Application.filter(applicant_id=user_id).values_list("project_id", flat=True)
+    joined = await ProjectTeam.filter(user_id=user_id).values_list("project_id", flat=True)
+    return set(applied) | set(joined)
+
+
+def order_by_deadline(q: QuerySet) -> QuerySet:
+    """(deadline, id) ascending with undated projects last, the order `keyset_page` walks.
+
+    Spelled out because databases disagree on where NULLs sort (SQLite: first).
+    """
+    return q.annotate(deadline_missing=Case(When(deadline__isnull=True, then=1), default=0)) \
+        .order_by("deadline_missing", "deadline", "id")
+
+
+async def keyset_page(q: QuerySet, sort: str, after: tuple | None, size: int,
+                      card: bool = False, snippet_length: int = 0) -> list:
+    """The `size` projects that follow the (sort key, id) pair `after` (None: the first page).
+
+    newest walks (created_at, id) descending. deadline walks (deadline, id)
+    ascending over projects that have one, then the rest by id, so projects
+    without a deadline come last on every database and each segment is a
+    plain index range.
+    """
+    if sort == "deadline":
+        key, last_id = after or (None, None)
+        items = []
+        if after is None or key is not None:
+            dated = q.filter(deadline__isnull=False)
+            if key is not None:
+                dated = dated.filter(deadline__gte=key).filter(Q(deadline__gt=key) | Q(id__gt=last_id))
+            items = list(await fetch(dated.order_by("deadline", "id").limit(size), card, snippet_length))
+            last_id = None
+        if len(items) < size:
+            undated = q.filter(deadline__isnull=True)
+            if last_id is not None:
+                undated = undated.filter(id__gt=last_id)
+            items += await fetch(undated.order_by("id").limit(size - len(items)), card, snippet_length)
+        return items
+
+    if after is not None:
+        created_at, last_id = after
+        q = q.filter(created_at__lte=created_at).filter(Q(created_at__lt=created_at) | Q(id__lt=last_id))
+    return await fetch(q.order_by("-created_at", "-id").limit(size), card, snippet_length)
+
+
 async def get_by_id(project_id: int) -> Project | None:
     return await Project.filter(id=project_id).prefetch_related("required_skills", "attachments").first()
 
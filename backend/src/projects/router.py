@@ -5,7 +5,8 @@ from src.users.models import User
 from src.projects.models import ProjectStatus
 from src.projects import service
 from src.projects.schemas import (
-    ProjectCreate, ProjectUpdate, ProjectResponse, ProjectListResponse,
+    ProjectCreate, ProjectUpdate, ProjectResponse, ProjectListResponse, ProjectCardListResponse,
+    RecommendedProjectResponse,
 )
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
@@ -19,19 +20,28 @@ async def create_project(data: ProjectCreate, current_user: User = Depends(get_c
     )
 
 
-@router.get("/", response_model=ProjectListResponse)
+@router.get("/", response_model=ProjectListResponse | ProjectCardListResponse)
 async def list_projects(
     page: int = Query(1, ge=1), size: int = Query(20, ge=1, le=100),
     status: Optional[ProjectStatus] = None, owner_id: Optional[int] = None,
     is_student_project: Optional[bool] = None, search: Optional[str] = None,
     skill_ids: Optional[list[int]] = Query(None),
-    sort: Literal["newest", "deadline"] = Query("newest"),
+    sort: Literal["newest", "deadline", "relevance"] = Query("newest"),
+    cursor: Optional[str] = None,
+    count: Literal["exact", "cached"] = Query("exact"),
+    view: Literal["full", "card"] = Query("full"),
 ):
     return await service.list_projects(
-        page, size, status, owner_id, is_student_project, search, skill_ids, sort,
+        page, size, status, owner_id, is_student_project, search, skill_ids, sort, cursor, count, view,
     )
 
 
+@router.get("/recommended", response_model=list[RecommendedProjectResponse])
+async def recommended_projects(limit: int = Query(10, ge=1, le=50),
+                               current_user: User = Depends(get_current_user)):
+    return await service.recommend_projects(current_user, limit)
+
+
 @router.get("/{project_id}", response_model=ProjectResponse)
 async def get_project(project_id: int):
     return await service.get_project(project_id)
@@ -58,3 +58,30 @@ class ProjectListResponse(BaseModel):
     total: int
     page: int
     size: int
+    next_cursor: Optional[str] = None  # pass back as `cursor` for the following page
+
+
+class ProjectCardResponse(BaseModel):
+    """What a project card shows: no attachments, and a description snippet."""
+    id: int
+    title: str
+    description: str
+    owner_id: int
+    status: ProjectStatus
+    max_participants: int
+    deadline: Optional[datetime] = None
+    is_student_project: bool
+    required_skills: list[SkillOut] = []
+    created_at: datetime
+
+
+class RecommendedProjectResponse(ProjectCardResponse):
+    score: float
+
+
+class ProjectCardListResponse(BaseModel):
+    items: list[ProjectCardResponse]
+    total: int
+    page: int
+    size: int
+    next_cursor: Optional[str] = None
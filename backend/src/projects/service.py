@@ -1,7 +1,15 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
 from fastapi import HTTPException
-from src.core.redis import cache_delete_pattern
-from src.projects import repository
+from src.core.config import settings
+from src.core.redis import cache_delete_pattern, cache_get, cache_set
+from src.files.service import delete_project_files
+from src.projects import recommendations, repository
+from src.projects.access import invalidate_project_access
 from src.projects.models import Project, ProjectStatus
+from src.projects.schemas import ProjectCardListResponse, ProjectCardResponse, RecommendedProjectResponse
 from src.users.models import User, RoleEnum
 
 
@@ -19,19 +27,118 @@ async def create_project(user: User, title: str, description: str,
     project = await repository.create_project(
         title, description, user.id, max_participants, deadline, is_student_project, skill_ids,
     )
+    recommendations.index.update(project)
     await cache_delete_pattern("projects:*")
     return project
 
 
+def _encode_cursor(project: Project | ProjectCardResponse, sort: str) -> str:
+    key = project.deadline if sort == "deadline" else project.created_at
+    raw = json.dumps([sort, key.isoformat() if key else None, project.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str) -> tuple:
+    """The (sort key, id) pair a cursor points after; it must come from a listing with the same sort."""
+    try:
+        cursor_sort, key, last_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        after = (datetime.fromisoformat(key) if key else None), int(last_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort:
+        raise HTTPException(status_code=400, detail=f"Cursor was issued for sort={cursor_sort}, not sort={sort}")
+    return after
+
+
+async def _count(q, count: str, filters: dict) -> int:
+    if count != "cached":
+        return await q.count()
+    # Project create/update/delete clear projects:*; the TTL covers changes made elsewhere (skills)
+    digest = hashlib.sha1(json.dumps(filters, sort_keys=True, default=str).encode()).hexdigest()
+    key = f"projects:count:{digest}"
+    cached = await cache_get(key)
+    if cached is not None:
+        return int(cached)
+    total = await q.count()
+    await cache_set(key, total, ttl=settings.PROJECT_COUNT_CACHE_TTL)
+    return total
+
+
+async def _to_cards(rows: list[dict]) -> list[ProjectCardResponse]:
+    limit = settings.PROJECT_CARD_DESCRIPTION_LENGTH
+    skills = await repository.skills_by_project([row["id"] for row in rows])
+    cards = []
+    for row in rows:
+        # The database returns one character more than the limit, to tell whether it cut anything
+        snippet = row.pop("description_snippet") or ""
+        if len(snippet) > limit:
+            snippet = snippet[:limit].rstrip() + "…"
+        cards.append(ProjectCardResponse(**row, description=snippet, required_skills=skills[row["id"]]))
+    return cards
+
+
 async def list_projects(page: int, size: int, status: ProjectStatus | None,
                         owner_id: int | None, is_student_project: bool | None,
                         search: str | None, skill_ids: list[int] | None,
-                        sort: str) -> dict:
+                        sort: str, cursor: str | None = None, count: str = "exact",
+                        view: str = "full") -> dict | ProjectCardListResponse:
+    """List projects, by page number or by cursor.
+
+    The first page and any `cursor` request use keyset pagination, and every
+    full page returns `next_cursor`, so following it never pays for an OFFSET.
+    Relevance ordering (full-text search) is paged by number only.
+
+    `view="card"` selects only the columns a card shows, with a truncated
+    description and skills loaded in one extra query.
+    """
     q = repository.build_filter(status, owner_id, is_student_project, search, skill_ids)
-    total = await q.distinct().count()
-    order = "deadline" if sort == "deadline" else "-created_at"
-    items = await q.prefetch_related("required_skills", "attachments").distinct().order_by(order).offset((page - 1) * size).limit(size)
-    return {"items": items, "total": total, "page": page, "size": size}
+    filters = {"status": status, "owner_id": owner_id, "is_student_project": is_student_project,
+               "search": search, "skill_ids": sorted(skill_ids or [])}
+    total = await _count(q, count, filters)
+
+    card = view == "card"
+    snippet_length = settings.PROJECT_CARD_DESCRIPTION_LENGTH + 1
+    relevance = sort == "relevance" and search and repository.full_text_search_enabled()
+    if relevance and cursor:
+        raise HTTPException(status_code=400, detail="Cursors are not supported with sort=relevance")
+    if relevance or (page > 1 and not cursor):
+        if relevance:
+            q = q.order_by("-search_rank", "-created_at", "-id")
+        elif sort == "deadline":
+            q = repository.order_by_deadline(q)
+        else:
+            q = q.order_by("-created_at", "-id")
+        items = await repository.fetch(q.offset((page - 1) * size).limit(size), card, snippet_length)
+    else:
+        sort = "deadline" if sort == "deadline" else "newest"
+        after = _decode_cursor(cursor, sort) if cursor else None
+        items = await repository.keyset_page(q, sort, after, size, card, snippet_length)
+    if card:
+        items = await _to_cards(items)
+
+    next_cursor = _encode_cursor(items[-1], sort) if len(items) == size and not relevance else None
+    if card:
+        return ProjectCardListResponse(items=items, total=total, page=page, size=size, next_cursor=next_cursor)
+    return {"items": items, "total": total, "page": page, "size": size, "next_cursor": next_cursor}
+
+
+async def recommend_projects(user: User, limit: int) -> list[RecommendedProjectResponse]:
+    """Open projects ranked for the user by skill overlap (see `recommendations`)."""
+    skills = await repository.user_skills(user.id)
+    if not skills:
+        return []
+    await recommendations.index.ensure_loaded()
+    # Another worker may have closed or deleted a project since our index last saw it,
+    # so ask for spares and keep the best `limit` that are still open
+    ranked = recommendations.index.top(skills, limit * settings.RECOMMENDATION_OVERFETCH, user.id,
+                                       await repository.engaged_project_ids(user.id))
+    if not ranked:
+        return []
+    q = Project.filter(id__in=[pid for pid, _ in ranked], status=ProjectStatus.open)
+    rows = await repository.fetch(q, card=True, snippet_length=settings.PROJECT_CARD_DESCRIPTION_LENGTH + 1)
+    cards = {card.id: card for card in await _to_cards(rows)}
+    return [RecommendedProjectResponse(**cards[pid].model_dump(), score=round(score, 4))
+            for pid, score in ranked if pid in cards][:limit]
 
 
 async def get_project(project_id: int) -> Project:
@@ -48,6 +155,7 @@ async def update_project(project_id: int, data: dict, user: User) -> Project:
     if project.owner_id != user.id and user.role != RoleEnum.admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     await repository.update_project(project, data)
+    recommendations.index.update(project)
     await cache_delete_pattern("projects:*")
     return project
 
@@ -58,5 +166,8 @@ async def delete_project(project_id: int, user: User) -> None:
         raise HTTPException(status_code=404, detail="Project not found")
     if project.owner_id != user.id and user.role != RoleEnum.admin:
         raise HTTPException(status_code=403, detail="Not authorized")
+    await delete_project_files(project.id)
     await repository.delete_project(project)
+    recommendations.index.remove_project(project.id)
+    await invalidate_project_access(project.id)
     await cache_delete_pattern("projects:*")
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, BackgroundTasks, Query
 from src.core.dependencies import get_current_user
 from src.core.email import send_review_email
 from src.users.models import User
+from src.notifications.digest import wants_instant_email
 from src.reviews import service
 from src.reviews.schemas import ReviewCreate, ReviewResponse, UserRatingResponse
 
@@ -15,7 +16,7 @@ async def create_review(data: ReviewCreate, bg: BackgroundTasks,
         current_user, data.reviewee_id, data.project_id,
         data.application_id, data.rating, data.comment,
     )
-    if reviewee:
+    if reviewee and wants_instant_email(reviewee):
         bg.add_task(send_review_email, reviewee.email, reviewee.username,
                     current_user.username, data.rating)
     return review
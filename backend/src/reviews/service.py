@@ -6,7 +6,7 @@ from src.users.models import User
 from src.projects.models import Project
 from src.applications.models import Application, ApplicationStatus
 from src.notifications.service import create_notification
-from src.teams import repository as teams_repo
+from src.projects.access import project_access_or_404
 
 
 async def _enrich(review: Review) -> ReviewResponse:
@@ -40,12 +40,9 @@ async def create_review(reviewer: User, reviewee_id: int, project_id: int,
     if reviewer.id == reviewee_id:
         raise HTTPException(status_code=400, detail="Cannot review yourself")
 
-    project = await Project.filter(id=project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    is_owner = project.owner_id == reviewer.id
-    is_team_member = await teams_repo.get_by_project_and_user(project_id, reviewer.id)
+    access = await project_access_or_404(project_id)
+    is_owner = access.is_owner(reviewer)
+    is_team_member = access.is_member(reviewer.id)
     review_type = "owner_to_student" if is_owner else "student_to_owner"
 
     existing = await repository.get_review(reviewer.id, project_id, review_type, reviewee_id)
@@ -5,21 +5,13 @@ from fastapi import HTTPException
 from src.tasks import repository
 from src.tasks.models import Task, TaskComment, TaskActivity, TaskStatus, TaskPriority
 from src.tasks.schemas import TaskResponse, CommentResponse, ActivityResponse
-from src.projects.models import Project
-from src.users.models import User, RoleEnum
-from src.teams import repository as teams_repo
+from src.projects.access import ProjectAccess, project_access_or_404
+from src.users.models import User
 from src.notifications.service import create_notification
 
 
 # ── Auth helpers ──────────────────────────────────────────
 
-async def _project_or_404(project_id: int) -> Project:
-    project = await Project.filter(id=project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    return project
-
-
 async def _task_or_404(task_id: int) -> Task:
     task = await repository.get_task(task_id)
     if not task:
@@ -27,27 +19,19 @@ async def _task_or_404(task_id: int) -> Task:
     return task
 
 
-async def _ensure_can_view(project: Project, user: User) -> None:
-    if user.role == RoleEnum.admin or project.owner_id == user.id:
-        return
-    membership = await teams_repo.get_by_project_and_user(project.id, user.id)
-    if membership:
-        return
-    raise HTTPException(status_code=403, detail="Not a team member on this project")
+def _ensure_can_view(access: ProjectAccess, user: User) -> None:
+    if not access.can_view(user):
+        raise HTTPException(status_code=403, detail="Not a team member on this project")
 
 
-async def _ensure_can_edit(project: Project, user: User) -> None:
-    # Same rule as view for now — team members can move/edit cards, owner/admin always can.
-    await _ensure_can_view(project, user)
+def _ensure_can_edit(access: ProjectAccess, user: User) -> None:
+    if not access.can_edit(user):
+        raise HTTPException(status_code=403, detail="Not a team member on this project")
 
 
-async def _ensure_can_delete(project: Project, user: User) -> None:
-    if user.role == RoleEnum.admin or project.owner_id == user.id:
-        return
-    membership = await teams_repo.get_by_project_and_user(project.id, user.id)
-    if membership and membership.is_lead:
-        return
-    raise HTTPException(status_code=403, detail="Only project owner, admin, or team lead can delete tasks")
+def _ensure_can_delete(access: ProjectAccess, user: User) -> None:
+    if not access.can_delete(user):
+        raise HTTPException(status_code=403, detail="Only project owner, admin, or team lead can delete tasks")
 
 
 # ── Response mappers ──────────────────────────────────────
@@ -102,11 +86,13 @@ async def _activity_to_response(activity: TaskActivity) -> ActivityResponse:
 
 # ── Notification helper ───────────────────────────────────
 
-async def _notify_assignee(task: Task, title: str, message: str, acting_user_id: int) -> None:
+async def _notify_assignee(task: Task, title: str, message: str, acting_user_id: int,
+                           group_key: Optional[str] = None) -> None:
     if task.assignee_id and task.assignee_id != acting_user_id:
         await create_notification(
             task.assignee_id, title, message,
             notification_type="task", link=f"/projects/{task.project_id}/board",
+            group_key=group_key,
         )
 
 
@@ -115,34 +101,32 @@ async def _notify_assignee(task: Task, title: str, message: str, acting_user_id:
 async def list_tasks(project_id: int, user: User,
                      assignee_id: Optional[int], priority: Optional[TaskPriority],
                      deadline_before: Optional[datetime]) -> list[TaskResponse]:
-    project = await _project_or_404(project_id)
-    await _ensure_can_view(project, user)
+    access = await project_access_or_404(project_id)
+    _ensure_can_view(access, user)
     tasks = await repository.list_project_tasks(project_id, assignee_id, priority, deadline_before)
     return [await _task_to_response(t) for t in tasks]
 
 
 async def get_task(task_id: int, user: User) -> TaskResponse:
     task = await _task_or_404(task_id)
-    project = await _project_or_404(task.project_id)
-    await _ensure_can_view(project, user)
+    access = await project_access_or_404(task.project_id)
+    _ensure_can_view(access, user)
     return await _task_to_response(task)
 
 
 async def create_task(project_id: int, user: User, title: str, description: str,
                       status: TaskStatus, priority: TaskPriority,
                       assignee_id: Optional[int], deadline: Optional[datetime]) -> TaskResponse:
-    project = await _project_or_404(project_id)
-    await _ensure_can_edit(project, user)
+    access = await project_access_or_404(project_id)
+    _ensure_can_edit(access, user)
 
     if assignee_id is not None:
         target = await User.filter(id=assignee_id).first()
         if not target:
             raise HTTPException(status_code=404, detail="Assignee not found")
         # Assignee must be owner or a team member on this project
-        if target.id != project.owner_id:
-            membership = await teams_repo.get_by_project_and_user(project_id, assignee_id)
-            if not membership:
-                raise HTTPException(status_code=400, detail="Assignee is not on the project team")
+        if target.id != access.owner_id and not access.is_member(target.id):
+            raise HTTPException(status_code=400, detail="Assignee is not on the project team")
 
     task = await repository.create_task(
         project_id=project_id, created_by=user.id, title=title, description=description,
@@ -162,8 +146,8 @@ async def create_task(project_id: int, user: User, title: str, description: str,
 
 async def update_task(task_id: int, user: User, data: dict) -> TaskResponse:
     task = await _task_or_404(task_id)
-    project = await _project_or_404(task.project_id)
-    await _ensure_can_edit(project, user)
+    access = await project_access_or_404(task.project_id)
+    _ensure_can_edit(access, user)
 
     old_status = task.status
     old_assignee_id = task.assignee_id
@@ -198,10 +182,8 @@ async def update_task(task_id: int, user: User, data: dict) -> TaskResponse:
             target = await User.filter(id=new_id).first()
             if not target:
                 raise HTTPException(status_code=404, detail="Assignee not found")
-            if target.id != project.owner_id:
-                membership = await teams_repo.get_by_project_and_user(project.id, new_id)
-                if not membership:
-                    raise HTTPException(status_code=400, detail="Assignee is not on the project team")
+            if target.id != access.owner_id and not access.is_member(target.id):
+                raise HTTPException(status_code=400, detail="Assignee is not on the project team")
         changed.append(("assignee", str(task.assignee_id) if task.assignee_id else None,
                         str(new_id) if new_id else None))
         task.assignee_id = new_id
@@ -219,7 +201,7 @@ async def update_task(task_id: int, user: User, data: dict) -> TaskResponse:
         await _notify_assignee(
             task, "Task Updated",
             f"Task '{task.title}' moved to {task.status.value}",
-            user.id,
+            user.id, group_key=f"task:{task.id}:moves",
         )
     if task.assignee_id and task.assignee_id != old_assignee_id and task.assignee_id != user.id:
         await create_notification(
@@ -233,40 +215,38 @@ async def update_task(task_id: int, user: User, data: dict) -> TaskResponse:
 
 async def delete_task(task_id: int, user: User) -> None:
     task = await _task_or_404(task_id)
-    project = await _project_or_404(task.project_id)
-    await _ensure_can_delete(project, user)
+    access = await project_access_or_404(task.project_id)
+    _ensure_can_delete(access, user)
     await repository.delete_task(task_id)
 
 
 async def add_comment(task_id: int, user: User, content: str) -> CommentResponse:
     task = await _task_or_404(task_id)
-    project = await _project_or_404(task.project_id)
-    await _ensure_can_view(project, user)
+    access = await project_access_or_404(task.project_id)
+    _ensure_can_view(access, user)
 
     comment = await repository.add_comment(task_id, user.id, content)
     await repository.log_activity(task_id, user.id, "commented", None, None)
 
-    if task.assignee_id and task.assignee_id != user.id:
-        await create_notification(
-            task.assignee_id, "New Task Comment",
-            f"New comment on task '{task.title}'",
-            notification_type="task", link=f"/projects/{task.project_id}/board",
-        )
+    await _notify_assignee(
+        task, "New Task Comment", f"New comment on task '{task.title}'",
+        user.id, group_key=f"task:{task.id}:comments",
+    )
 
     return await _comment_to_response(comment)
 
 
 async def list_comments(task_id: int, user: User) -> list[CommentResponse]:
     task = await _task_or_404(task_id)
-    project = await _project_or_404(task.project_id)
-    await _ensure_can_view(project, user)
+    access = await project_access_or_404(task.project_id)
+    _ensure_can_view(access, user)
     comments = await repository.list_comments(task_id)
     return [await _comment_to_response(c) for c in comments]
 
 
 async def list_activity(task_id: int, user: User) -> list[ActivityResponse]:
     task = await _task_or_404(task_id)
-    project = await _project_or_404(task.project_id)
-    await _ensure_can_view(project, user)
+    access = await project_access_or_404(task.project_id)
+    _ensure_can_view(access, user)
     activities = await repository.list_activity(task_id)
     return [await _activity_to_response(a) for a in activities]
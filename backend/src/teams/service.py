@@ -2,9 +2,11 @@ from fastapi import HTTPException
 from src.teams import repository
 from src.teams.models import ProjectTeam, TeamRole
 from src.teams.schemas import TeamMemberResponse
+from src.projects.access import invalidate_project_access, project_access_or_404
 from src.projects.models import Project
 from src.users.models import User, RoleEnum
 from src.notifications.service import create_notification
+from src.chat import service as chat_service
 
 
 def _member_to_response(member: ProjectTeam, user: User) -> TeamMemberResponse:
@@ -50,18 +52,15 @@ async def add_member(project_id: int, user_id: int, role: TeamRole,
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    is_owner = project.owner_id == current_user.id
-    is_admin = current_user.role == RoleEnum.admin
-    lead_membership = await repository.get_by_project_and_user(project_id, current_user.id)
-    is_lead = lead_membership and lead_membership.is_lead
-
-    if not (is_owner or is_admin or is_lead):
+    access = await project_access_or_404(project_id)
+    if not access.can_manage_team(current_user):
         raise HTTPException(status_code=403, detail="Only project owner, admin, or team lead can add members")
 
     target_user = await User.filter(id=user_id).first()
     if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    # Writes check the database itself rather than the cached roster
     existing = await repository.get_by_project_and_user(project_id, user_id)
     if existing:
         raise HTTPException(status_code=400, detail="User is already a team member")
@@ -71,6 +70,8 @@ async def add_member(project_id: int, user_id: int, role: TeamRole,
         raise HTTPException(status_code=400, detail="Team has reached maximum size")
 
     member = await repository.add_member(project_id, user_id, role)
+    await invalidate_project_access(project_id)
+    await chat_service.add_team_room_members(project_id, [user_id])
 
     await create_notification(
         user_id, "Team Invitation",
@@ -87,23 +88,24 @@ async def remove_member(project_id: int, user_id: int,
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    is_owner = project.owner_id == current_user.id
-    is_admin = current_user.role == RoleEnum.admin
-    lead_membership = await repository.get_by_project_and_user(project_id, current_user.id)
-    is_lead = lead_membership and lead_membership.is_lead
+    access = await project_access_or_404(project_id)
+    is_owner_or_admin = access.is_owner(current_user) or current_user.role == RoleEnum.admin
     is_self = current_user.id == user_id
 
-    if not (is_owner or is_admin or is_lead or is_self):
+    if not (access.can_manage_team(current_user) or is_self):
         raise HTTPException(status_code=403, detail="Not authorized to remove this member")
 
     member = await repository.get_by_project_and_user(project_id, user_id)
     if not member:
         raise HTTPException(status_code=404, detail="Team member not found")
 
-    if member.is_lead and not (is_owner or is_admin):
+    if member.is_lead and not is_owner_or_admin:
         raise HTTPException(status_code=400, detail="Only project owner or admin can remove the team lead")
 
     await repository.remove_member(project_id, user_id)
+    await invalidate_project_access(project_id)
+    if user_id != project.owner_id:
+        await chat_service.remove_team_room_members(project_id, [user_id])
 
     if not is_self:
         await create_notification(
@@ -115,16 +117,10 @@ async def remove_member(project_id: int, user_id: int,
 
 async def update_member(project_id: int, user_id: int, role: TeamRole | None,
                         is_lead: bool | None, current_user: User) -> TeamMemberResponse:
-    project = await Project.filter(id=project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    is_owner = project.owner_id == current_user.id
-    is_admin = current_user.role == RoleEnum.admin
-    lead_membership = await repository.get_by_project_and_user(project_id, current_user.id)
-    current_is_lead = lead_membership and lead_membership.is_lead
+    access = await project_access_or_404(project_id)
+    is_owner_or_admin = access.is_owner(current_user) or current_user.role == RoleEnum.admin
 
-    if not (is_owner or is_admin or current_is_lead):
+    if not access.can_manage_team(current_user):
         raise HTTPException(status_code=403, detail="Not authorized to update team members")
 
     member = await repository.get_by_project_and_user(project_id, user_id)
@@ -134,11 +130,12 @@ async def update_member(project_id: int, user_id: int, role: TeamRole | None,
     if role is not None:
         member.role = role
     if is_lead is not None:
-        if is_lead and not (is_owner or is_admin):
+        if is_lead and not is_owner_or_admin:
             raise HTTPException(status_code=403, detail="Only project owner or admin can assign lead")
         member.is_lead = is_lead
 
     await repository.update_member(member)
+    await invalidate_project_access(project_id)
 
     target_user = await User.filter(id=user_id).first()
     return _member_to_response(member, target_user)
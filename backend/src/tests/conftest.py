@@ -6,6 +6,9 @@ from httpx import AsyncClient, ASGITransport
 from tortoise import Tortoise
 
 from src.main import app
+from src.core.config import settings
+from src.core.storage import MemoryBackend, storage as object_storage
+from src.projects.recommendations import index as recommendation_index
 
 TEST_MODELS = [
     "src.users.models",
@@ -42,6 +45,22 @@ async def mock_cache_delete_pattern(pattern):
         mock_redis_store.pop(k, None)
 
 
+async def mock_cache_version(version_key):
+    return mock_redis_store.get(version_key, 0)
+
+
+async def mock_cache_set_if_version(key, value, ttl, version_key, version):
+    if mock_redis_store.get(version_key, 0) != version:
+        return False
+    mock_redis_store[key] = value
+    return True
+
+
+async def mock_cache_invalidate_versioned(key, version_key):
+    mock_redis_store[version_key] = mock_redis_store.get(version_key, 0) + 1
+    mock_redis_store.pop(key, None)
+
+
 async def mock_blacklist(*a, **kw):
     pass
 
@@ -50,27 +69,194 @@ async def mock_is_blacklisted(token):
     return False
 
 
-async def mock_incr_counter(key):
-    return 1
+async def mock_incr_existing_counters(keys):
+    values = []
+    for key in keys:
+        if key in mock_redis_store:
+            mock_redis_store[key] = int(mock_redis_store[key]) + 1
+            values.append(mock_redis_store[key])
+        else:
+            values.append(None)
+    return values
 
 
-async def mock_get_counter(key):
-    return 0
+async def mock_decr_counter_floor(key, amount=1):
+    if key not in mock_redis_store:
+        return None
+    mock_redis_store[key] = max(int(mock_redis_store[key]) - amount, 0)
+    return mock_redis_store[key]
 
 
-async def mock_reset_counter(key):
-    pass
+async def mock_get_counter_or_none(key):
+    val = mock_redis_store.get(key)
+    return int(val) if val is not None else None
+
+
+async def mock_get_counters(keys):
+    return [await mock_get_counter_or_none(k) for k in keys]
+
+
+async def mock_set_counter(key, value, ttl, only_if_missing=False):
+    if not (only_if_missing and key in mock_redis_store):
+        mock_redis_store[key] = value
+
+
+async def mock_compare_and_set_counter(key, expected, value):
+    if mock_redis_store.get(key) == expected:
+        mock_redis_store[key] = value
+        return True
+    return False
+
+
+async def mock_acquire_flags(keys, ttl):
+    acquired = []
+    for key in keys:
+        acquired.append(key not in mock_redis_store)
+        mock_redis_store.setdefault(key, "1")
+    return acquired
+
+
+async def mock_take_flags(keys):
+    return [mock_redis_store.pop(key, None) is not None for key in keys]
+
+
+async def mock_upload_session_create(session_id, data, expires_at, ttl):
+    mock_redis_store[f"upload_session:{session_id}"] = data
+    mock_redis_store.setdefault("upload_sessions:expiry", {})[session_id] = expires_at
+
+
+async def mock_upload_session_get(session_id):
+    parts = mock_redis_store.get(f"upload_session:{session_id}:parts", {})
+    return mock_redis_store.get(f"upload_session:{session_id}"), dict(parts)
+
+
+async def mock_upload_session_add_part(session_id, part_number, info, ttl):
+    mock_redis_store.setdefault(f"upload_session:{session_id}:parts", {})[part_number] = info
+
+
+async def mock_upload_session_delete(session_id):
+    mock_redis_store.pop(f"upload_session:{session_id}", None)
+    mock_redis_store.pop(f"upload_session:{session_id}:parts", None)
+    return mock_redis_store.get("upload_sessions:expiry", {}).pop(session_id, None) is not None
+
+
+async def mock_upload_sessions_expired(now, limit):
+    expiry = mock_redis_store.get("upload_sessions:expiry", {})
+    return [sid for sid, at in sorted(expiry.items(), key=lambda item: item[1]) if at <= now][:limit]
+
+
+async def mock_pending_upload_create(upload_id, data, expires_at, ttl):
+    mock_redis_store[f"file_upload:{upload_id}"] = data
+    mock_redis_store.setdefault("file_uploads:expiry", {})[upload_id] = expires_at
+
+
+async def mock_pending_upload_get(upload_id):
+    return mock_redis_store.get(f"file_upload:{upload_id}")
+
+
+async def mock_pending_upload_claim(upload_id):
+    mock_redis_store.get("file_uploads:expiry", {}).pop(upload_id, None)
+    return mock_redis_store.pop(f"file_upload:{upload_id}", None)
+
+
+async def mock_pending_uploads_expired(now, limit):
+    expiry = mock_redis_store.get("file_uploads:expiry", {})
+    return [uid for uid, at in sorted(expiry.items(), key=lambda item: item[1]) if at <= now][:limit]
+
+
+async def mock_scan_keys(pattern, cursor, count):
+    prefix = pattern.replace("*", "")
+    return 0, [k for k in mock_redis_store if k.startswith(prefix)][:count]
 
 
 async def mock_publish_message(channel, data):
     pass
 
 
+async def mock_publish_messages(messages):
+    pass
+
+
 async def mock_rate_limit_check(key, max_requests=5, window=60):
     return True
 
 
 # Mock MongoDB
+def _field_matches(value, cond) -> bool:
+    if isinstance(cond, dict) and any(k.startswith("$") for k in cond):
+        for op, arg in cond.items():
+            if op == "$in" and not (value in arg or (isinstance(value, list) and set(value) & set(arg))):
+                return False
+            if op == "$all" and not (isinstance(value, list) and all(a in value for a in arg)):
+                return False
+            if op == "$ne" and value == arg:
+                return False
+            if op == "$exists" and (value is not None) != bool(arg):
+                return False
+            if op == "$type" and arg == "string" and not isinstance(value, str):
+                return False
+            if op in ("$lt", "$lte", "$gt", "$gte"):
+                if value is None:
+                    return False
+                if op == "$lt" and not value < arg:
+                    return False
+                if op == "$lte" and not value <= arg:
+                    return False
+                if op == "$gt" and not value > arg:
+                    return False
+                if op == "$gte" and not value >= arg:
+                    return False
+        return True
+    if isinstance(value, list) and not isinstance(cond, list):
+        return cond in value
+    return value == cond
+
+
+def _matches(doc: dict, query: dict | None) -> bool:
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif not _field_matches(doc.get(key), cond):
+            return False
+    return True
+
+
+def _eval_expr(expr, doc: dict):
+    """Tiny subset of the aggregation expression language used by the repositories."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:])
+    if isinstance(expr, dict):
+        if "$ifNull" in expr:
+            value, default = expr["$ifNull"]
+            value = _eval_expr(value, doc)
+            return default if value is None else value
+        if "$slice" in expr:
+            items, *bounds = expr["$slice"]
+            start, n = bounds if len(bounds) == 2 else (0, bounds[0])
+            return _eval_expr(items, doc)[start:start + n]
+        return {k: _eval_expr(v, doc) for k, v in expr.items()}
+    return expr
+
+
+def _apply_update(doc: dict, update: dict, inserting: bool = False) -> None:
+    for op, fields in update.items():
+        for key, val in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                doc[key] = val
+            elif op == "$unset":
+                doc.pop(key, None)
+            elif op == "$inc":
+                doc[key] = doc.get(key, 0) + val
+            elif op == "$addToSet":
+                items = val["$each"] if isinstance(val, dict) and "$each" in val else [val]
+                current = doc.setdefault(key, [])
+                current.extend(i for i in items if i not in current)
+            elif op == "$pull":
+                items = val["$in"] if isinstance(val, dict) and "$in" in val else [val]
+                doc[key] = [i for i in doc.get(key, []) if i not in items]
+
+
 class MockCollection:
     def __init__(self):
         self.docs = []
@@ -79,27 +265,82 @@ class MockCollection:
     async def insert_one(self, doc):
         self._counter += 1
         from bson import ObjectId
-        doc["_id"] = ObjectId()
+        doc.setdefault("_id", ObjectId())
         self.docs.append(doc)
         return MagicMock(inserted_id=doc["_id"])
 
-    async def find_one(self, *a, **kw):
-        return self.docs[0] if self.docs else None
-
-    async def find_one_and_update(self, *a, **kw):
-        return self.docs[0] if self.docs else None
-
-    async def update_one(self, *a, **kw):
-        pass
-
-    async def update_many(self, *a, **kw):
-        pass
-
-    async def count_documents(self, query):
-        return len(self.docs)
-
-    def find(self, *a, **kw):
-        return MockCursor(self.docs)
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            await self.insert_one(doc)
+        return MagicMock(inserted_ids=[d["_id"] for d in docs])
+
+    async def find_one(self, query=None, *a, **kw):
+        return next((d for d in self.docs if _matches(d, query)), None)
+
+    async def find_one_and_update(self, query=None, update=None, *a, upsert=False, **kw):
+        doc = await self.find_one(query)
+        if doc is None and upsert:
+            doc = {k: v for k, v in (query or {}).items() if not k.startswith("$")}
+            _apply_update(doc, update or {}, inserting=True)
+            await self.insert_one(doc)
+        elif doc is not None:
+            _apply_update(doc, update or {})
+        return doc
+
+    async def update_one(self, query=None, update=None, *a, **kw):
+        doc = await self.find_one(query)
+        if doc is not None:
+            _apply_update(doc, update or {})
+        return MagicMock(matched_count=int(doc is not None), modified_count=int(doc is not None))
+
+    async def update_many(self, query=None, update=None, *a, **kw):
+        matched = [d for d in self.docs if _matches(d, query)]
+        for doc in matched:
+            _apply_update(doc, update or {})
+        return MagicMock(matched_count=len(matched), modified_count=len(matched))
+
+    async def delete_many(self, query=None, *a, **kw):
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not _matches(d, query)]
+        return MagicMock(deleted_count=before - len(self.docs))
+
+    async def count_documents(self, query=None, *a, **kw):
+        return sum(1 for d in self.docs if _matches(d, query))
+
+    def find(self, query=None, *a, **kw):
+        return MockCursor([d for d in self.docs if _matches(d, query)])
+
+    def aggregate(self, pipeline):
+        docs = list(self.docs)
+        for stage in pipeline:
+            if "$match" in stage:
+                docs = [d for d in docs if _matches(d, stage["$match"])]
+            elif "$sort" in stage:
+                for field, order in reversed(list(stage["$sort"].items())):
+                    docs = sorted(docs, key=lambda d: d.get(field), reverse=order == -1)
+            elif "$group" in stage:
+                spec = dict(stage["$group"])
+                key_expr = spec.pop("_id")
+                groups: dict = {}
+                for d in docs:
+                    group = groups.setdefault(_eval_expr(key_expr, d), {})
+                    for name, acc in spec.items():
+                        if "$sum" in acc:
+                            group[name] = group.get(name, 0) + _eval_expr(acc["$sum"], d)
+                        elif "$push" in acc:
+                            group.setdefault(name, []).append(_eval_expr(acc["$push"], d))
+                docs = [{"_id": k, **v} for k, v in groups.items()]
+            elif "$project" in stage:
+                docs = [{"_id": d["_id"], **{
+                    k: d.get(k) if v == 1 else _eval_expr(v, d) for k, v in stage["$project"].items()
+                }} for d in docs]
+            elif "$count" in stage:
+                docs = [{stage["$count"]: len(docs)}] if docs else []
+        return MockCursor(docs)
+
+    async def bulk_write(self, requests, ordered=True):
+        for op in requests:
+            await self.find_one_and_update(op._filter, op._doc, upsert=op._upsert)
 
     async def create_index(self, *a, **kw):
         pass
@@ -111,7 +352,14 @@ class MockCursor:
         self._skip = 0
         self._limit = 100
 
-    def sort(self, *a, **kw):
+    def sort(self, key, direction=None):
+        fields = key if isinstance(key, list) else [(key, direction or 1)]
+        for field, order in reversed(fields):
+            self._docs = sorted(
+                self._docs,
+                key=lambda d: (d.get(field) is not None, d.get(field) if d.get(field) is not None else 0),
+                reverse=order == -1,
+            )
         return self
 
     def skip(self, n):
@@ -139,6 +387,8 @@ class MockMongoDB:
         self.chat_rooms = MockCollection()
         self.notifications = MockCollection()
         self.activity_logs = MockCollection()
+        self.activity_rollups = MockCollection()
+        self.activity_daily_users = MockCollection()
 
 
 mock_mongo = MockMongoDB()
@@ -161,10 +411,9 @@ PATCHES = [
     ("src.core.redis.cache_delete_pattern", mock_cache_delete_pattern),
     ("src.core.redis.blacklist_token", mock_blacklist),
     ("src.core.redis.is_token_blacklisted", mock_is_blacklisted),
-    ("src.core.redis.incr_counter", mock_incr_counter),
-    ("src.core.redis.get_counter", mock_get_counter),
-    ("src.core.redis.reset_counter", mock_reset_counter),
     ("src.core.redis.publish_message", mock_publish_message),
+    ("src.core.redis.incr_existing_counters", mock_incr_existing_counters),
+    ("src.core.redis.publish_messages", mock_publish_messages),
     # Redis at import sites
     ("src.auth.router.rate_limit_check", mock_rate_limit_check),
     ("src.auth.router.cache_set", mock_cache_set),
@@ -178,7 +427,24 @@ PATCHES = [
     ("src.skills.service.cache_get", mock_cache_get),
     ("src.skills.service.cache_set", mock_cache_set),
     ("src.skills.service.cache_delete", mock_cache_delete),
+    ("src.projects.service.cache_get", mock_cache_get),
+    ("src.projects.service.cache_set", mock_cache_set),
     ("src.projects.service.cache_delete_pattern", mock_cache_delete_pattern),
+    ("src.files.service.cache_delete", mock_cache_delete),
+    ("src.files.service.acquire_flags", mock_acquire_flags),
+    ("src.files.service.upload_session_create", mock_upload_session_create),
+    ("src.files.service.upload_session_get", mock_upload_session_get),
+    ("src.files.service.upload_session_add_part", mock_upload_session_add_part),
+    ("src.files.service.upload_session_delete", mock_upload_session_delete),
+    ("src.files.service.upload_sessions_expired", mock_upload_sessions_expired),
+    ("src.files.service.pending_upload_create", mock_pending_upload_create),
+    ("src.files.service.pending_upload_get", mock_pending_upload_get),
+    ("src.files.service.pending_upload_claim", mock_pending_upload_claim),
+    ("src.files.service.pending_uploads_expired", mock_pending_uploads_expired),
+    ("src.projects.access.cache_get", mock_cache_get),
+    ("src.projects.access.cache_version", mock_cache_version),
+    ("src.projects.access.cache_set_if_version", mock_cache_set_if_version),
+    ("src.projects.access.cache_invalidate_versioned", mock_cache_invalidate_versioned),
     ("src.admin.service.cache_get", mock_cache_get),
     ("src.admin.service.cache_set", mock_cache_set),
     ("src.chat.service.publish_message", mock_publish_message),
@@ -189,10 +455,18 @@ PATCHES = [
     ("src.chat.repository.get_mongodb", mock_get_mongodb),
     ("src.admin.repository.get_mongodb", mock_get_mongodb),
     # Notification counters
-    ("src.notifications.service.incr_counter", mock_incr_counter),
-    ("src.notifications.service.get_counter", mock_get_counter),
-    ("src.notifications.service.reset_counter", mock_reset_counter),
-    ("src.notifications.service.get_redis", AsyncMock(return_value=MagicMock(decr=AsyncMock()))),
+    ("src.notifications.service.incr_existing_counters", mock_incr_existing_counters),
+    ("src.notifications.service.decr_counter_floor", mock_decr_counter_floor),
+    ("src.notifications.service.get_counter_or_none", mock_get_counter_or_none),
+    ("src.notifications.service.get_counters", mock_get_counters),
+    ("src.notifications.service.set_counter", mock_set_counter),
+    ("src.notifications.service.compare_and_set_counter", mock_compare_and_set_counter),
+    ("src.notifications.service.scan_keys", mock_scan_keys),
+    ("src.notifications.service.acquire_flags", mock_acquire_flags),
+    ("src.notifications.service.take_flags", mock_take_flags),
+    ("src.notifications.digest.acquire_flags", mock_acquire_flags),
+    ("src.notifications.service.publish_message", mock_publish_message),
+    ("src.notifications.service.publish_messages", mock_publish_messages),
     # Chat Redis
     ("src.chat.router.get_redis", AsyncMock(return_value=MagicMock(pubsub=MagicMock(return_value=MagicMock(
         subscribe=AsyncMock(), unsubscribe=AsyncMock(), close=AsyncMock(),
@@ -202,7 +476,7 @@ PATCHES = [
     ("src.auth.service.log_activity", AsyncMock()),
     ("src.applications.service.log_activity", AsyncMock()),
     # Email
-    ("src.core.email._send_smtp", AsyncMock()),
+    ("src.core.email.enqueue_email", AsyncMock()),
 ]
 
 
@@ -211,11 +485,20 @@ def patch_externals():
     with ExitStack() as stack:
         for target, mock_obj in PATCHES:
             stack.enter_context(patch(target, mock_obj))
+        # Object storage runs against the in-memory backend
+        stack.enter_context(patch.object(object_storage, "_backend", MemoryBackend()))
+        stack.enter_context(patch.object(object_storage, "metrics", {}))
+        # Previews need a process pool; tests that cover them switch this back on
+        stack.enter_context(patch.object(settings, "PREVIEWS_ENABLED", False))
+        # Each test gets a fresh database, so the recommendation index must start over too
+        recommendation_index.clear()
         mock_redis_store.clear()
         mock_mongo.chat_messages = MockCollection()
         mock_mongo.chat_rooms = MockCollection()
         mock_mongo.notifications = MockCollection()
         mock_mongo.activity_logs = MockCollection()
+        mock_mongo.activity_rollups = MockCollection()
+        mock_mongo.activity_daily_users = MockCollection()
         yield
 
 
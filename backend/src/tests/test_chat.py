@@ -0,0 +1,131 @@
+import pytest
+from httpx import AsyncClient
+from src.tests.conftest import auth, mock_mongo
+from src.tests.test_teams import _create_project_and_accept
+
+
+async def _user_id(client: AsyncClient, token: str) -> int:
+    return (await client.get("/api/v1/auth/me", headers=auth(token))).json()["id"]
+
+
+# ── Direct rooms ───────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_dm_room_is_reused(client: AsyncClient, company_token, student_token):
+    pid, _ = await _create_project_and_accept(client, company_token, student_token)
+    student_id = await _user_id(client, student_token)
+    company_id = await _user_id(client, company_token)
+
+    r1 = await client.post(f"/api/v1/chat/rooms/{pid}/{student_id}", headers=auth(company_token))
+    r2 = await client.post(f"/api/v1/chat/rooms/{pid}/{company_id}", headers=auth(student_token))
+    assert r1.status_code == 200
+    assert r1.json()["id"] == r2.json()["id"]
+
+    room = mock_mongo.chat_rooms.docs[0]
+    assert room["kind"] == "dm"
+    assert room["key"] == f"{min(student_id, company_id)}:{max(student_id, company_id)}"
+
+
+@pytest.mark.asyncio
+async def test_dm_room_is_not_the_team_room(client: AsyncClient, company_token, student_token):
+    pid, _ = await _create_project_and_accept(client, company_token, student_token)
+    student_id = await _user_id(client, student_token)
+
+    team = await client.post(f"/api/v1/chat/team-room/{pid}", headers=auth(company_token))
+    dm = await client.post(f"/api/v1/chat/rooms/{pid}/{student_id}", headers=auth(company_token))
+    assert team.json()["id"] != dm.json()["id"]
+    assert len(mock_mongo.chat_rooms.docs) == 2
+
+
+# ── Team room membership sync ──────────────────────────
+
+@pytest.mark.asyncio
+async def test_team_room_follows_team_changes(client: AsyncClient, company_token, student_token):
+    from src.tests.conftest import _register_and_verify
+    pid, _ = await _create_project_and_accept(client, company_token, student_token)
+    r = await client.post(f"/api/v1/chat/team-room/{pid}", headers=auth(company_token))
+    room_id = r.json()["id"]
+
+    s2_token = await _register_and_verify(client, "s2@test.com", "student2", "pass123", "student")
+    s2_id = await _user_id(client, s2_token)
+    await client.post(f"/api/v1/teams/project/{pid}/members", json={
+        "user_id": s2_id, "role": "other",
+    }, headers=auth(company_token))
+    room = next(d for d in mock_mongo.chat_rooms.docs if str(d["_id"]) == room_id)
+    assert s2_id in room["participants"]
+
+    r = await client.post(f"/api/v1/chat/team-room/{pid}", headers=auth(s2_token))
+    assert r.status_code == 200
+    assert r.json()["id"] == room_id
+
+    await client.delete(f"/api/v1/teams/project/{pid}/members/{s2_id}", headers=auth(company_token))
+    assert s2_id not in room["participants"]
+    r = await client.post(f"/api/v1/chat/team-room/{pid}", headers=auth(s2_token))
+    assert r.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_legacy_team_room_does_not_admit_former_members(client: AsyncClient, company_token, student_token):
+    from src.tests.conftest import _register_and_verify
+    pid, _ = await _create_project_and_accept(client, company_token, student_token)
+    await client.post(f"/api/v1/chat/team-room/{pid}", headers=auth(company_token))
+    former = await _register_and_verify(client, "f@test.com", "former", "pass123", "student")
+    former_id = await _user_id(client, former)
+    # A room from before membership sync still lists someone no longer on the team
+    room = mock_mongo.chat_rooms.docs[0]
+    room["participants"].append(former_id)
+
+    r = await client.post(f"/api/v1/chat/team-room/{pid}", headers=auth(former))
+    assert r.status_code == 403
+
+    r = await client.post(f"/api/v1/chat/team-room/{pid}", headers=auth(company_token))
+    assert former_id not in r.json()["participants"]
+    assert former_id not in room["participants"]
+
+
+# ── Room list ──────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_room_list_pages_with_names(client: AsyncClient, company_token, student_token):
+    from datetime import datetime
+    pid, _ = await _create_project_and_accept(client, company_token, student_token)
+    student_id = await _user_id(client, student_token)
+    await client.post(f"/api/v1/chat/team-room/{pid}", headers=auth(company_token))
+    await client.post(f"/api/v1/chat/rooms/{pid}/{student_id}", headers=auth(company_token))
+    team, dm = mock_mongo.chat_rooms.docs
+    dm["last_message_at"] = datetime(2026, 1, 2)
+    team["last_message_at"] = datetime(2026, 1, 1)
+    mock_mongo.chat_rooms.docs.sort(key=lambda d: d["last_message_at"], reverse=True)
+
+    r = await client.get("/api/v1/chat/rooms", params={"limit": 1}, headers=auth(company_token))
+    assert r.status_code == 200
+    first = r.json()
+    assert [room["id"] for room in first] == [str(dm["_id"])]
+    assert first[0]["participant_names"][str(student_id)] == "student1"
+
+    r = await client.get("/api/v1/chat/rooms", params={
+        "limit": 1, "before": first[0]["last_message_at"], "before_id": first[0]["id"],
+    }, headers=auth(company_token))
+    assert [room["id"] for room in r.json()] == [str(team["_id"])]
+
+    r = await client.get("/api/v1/chat/rooms", params={"before_id": "nope"}, headers=auth(company_token))
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_single_room_requires_participant(client: AsyncClient, company_token, student_token):
+    from src.tests.conftest import _register_and_verify
+    pid, _ = await _create_project_and_accept(client, company_token, student_token)
+    room_id = (await client.post(f"/api/v1/chat/team-room/{pid}", headers=auth(company_token))).json()["id"]
+
+    r = await client.get(f"/api/v1/chat/rooms/{room_id}", headers=auth(student_token))
+    assert r.status_code == 200
+    assert r.json()["id"] == room_id
+
+    outsider = await _register_and_verify(client, "o@test.com", "outsider", "pass123", "student")
+    r = await client.get(f"/api/v1/chat/rooms/{room_id}", headers=auth(outsider))
+    assert r.status_code == 403
+
+    for bad_id in ("not-an-id", "0" * 24):
+        r = await client.get(f"/api/v1/chat/rooms/{bad_id}", headers=auth(student_token))
+        assert r.status_code == 404
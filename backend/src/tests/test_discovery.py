@@ -1,5 +1,7 @@
+from datetime import datetime, timedelta, timezone
 import pytest
 from httpx import AsyncClient
+from src.projects.models import Project
 from src.tests.conftest import auth
 
 
@@ -132,3 +134,138 @@ async def test_existing_search_still_works(client: AsyncClient, company_token: s
     r = await client.get("/api/v1/projects/?search=Unique+Title")
     assert r.status_code == 200
     assert r.json()["total"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_multi_skill_match_is_listed_once(client: AsyncClient, company_token: str, student_token: str):
+    """A project matching several requested skills (or skill names) appears once, relevance sort included."""
+    s1 = (await client.post("/api/v1/skills/", json={"name": "Vue"}, headers=auth(student_token))).json()["id"]
+    s2 = (await client.post("/api/v1/skills/", json={"name": "Vuex"}, headers=auth(student_token))).json()["id"]
+    await client.post("/api/v1/projects/", json={
+        "title": "Dashboard", "description": "Admin dashboard", "skill_ids": [s1, s2],
+    }, headers=auth(company_token))
+
+    r = await client.get(f"/api/v1/projects/?skill_ids={s1}&skill_ids={s2}")
+    assert (r.json()["total"], len(r.json()["items"])) == (1, 1)
+    r = await client.get("/api/v1/projects/?search=vue&sort=relevance")
+    assert r.status_code == 200
+    assert (r.json()["total"], len(r.json()["items"])) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_walks_every_project_once(client: AsyncClient, company_token: str):
+    deadlines = ["2026-12-01T00:00:00", None, "2026-11-01T00:00:00", None, "2026-11-01T00:00:00"]
+    for i, deadline in enumerate(deadlines):
+        await client.post("/api/v1/projects/", json={
+            "title": f"Paged {i}", "description": "Keyset pagination", "deadline": deadline,
+        }, headers=auth(company_token))
+
+    for sort in ("newest", "deadline"):
+        seen, cursor = [], None
+        while True:
+            params = {"size": 2, "sort": sort, "count": "cached"}
+            if cursor:
+                params["cursor"] = cursor
+            r = await client.get("/api/v1/projects/", params=params)
+            assert r.status_code == 200
+            assert r.json()["total"] == 5
+            seen += r.json()["items"]
+            cursor = r.json()["next_cursor"]
+            if not cursor:
+                break
+        assert len({p["id"] for p in seen}) == 5
+        if sort == "newest":
+            assert [p["id"] for p in seen] == sorted((p["id"] for p in seen), reverse=True)
+        else:
+            assert [p["deadline"] is None for p in seen] == [False, False, False, True, True]
+            assert seen[0]["title"] in ("Paged 2", "Paged 4") and seen[2]["title"] == "Paged 0"
+            # Numbered pages use the same order, undated projects last on every database
+            offset = [p for page in (1, 2, 3) for p in (await client.get("/api/v1/projects/", params={
+                "size": 2, "sort": "deadline", "page": page, "view": "card"})).json()["items"]]
+            assert [p["id"] for p in offset] == [p["id"] for p in seen]
+
+    newest_cursor = (await client.get("/api/v1/projects/?size=2")).json()["next_cursor"]
+    r = await client.get("/api/v1/projects/", params={"sort": "deadline", "cursor": newest_cursor})
+    assert r.status_code == 400
+
+    # Cached totals are dropped when a project is created
+    await client.post("/api/v1/projects/", json={
+        "title": "Paged 5", "description": "Keyset pagination",
+    }, headers=auth(company_token))
+    assert (await client.get("/api/v1/projects/?count=cached")).json()["total"] == 6
+    assert (await client.get("/api/v1/projects/?cursor=garbage")).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_card_view_returns_snippets_and_skills(client: AsyncClient, company_token: str, student_token: str):
+    sid = (await client.post("/api/v1/skills/", json={"name": "Go"}, headers=auth(student_token))).json()["id"]
+    long_description = "word " * 100
+    await client.post("/api/v1/projects/", json={
+        "title": "Long One", "description": long_description, "skill_ids": [sid],
+    }, headers=auth(company_token))
+    await client.post("/api/v1/projects/", json={
+        "title": "Short One", "description": "Short description",
+    }, headers=auth(company_token))
+
+    full = (await client.get("/api/v1/projects/?size=1")).json()
+    r = await client.get("/api/v1/projects/?view=card&size=1")
+    assert r.status_code == 200
+    page1 = r.json()
+    assert page1["total"] == 2
+    assert [p["id"] for p in page1["items"]] == [p["id"] for p in full["items"]]
+    assert page1["items"][0]["description"] == "Short description"
+    assert "attachments" not in page1["items"][0]
+
+    page2 = (await client.get(f"/api/v1/projects/?view=card&size=1&cursor={page1['next_cursor']}")).json()
+    card = page2["items"][0]
+    assert card["title"] == "Long One"
+    assert card["description"].endswith("…") and len(card["description"]) <= 201
+    assert long_description.startswith(card["description"][:-1])
+    assert [s["name"] for s in card["required_skills"]] == ["Go"]
+
+
+@pytest.mark.asyncio
+async def test_recommendations_rank_by_skill_overlap(client: AsyncClient, company_token: str, student_token: str):
+    async def skill(name, category):
+        r = await client.post("/api/v1/skills/", json={"name": name, "category": category}, headers=auth(student_token))
+        return r.json()["id"]
+
+    python, sql, rust, figma = (await skill("Python", "backend"), await skill("SQL", "backend"),
+                                await skill("Rust", "backend"), await skill("Figma", "design"))
+    me = (await client.get("/api/v1/auth/me", headers=auth(student_token))).json()["id"]
+    for sid in (python, sql):
+        await client.post(f"/api/v1/users/{me}/skills/{sid}", headers=auth(student_token))
+
+    async def project(title, skill_ids, **extra):
+        r = await client.post("/api/v1/projects/", json={
+            "title": title, "description": "Recommendation fixture", "skill_ids": skill_ids, **extra,
+        }, headers=auth(company_token))
+        return r.json()["id"]
+
+    await project("Design only", [figma])
+    full_match = await project("Full match", [python, sql])
+    related = await project("Related", [python, rust])
+
+    r = await client.get("/api/v1/projects/recommended", headers=auth(student_token))
+    assert r.status_code == 200
+    ranked = r.json()
+    assert [p["title"] for p in ranked] == ["Full match", "Related"]
+    assert ranked[0]["score"] > ranked[1]["score"] > 0
+    assert [s["name"] for s in ranked[1]["required_skills"]] == ["Python", "Rust"]
+
+    # Index updates incrementally: a soon-due project jumps ahead, closed and applied-to ones drop out
+    soon = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    urgent = await project("Urgent match", [python, sql], deadline=soon)
+    await client.put(f"/api/v1/projects/{related}", json={"status": "closed"}, headers=auth(company_token))
+    await client.post("/api/v1/applications/", json={"project_id": full_match}, headers=auth(student_token))
+    ranked = (await client.get("/api/v1/projects/recommended", headers=auth(student_token))).json()
+    assert [p["id"] for p in ranked] == [urgent]
+
+    # A project closed behind the index's back doesn't cost the caller a slot
+    second = await project("Second match", [python, sql])
+    await Project.filter(id=urgent).update(status="closed")
+    ranked = (await client.get("/api/v1/projects/recommended?limit=1", headers=auth(student_token))).json()
+    assert [p["id"] for p in ranked] == [second]
+
+    # No skills on the profile, nothing to go on
+    assert (await client.get("/api/v1/projects/recommended", headers=auth(company_token))).json() == []
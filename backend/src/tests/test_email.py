@@ -0,0 +1,185 @@
+import socket
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+from aiosmtpd.controller import Controller
+from httpx import AsyncClient
+from src.core import email as email_module
+from src.core.config import settings
+from src.tests.conftest import auth, mock_acquire_flags, mock_cache_delete, mock_mongo
+
+# Captured before the autouse fixture swaps it for a mock
+enqueue_email = email_module.enqueue_email
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.received = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bounce@"):
+            return "550 No such user"
+        if address.startswith("later@"):
+            return "451 Try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append((id(session), envelope.rcpt_tos[0]))
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    with patch.multiple(settings, SMTP_HOST="127.0.0.1", SMTP_PORT=port,
+                        SMTP_STARTTLS=False, SMTP_AUTH=False):
+        yield handler
+    controller.stop()
+
+
+def _payload(to: str) -> dict:
+    return {"to": to, "subject": "Hi", "html": "<p>Hi</p>", "attempts": 0}
+
+
+@pytest.mark.asyncio
+async def test_outbox_batch_reuses_pooled_sessions(smtp_server):
+    from src.core.mailer import SMTPPool, deliver_batch
+    pool = SMTPPool(2)
+    batch = [(f"m{i}", _payload(f"user{i}@test.com")) for i in range(6)]
+
+    with patch("src.core.mailer.smtp_pool", pool), \
+            patch("src.core.mailer.rate_limit_check", AsyncMock(return_value=True)), \
+            patch("src.core.mailer.outbox_ack", new_callable=AsyncMock) as ack:
+        await deliver_batch(batch)
+        await deliver_batch(batch[:2])
+    await pool.close()
+
+    assert len(smtp_server.received) == 8
+    assert len({session for session, _ in smtp_server.received}) == 2
+    assert ack.await_args_list[0].args[0] == [f"m{i}" for i in range(6)]
+
+
+@pytest.mark.asyncio
+async def test_outbox_retries_transient_and_dead_letters_permanent_failures(smtp_server):
+    from src.core.mailer import SMTPPool, deliver_batch
+    pool = SMTPPool(1)
+    batch = [("ok", _payload("ok@test.com")), ("soft", _payload("later@test.com")),
+             ("hard", _payload("bounce@test.com")), ("limited", _payload("busy@test.com"))]
+
+    async def rate_limit(key, max_requests, window):
+        return "busy@" not in key
+
+    with patch("src.core.mailer.smtp_pool", pool), \
+            patch("src.core.mailer.rate_limit_check", rate_limit), \
+            patch("src.core.mailer.outbox_ack", new_callable=AsyncMock) as ack, \
+            patch("src.core.mailer.outbox_push", new_callable=AsyncMock) as push, \
+            patch("src.core.mailer.outbox_dead_letter", new_callable=AsyncMock) as dead:
+        await deliver_batch(batch)
+    await pool.close()
+
+    assert [rcpt for _, rcpt in smtp_server.received] == ["ok@test.com"]
+    assert ack.await_args.args[0] == ["ok"]
+    assert dead.await_args.args[0] == "hard"
+    rescheduled = {call.args[0][0][0]: call.args[0][0][1] for call in push.await_args_list}
+    assert set(rescheduled) == {"soft", "limited"}
+    assert rescheduled["soft"]["attempts"] == 1
+    assert rescheduled["limited"]["attempts"] == 0  # deferred, not a failed attempt
+
+
+@pytest.mark.asyncio
+async def test_enqueue_email_dedupes_per_recipient():
+    with patch.object(settings, "SMTP_AUTH", False), \
+            patch("src.core.email.acquire_flags", mock_acquire_flags), \
+            patch("src.core.email.outbox_push", new_callable=AsyncMock) as push:
+        await enqueue_email("a@test.com", "Welcome", "<p>Hi</p>")
+        await enqueue_email("a@test.com", "Welcome", "<p>Hi</p>")
+        await enqueue_email("b@test.com", "Welcome", "<p>Hi</p>")
+
+    assert [call.args[0][0][1]["to"] for call in push.await_args_list] == ["a@test.com", "b@test.com"]
+
+
+@pytest.mark.asyncio
+async def test_failed_enqueue_does_not_suppress_retry():
+    with patch.object(settings, "SMTP_AUTH", False), \
+            patch("src.core.email.acquire_flags", mock_acquire_flags), \
+            patch("src.core.email.cache_delete", mock_cache_delete), \
+            patch("src.core.email.outbox_push", AsyncMock(side_effect=[ConnectionError, None])) as push:
+        await enqueue_email("a@test.com", "Welcome", "<p>Hi</p>")  # logged, not raised
+        await enqueue_email("a@test.com", "Welcome", "<p>Hi</p>")
+        await enqueue_email("a@test.com", "Welcome", "<p>Hi</p>")  # now a real duplicate
+
+    assert push.await_count == 2
+
+
+# ── Digests ──────────────────────────────────────────
+
+async def _me(client: AsyncClient, token: str) -> int:
+    return (await client.get("/api/v1/auth/me", headers=auth(token))).json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_daily_digest_aggregates_unread_notifications(client: AsyncClient, student_token):
+    from src.notifications.digest import send_digests
+    from src.users.models import EmailFrequency
+    student_id = await _me(client, student_token)
+    r = await client.put(f"/api/v1/users/{student_id}", json={"email_frequency": "daily"},
+                         headers=auth(student_token))
+    assert r.json()["email_frequency"] == "daily"
+
+    now = datetime(2026, 10, 19, 8, 0, tzinfo=timezone.utc)
+    yesterday = now - timedelta(hours=12)
+    await mock_mongo.notifications.insert_many([
+        {"user_id": student_id, "title": "Older", "message": "a", "is_read": False, "created_at": yesterday,
+         "latest_at": yesterday},
+        {"user_id": student_id, "title": "<Moved>", "message": "b", "is_read": False, "count": 3,
+         "group_key": "task:1:moves", "created_at": now - timedelta(days=3), "latest_at": yesterday},
+        {"user_id": student_id, "title": "Read", "message": "c", "is_read": True, "created_at": yesterday,
+         "latest_at": yesterday},
+        {"user_id": student_id, "title": "Today", "message": "d", "is_read": False, "created_at": now, "latest_at": now},
+    ])
+
+    with patch("src.notifications.digest.send_digest_email", new_callable=AsyncMock) as send:
+        assert await send_digests(EmailFrequency.daily, now=now) == 1
+        assert await send_digests(EmailFrequency.daily, now=now) == 0  # period already claimed
+
+    to_email, _, frequency, total, items, _ = send.await_args.args
+    assert (to_email, frequency, total) == ("s@test.com", "daily", 4)
+    assert [i["title"] for i in items] == ["<Moved>", "Older"]
+
+    with patch.object(settings, "SMTP_AUTH", False), \
+            patch("src.core.email.enqueue_email", enqueue_email), \
+            patch("src.core.email.acquire_flags", mock_acquire_flags), \
+            patch("src.core.email.outbox_push", new_callable=AsyncMock) as push:
+        await email_module.send_digest_email(*send.await_args.args)
+    html_body = push.await_args.args[0][0][1]["html"]
+    assert "&lt;Moved&gt;</strong> ×3" in html_body
+    assert "4 new notifications from the past day" in html_body
+
+
+@pytest.mark.asyncio
+async def test_email_frequency_only_changes_email_delivery(
+        client: AsyncClient, company_token, student_token):
+    from src.tests.conftest import _register_and_verify
+    company_id = await _me(client, company_token)
+    await client.put(f"/api/v1/users/{company_id}", json={"email_frequency": "hourly"},
+                     headers=auth(company_token))
+    instant_token = await _register_and_verify(client, "c2@test.com", "company2", "pass123", "company")
+
+    for token, title in ((company_token, "Digest Project"), (instant_token, "Instant Project")):
+        pid = (await client.post("/api/v1/projects/", json={
+            "title": title, "description": "Open for applications"
+        }, headers=auth(token))).json()["id"]
+        with patch("src.applications.router.send_new_application_email", new_callable=AsyncMock) as email:
+            r = await client.post("/api/v1/applications/", json={"project_id": pid, "cover_letter": "hi"},
+                                  headers=auth(student_token))
+        assert r.status_code == 201
+        # Both owners get the same in-app notification; only the instant one is emailed now
+        assert email.called == (token is instant_token)
+        notes = (await client.get("/api/v1/notifications/", headers=auth(token))).json()
+        assert notes[0]["title"] == f"New application: {title}"
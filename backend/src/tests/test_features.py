@@ -1,5 +1,7 @@
+import asyncio
 import pytest
 from httpx import AsyncClient
+from unittest.mock import patch
 from src.tests.conftest import auth
 
 
@@ -318,3 +320,119 @@ async def test_admin_change_role(client: AsyncClient, admin_token: str):
         r = await client.put(f"/api/v1/admin/users/{target[0]['id']}", json={"role": "committee"},
                              headers=auth(admin_token))
         assert r.status_code == 200
+
+
+# ── Activity Log Writer ──────────────────────────────
+
+@pytest.mark.asyncio
+async def test_activity_writer_batches_and_drains_on_stop():
+    from src.core.activity import ActivityLogWriter
+    from src.tests.conftest import mock_mongo
+    writer = ActivityLogWriter(max_size=100, batch_size=3, flush_interval=60, overflow="drop")
+
+    for i in range(5):
+        await writer.submit({"user_id": i, "action": "login"})
+    await asyncio.sleep(0.05)
+    assert writer.written == 3  # one full batch flushed; the partial one waits for the interval
+
+    await writer.stop()
+    assert writer.stats() == {"queued": 0, "written": 5, "dropped": 0, "failed": 0}
+    assert await mock_mongo.activity_logs.count_documents({"action": "login"}) == 5
+
+
+@pytest.mark.asyncio
+async def test_activity_writer_stop_waits_for_flush_in_progress():
+    from src.core.activity import ActivityLogWriter
+    from src.tests.conftest import mock_mongo
+    writer = ActivityLogWriter(max_size=100, batch_size=2, flush_interval=60, overflow="drop")
+    started, release = asyncio.Event(), asyncio.Event()
+    insert_many = mock_mongo.activity_logs.insert_many
+
+    async def slow_insert_many(docs, ordered=True):
+        started.set()
+        await release.wait()
+        return await insert_many(docs, ordered=ordered)
+
+    with patch.object(mock_mongo.activity_logs, "insert_many", slow_insert_many):
+        for i in range(2):
+            await writer.submit({"user_id": i, "action": "login"})
+        await started.wait()
+        stopping = asyncio.create_task(writer.stop())
+        await asyncio.sleep(0.01)
+        assert not stopping.done()  # still waiting on the in-flight batch
+        release.set()
+        await stopping
+    assert writer.written == 2
+
+
+@pytest.mark.asyncio
+async def test_activity_writer_rolls_up_the_part_of_a_batch_that_was_stored():
+    from datetime import datetime, timezone
+    from pymongo.errors import BulkWriteError
+    from src.core.activity import ActivityLogWriter
+    from src.tests.conftest import mock_mongo
+    writer = ActivityLogWriter(max_size=100, batch_size=3, flush_interval=60, overflow="drop")
+    insert_many = mock_mongo.activity_logs.insert_many
+
+    async def partial_insert_many(docs, ordered=True):
+        await insert_many([d for i, d in enumerate(docs) if i != 1], ordered=ordered)
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "invalid"}]})
+
+    now = datetime.now(timezone.utc)
+    with patch.object(mock_mongo.activity_logs, "insert_many", partial_insert_many):
+        for i in range(3):
+            await writer.submit({"user_id": i, "action": "login", "role": "student", "created_at": now})
+        await writer.stop()
+
+    assert writer.stats() == {"queued": 0, "written": 2, "dropped": 0, "failed": 1}
+    hourly = await mock_mongo.activity_rollups.find_one({"granularity": "hour"})
+    assert hourly["count"] == 2
+    assert await mock_mongo.activity_daily_users.count_documents({}) == 2
+
+
+@pytest.mark.asyncio
+async def test_activity_writer_drops_on_overflow(client: AsyncClient, admin_token: str):
+    from src.core.activity import ActivityLogWriter
+    writer = ActivityLogWriter(max_size=2, batch_size=10, flush_interval=60, overflow="drop")
+    writer.start = lambda: None  # no flusher, so the queue fills up
+    writer._queue = asyncio.Queue(maxsize=2)
+
+    for i in range(5):
+        await writer.submit({"user_id": i, "action": "login"})
+    assert writer.stats()["dropped"] == 3
+
+    r = await client.get("/api/v1/admin/activity-writer", headers=auth(admin_token))
+    assert r.status_code == 200
+    assert set(r.json()) == {"queued", "written", "dropped", "failed"}
+
+
+@pytest.mark.asyncio
+async def test_activity_rollups_feed_admin_analytics(client: AsyncClient, admin_token: str):
+    from datetime import datetime, timezone
+    from src.core.activity import ActivityLogWriter
+    writer = ActivityLogWriter(max_size=100, batch_size=100, flush_interval=60, overflow="drop")
+    now = datetime.now(timezone.utc)
+    events = [
+        (1, "register", "student"), (2, "register", "company"),
+        (1, "login", "student"), (1, "login", "student"), (3, "apply", "student"),
+    ]
+    for user_id, action, role in events:
+        await writer.submit({"user_id": user_id, "action": action, "role": role, "created_at": now})
+    await writer.stop()
+
+    r = await client.get("/api/v1/admin/analytics/signups?days=7", headers=auth(admin_token))
+    assert r.status_code == 200
+    points = r.json()["points"]
+    assert len(points) == 7
+    assert points[-1]["count"] == 2
+    assert points[-1]["by_role"] == {"student": 1, "company": 1}
+    assert all(p["count"] == 0 for p in points[:-1])
+
+    r = await client.get("/api/v1/admin/analytics/logins?hours=24", headers=auth(admin_token))
+    assert r.json()["points"][-1]["count"] == 2
+
+    r = await client.get("/api/v1/admin/analytics/applications", headers=auth(admin_token))
+    assert r.json()["points"][-1]["count"] == 1
+
+    r = await client.get("/api/v1/admin/analytics/active-users", headers=auth(admin_token))
+    assert r.json() == {"dau": 3, "wau": 3, "mau": 3}
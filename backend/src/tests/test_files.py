@@ -0,0 +1,656 @@
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import time
+import pytest
+import pytest_asyncio
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from types import SimpleNamespace
+from unittest.mock import patch
+from httpx import AsyncClient
+from src.core.config import settings
+from src.core.storage import (
+    LocalBackend, MemoryBackend, ObjectStorage, ObjectNotFound, StorageError, StorageTimeout, storage as object_storage,
+)
+from src.tests.conftest import auth
+
+
+class FakeMinio:
+    """Stores objects in memory, reading uploads the way the real client does (part by part)."""
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.reads: list[int] = []
+
+    def put_object(self, bucket, object_name, data, length, content_type="application/octet-stream",
+                   part_size=0, num_parallel_uploads=3, **kw):
+        body = b""
+        while True:
+            chunk = data.read(part_size or length)
+            if not chunk:
+                break
+            self.reads.append(len(chunk))
+            body += chunk
+        self.objects[(bucket, object_name)] = body
+
+    def remove_object(self, bucket, object_name):
+        self.objects.pop((bucket, object_name), None)
+
+    def stat_object(self, bucket, object_name):
+        body = self.objects[(bucket, object_name)]
+        return SimpleNamespace(size=len(body), etag=hashlib.md5(body).hexdigest())
+
+    def get_object(self, bucket, object_name, offset=0, length=0):
+        body = self.objects[(bucket, object_name)]
+        body = body[offset:offset + length] if length else body[offset:]
+        return SimpleNamespace(
+            stream=lambda amt: (body[i:i + amt] for i in range(0, len(body), amt)),
+            close=lambda: None, release_conn=lambda: None,
+        )
+
+
+@pytest.fixture
+def storage():
+    fake = FakeMinio()
+    with patch("src.core.minio_client.get_minio", return_value=fake), \
+            patch.object(settings, "STORAGE_BACKEND", "minio"), \
+            patch.object(object_storage, "_backend", None):
+        yield fake
+
+
+async def _project(client: AsyncClient, token: str) -> int:
+    r = await client.post("/api/v1/projects/", json={
+        "title": "Files Project", "description": "Project with attachments"
+    }, headers=auth(token))
+    return r.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_upload_streams_to_storage_and_records_hash(client: AsyncClient, company_token, storage):
+    pid = await _project(client, company_token)
+    content = b"x" * 300_000
+
+    r = await client.post(f"/api/v1/files/project/{pid}", files={"file": ("report.pdf", content, "application/pdf")},
+                          headers=auth(company_token))
+    assert r.status_code == 201
+    body = r.json()
+    assert body["filename"] == "report.pdf"
+    assert body["file_size"] == len(content)
+    assert body["sha256"] == hashlib.sha256(content).hexdigest()
+    assert storage.objects[(settings.MINIO_BUCKET_PROJECTS, body["object_name"])] == content
+
+
+@pytest.mark.asyncio
+async def test_upload_rejects_oversized_file_while_streaming(client: AsyncClient, company_token, storage):
+    pid = await _project(client, company_token)
+
+    with patch.object(settings, "MAX_FILE_SIZE", 1000):
+        # Declared length is within the multipart headroom, so only the streaming check can catch it
+        r = await client.post(f"/api/v1/files/project/{pid}", files={"file": ("big.txt", b"y" * 5000)},
+                              headers=auth(company_token))
+    assert r.status_code == 413
+    assert storage.objects == {}
+
+    listed = await client.get(f"/api/v1/files/project/{pid}", headers=auth(company_token))
+    assert listed.json() == []
+
+
+@pytest.mark.asyncio
+async def test_upload_rejects_extension_before_reading_data(client: AsyncClient, company_token, storage):
+    pid = await _project(client, company_token)
+    r = await client.post(f"/api/v1/files/project/{pid}", files={"file": ("run.exe", b"MZ")},
+                          headers=auth(company_token))
+    assert r.status_code == 400
+    assert storage.reads == []
+
+
+@pytest.mark.asyncio
+async def test_download_streams_with_ranges_and_etag(client: AsyncClient, company_token, storage):
+    pid = await _project(client, company_token)
+    content = bytes(range(256)) * 1000
+    fid = (await client.post(f"/api/v1/files/project/{pid}", files={"file": ("data.zip", content)},
+                             headers=auth(company_token))).json()["id"]
+    url = f"/api/v1/files/{fid}/download"
+
+    full = await client.get(url, headers=auth(company_token))
+    assert full.status_code == 200
+    assert full.content == content
+    assert full.headers["content-length"] == str(len(content))
+    assert full.headers["accept-ranges"] == "bytes"
+    etag = full.headers["etag"]
+
+    part = await client.get(url, headers={**auth(company_token), "Range": "bytes=100-199"})
+    assert part.status_code == 206
+    assert part.content == content[100:200]
+    assert part.headers["content-range"] == f"bytes 100-199/{len(content)}"
+    assert part.headers["content-length"] == "100"
+
+    tail = await client.get(url, headers={**auth(company_token), "Range": "bytes=-10"})
+    assert tail.content == content[-10:]
+
+    stale = await client.get(url, headers={**auth(company_token), "Range": "bytes=0-9", "If-Range": '"old"'})
+    assert stale.status_code == 200
+
+    bad = await client.get(url, headers={**auth(company_token), "Range": f"bytes={len(content)}-"})
+    assert bad.status_code == 416
+    assert bad.headers["content-range"] == f"bytes */{len(content)}"
+
+    cached = await client.get(url, headers={**auth(company_token), "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+
+@pytest.fixture
+def presigned():
+    with patch.multiple(settings, FILE_TRANSFER_MODE="presigned", MINIO_PUBLIC_ENDPOINT="files.example.com",
+                        MINIO_PUBLIC_SECURE=True), \
+            patch("src.core.minio_client._public_client", None):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_presigned_download_redirects_to_storage(client: AsyncClient, company_token, storage, presigned):
+    pid = await _project(client, company_token)
+    with patch.object(settings, "FILE_TRANSFER_MODE", "proxy"):
+        fid = (await client.post(f"/api/v1/files/project/{pid}", files={"file": ("notes.txt", b"hello")},
+                                 headers=auth(company_token))).json()["id"]
+
+    r = await client.get(f"/api/v1/files/{fid}/download", headers=auth(company_token))
+    assert r.status_code == 302
+    location = r.headers["location"]
+    assert location.startswith(f"https://files.example.com/{settings.MINIO_BUCKET_PROJECTS}/")
+    assert "X-Amz-Signature=" in location and "response-content-disposition=" in location
+
+    r = await client.get(f"/api/v1/files/{fid}/download-url", headers=auth(company_token))
+    assert r.json()["expires_in"] == settings.PRESIGNED_URL_EXPIRY
+    assert "X-Amz-Expires=300" in r.json()["url"]
+
+
+@pytest.mark.asyncio
+async def test_presigned_upload_then_finalize(client: AsyncClient, company_token, student_token, storage, presigned):
+    pid = await _project(client, company_token)
+    r = await client.post(f"/api/v1/files/project/{pid}/upload-url", json={
+        "filename": "spec.pdf", "file_size": 4, "content_type": "application/pdf",
+    }, headers=auth(company_token))
+    assert r.status_code == 200
+    body = r.json()
+    assert body["url"] == f"https://files.example.com/{settings.MINIO_BUCKET_PROJECTS}"
+    object_name = body["fields"]["key"]
+    assert {"policy", "x-amz-signature", "Content-Type"} <= set(body["fields"])
+    finalize = f"/api/v1/files/uploads/{body['upload_id']}/finalize"
+
+    # Nothing in storage yet
+    assert (await client.post(finalize, headers=auth(company_token))).status_code == 400
+    storage.objects[(settings.MINIO_BUCKET_PROJECTS, object_name)] = b"%PDF"
+    # Only the user who requested the URL can finalize it
+    assert (await client.post(finalize, headers=auth(student_token))).status_code == 404
+
+    r = await client.post(finalize, headers=auth(company_token))
+    assert r.status_code == 201
+    assert (r.json()["filename"], r.json()["file_size"]) == ("spec.pdf", 4)
+    assert (await client.post(finalize, headers=auth(company_token))).status_code == 404
+
+    # The same content uploaded directly again is stored once
+    again = (await client.post(f"/api/v1/files/project/{pid}/upload-url", json={
+        "filename": "spec-copy.pdf", "file_size": 4,
+    }, headers=auth(company_token))).json()
+    storage.objects[(settings.MINIO_BUCKET_PROJECTS, again["fields"]["key"])] = b"%PDF"
+    r = await client.post(f"/api/v1/files/uploads/{again['upload_id']}/finalize", headers=auth(company_token))
+    assert r.status_code == 201
+    assert list(storage.objects) == [(settings.MINIO_BUCKET_PROJECTS, object_name)]
+
+    too_big = await client.post(f"/api/v1/files/project/{pid}/upload-url", json={
+        "filename": "huge.zip", "file_size": settings.MAX_FILE_SIZE + 1,
+    }, headers=auth(company_token))
+    assert too_big.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_unfinalized_direct_uploads_are_removed(client: AsyncClient, company_token, storage, presigned):
+    from src.files.service import sweep_pending_uploads
+    from src.tests.conftest import mock_redis_store
+    bucket = settings.MINIO_BUCKET_PROJECTS
+    pid = await _project(client, company_token)
+    grants = []
+    for name in ("left.pdf", "gone.pdf"):
+        body = (await client.post(f"/api/v1/files/project/{pid}/upload-url", json={"filename": name, "file_size": 4},
+                                  headers=auth(company_token))).json()
+        storage.objects[(bucket, body["fields"]["key"])] = b"%PDF"
+        grants.append(body)
+
+    expires_at = mock_redis_store["file_uploads:expiry"][grants[0]["upload_id"]]
+    assert await sweep_pending_uploads() == 0  # still within the finalize window
+    del mock_redis_store["file_uploads:expiry"][grants[1]["upload_id"]]
+    assert await sweep_pending_uploads(now=expires_at + 1) == 1
+    assert (bucket, grants[0]["fields"]["key"]) not in storage.objects
+    r = await client.post(f"/api/v1/files/uploads/{grants[0]['upload_id']}/finalize", headers=auth(company_token))
+    assert r.status_code == 404
+
+    # Access is checked again at finalize; a refused upload's object is removed too
+    await client.delete(f"/api/v1/projects/{pid}", headers=auth(company_token))
+    r = await client.post(f"/api/v1/files/uploads/{grants[1]['upload_id']}/finalize", headers=auth(company_token))
+    assert r.status_code == 404
+    assert (bucket, grants[1]["fields"]["key"]) not in storage.objects
+
+
+@pytest.mark.asyncio
+async def test_direct_transfer_endpoints_disabled_in_proxy_mode(client: AsyncClient, company_token, storage):
+    pid = await _project(client, company_token)
+    r = await client.post(f"/api/v1/files/project/{pid}/upload-url", json={"filename": "a.txt", "file_size": 1},
+                          headers=auth(company_token))
+    assert r.status_code == 400
+
+
+# ── Storage adapter ──────────────────────────────────
+
+class SlowBackend(MemoryBackend):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._count = threading.Lock()
+
+    def stat(self, bucket, object_name):
+        with self._count:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            return super().stat(bucket, object_name)
+        finally:
+            with self._count:
+                self.active -= 1
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_serves_the_files_api(client: AsyncClient, company_token, admin_token):
+    backend = object_storage.backend  # the in-memory backend installed by conftest
+    pid = await _project(client, company_token)
+    fid = (await client.post(f"/api/v1/files/project/{pid}", files={"file": ("a.csv", b"1,2,3")},
+                             headers=auth(company_token))).json()["id"]
+    r = await client.get(f"/api/v1/files/{fid}/download", headers={**auth(company_token), "Range": "bytes=2-"})
+    assert (r.status_code, r.content) == (206, b"2,3")
+    assert (await client.delete(f"/api/v1/files/{fid}", headers=auth(company_token))).status_code == 204
+    assert backend.objects == {}
+
+    stats = (await client.get("/api/v1/admin/storage", headers=auth(admin_token))).json()
+    assert stats["backend"] == "memory"
+    assert stats["in_flight"] == 0
+    assert {op: m["calls"] for op, m in stats["operations"].items()} == \
+        {"put": 1, "stat": 1, "open": 1, "read": 2, "remove": 3}  # object + 2 derived names
+
+
+@pytest.mark.asyncio
+async def test_local_backend_round_trip(tmp_path):
+    store = ObjectStorage(LocalBackend(str(tmp_path)))
+
+    async def chunks():
+        yield b"hello "
+        yield b"world"
+
+    size, sha256 = await store.put_stream("bucket", "greeting.txt", chunks())
+    assert (size, sha256) == (11, hashlib.sha256(b"hello world").hexdigest())
+    assert (await store.stat("bucket", "greeting.txt")).size == 11
+    assert b"".join([c async for c in store.stream("bucket", "greeting.txt", offset=6, length=3, chunk_size=2)]) == b"wor"
+
+    await store.remove("bucket", "greeting.txt")
+    with pytest.raises(ObjectNotFound):
+        await store.stat("bucket", "greeting.txt")
+
+    upload_id = await store.create_multipart("bucket", "notes.md", "text/markdown")
+    etags = [await store.upload_part("bucket", "notes.md", upload_id, n, part)
+             for n, part in ((1, b"# Notes\n"), (2, b"done"))]
+    with pytest.raises(StorageError):
+        await store.complete_multipart("bucket", "notes.md", upload_id, [(1, etags[0]), (2, etags[0])])
+    await store.complete_multipart("bucket", "notes.md", upload_id, [(1, etags[0]), (2, etags[1])])
+    stat = await store.stat("bucket", "notes.md")
+    assert (stat.size, stat.content_type) == (12, "text/markdown")
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_storage_is_bounded_and_never_blocks_the_loop():
+    backend = SlowBackend(delay=0.2)
+    backend.objects[("b", "k")] = (b"x", "text/plain")
+    store = ObjectStorage(backend)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    with patch.object(settings, "STORAGE_MAX_CONCURRENCY", 2):
+        t = asyncio.create_task(ticker())
+        await asyncio.gather(*(store.stat("b", "k") for _ in range(4)))
+        t.cancel()
+    assert backend.peak == 2
+    assert ticks >= 20  # the loop kept running while the pool was busy
+
+    with patch.object(settings, "STORAGE_OP_TIMEOUT", 0.05):
+        with pytest.raises(StorageTimeout):
+            await store.stat("b", "k")
+    assert store.stats()["operations"]["stat"]["timeouts"] == 1
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_storage_timeout_maps_to_503(client: AsyncClient, company_token):
+    pid = await _project(client, company_token)
+    fid = (await client.post(f"/api/v1/files/project/{pid}", files={"file": ("a.txt", b"abc")},
+                             headers=auth(company_token))).json()["id"]
+    with patch.object(object_storage, "_backend", SlowBackend(delay=0.3)), \
+            patch.object(settings, "STORAGE_OP_TIMEOUT", 0.05):
+        r = await client.get(f"/api/v1/files/{fid}/download", headers=auth(company_token))
+    assert r.status_code == 503
+
+
+# ── Deduplication ────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_identical_uploads_share_one_blob(client: AsyncClient, company_token):
+    from src.projects.models import FileBlob
+    backend = object_storage.backend
+    first_pid, second_pid = await _project(client, company_token), await _project(client, company_token)
+    content = b"brief " * 1000
+
+    a = (await client.post(f"/api/v1/files/project/{first_pid}", files={"file": ("brief.pdf", content)},
+                           headers=auth(company_token))).json()
+    b = (await client.post(f"/api/v1/files/project/{second_pid}", files={"file": ("brief-v2.pdf", content)},
+                           headers=auth(company_token))).json()
+    assert a["object_name"] == b["object_name"]
+    assert len(backend.objects) == 1
+    assert (await FileBlob.get(sha256=a["sha256"])).ref_count == 2
+
+    await client.delete(f"/api/v1/files/{a['id']}", headers=auth(company_token))
+    assert len(backend.objects) == 1
+    r = await client.get(f"/api/v1/files/{b['id']}/download", headers=auth(company_token))
+    assert r.content == content
+
+    await client.delete(f"/api/v1/projects/{second_pid}", headers=auth(company_token))
+    assert backend.objects == {}
+    assert await FileBlob.all().count() == 0
+
+
+@pytest.mark.asyncio
+async def test_declared_hash_of_stored_content_skips_the_put(client: AsyncClient, company_token, student_token):
+    backend = object_storage.backend
+    pid = await _project(client, company_token)
+    content = b"PK\x03\x04 submission"
+    digest = hashlib.sha256(content).hexdigest()
+    await client.post(f"/api/v1/files/project/{pid}", files={"file": ("brief.zip", content)},
+                      headers=auth(company_token))
+    assert object_storage.stats()["operations"]["put"]["calls"] == 1
+
+    r = await client.post(f"/api/v1/files/project/{pid}?sha256={digest}", files={"file": ("again.zip", content)},
+                          headers=auth(company_token))
+    assert r.status_code == 201
+    assert r.json()["file_size"] == len(content)
+    assert object_storage.stats()["operations"]["put"]["calls"] == 1
+    assert len(backend.objects) == 1
+
+    # Knowing a hash is not enough: the body must actually match it
+    r = await client.post(f"/api/v1/files/project/{pid}?sha256={digest}", files={"file": ("fake.zip", b"other")},
+                          headers=auth(company_token))
+    assert r.status_code == 400
+    assert len((await client.get(f"/api/v1/files/project/{pid}", headers=auth(company_token))).json()) == 2
+
+
+@pytest.mark.asyncio
+async def test_export_streams_submissions_as_zip(client: AsyncClient, company_token, student_token):
+    import zipfile
+    pid = await _project(client, company_token)
+    await client.post("/api/v1/applications/", json={"project_id": pid}, headers=auth(student_token))
+    for name, content in (("report.pdf", b"%PDF report"), ("report.pdf", b"%PDF v2"), ("code.zip", b"PK code")):
+        r = await client.post(f"/api/v1/files/project/{pid}?file_type=submission", files={"file": (name, content)},
+                              headers=auth(student_token))
+        assert r.status_code == 201
+    await client.post(f"/api/v1/files/project/{pid}", files={"file": ("brief.pdf", b"%PDF brief")},
+                      headers=auth(company_token))
+
+    link = f"/api/v1/files/project/{pid}/export-url"
+    assert (await client.post(link, headers=auth(student_token))).status_code == 403
+    r = await client.post(link, headers=auth(company_token))
+    assert r.status_code == 200
+    r = await client.get(r.json()["url"])  # opened by the browser: no auth header
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/zip"
+    assert int(r.headers["content-length"]) == len(r.content)
+    archive = zipfile.ZipFile(io.BytesIO(r.content))
+    assert archive.testzip() is None
+    student = (await client.get("/api/v1/auth/me", headers=auth(student_token))).json()["username"]
+    assert {i.filename: archive.read(i) for i in archive.infolist()} == {
+        f"{student}/report.pdf": b"%PDF report",
+        f"{student}/report (2).pdf": b"%PDF v2",
+        f"{student}/code.zip": b"PK code",
+    }
+    assert all(i.compress_type == zipfile.ZIP_STORED for i in archive.infolist())
+
+    url = (await client.post(f"{link}?file_type=attachment", headers=auth(company_token))).json()["url"]
+    r = await client.get(url)
+    assert zipfile.ZipFile(io.BytesIO(r.content)).namelist() == ["brief.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_export_link_is_bound_to_its_project_and_expires(client: AsyncClient, company_token):
+    from src.core.security import create_link_token
+    pid = await _project(client, company_token)
+    other = await _project(client, company_token)
+    url = (await client.post(f"/api/v1/files/project/{pid}/export-url", headers=auth(company_token))).json()["url"]
+    token = url.split("token=")[1]
+
+    assert (await client.get(f"/api/v1/files/project/{pid}/export.zip")).status_code == 422
+    assert (await client.get(f"/api/v1/files/project/{other}/export.zip?token={token}")).status_code == 401
+    assert (await client.get(f"/api/v1/files/project/{pid}/export.zip?file_type=attachment&token={token}")
+            ).status_code == 401
+    # An access token is not a link token
+    assert (await client.get(f"/api/v1/files/project/{pid}/export.zip?token={company_token}")).status_code == 401
+
+    owner_id = (await client.get("/api/v1/auth/me", headers=auth(company_token))).json()["id"]
+    expired = create_link_token({"sub": str(owner_id), "project_id": pid, "file_type": "submission"}, -1)
+    assert (await client.get(f"/api/v1/files/project/{pid}/export.zip?token={expired}")).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_non_latin_file_names_download(client: AsyncClient, company_token):
+    from urllib.parse import unquote
+    pid = (await client.post("/api/v1/projects/", json={
+        "title": "Проект", "description": "Project with a Cyrillic title"
+    }, headers=auth(company_token))).json()["id"]
+    fid = (await client.post(f"/api/v1/files/project/{pid}", files={"file": ("отчёт.pdf", b"%PDF")},
+                             headers=auth(company_token))).json()["id"]
+
+    export = (await client.post(f"/api/v1/files/project/{pid}/export-url?file_type=attachment",
+                                headers=auth(company_token))).json()["url"]
+    for url, name in ((export, "Проект - attachments.zip"), (f"/api/v1/files/{fid}/download", "отчёт.pdf")):
+        r = await client.get(url, headers=auth(company_token))
+        assert r.status_code == 200
+        disposition = r.headers["content-disposition"]
+        assert disposition.isascii()
+        assert unquote(disposition.split("filename*=UTF-8''")[1]) == name
+
+
+# ── Thumbnails / previews ────────────────────────────
+
+@pytest_asyncio.fixture
+async def previews():
+    from src.files.previews import preview_queue
+    with patch.object(settings, "PREVIEWS_ENABLED", True):
+        yield preview_queue
+        await preview_queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_hung_or_crashed_render_pool_is_replaced(previews):
+    with patch.object(settings, "PREVIEW_TIMEOUT", 2):
+        with pytest.raises(asyncio.TimeoutError):
+            await previews._render(partial(time.sleep, 30))
+        assert previews._pool is None
+        for _ in range(50):  # the stuck worker is terminated, not left running
+            if not multiprocessing.active_children():
+                break
+            await asyncio.sleep(0.1)
+        assert multiprocessing.active_children() == []
+        with pytest.raises(BrokenProcessPool):
+            await previews._render(partial(os._exit, 1))
+        assert await previews._render(partial(abs, -3)) == 3
+
+
+def _png(width: int, height: int) -> bytes:
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), "teal").save(out, "PNG")
+    return out.getvalue()
+
+
+def _pdf() -> bytes:
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new("RGB", (600, 800), "white").save(out, "PDF")
+    return out.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_thumbnails_and_pdf_previews_are_generated_in_background(client: AsyncClient, company_token, previews):
+    from PIL import Image
+    pid = await _project(client, company_token)
+    uploads = {"photo.png": _png(1600, 800), "brief.pdf": _pdf(), "notes.txt": b"plain", "broken.jpg": b"not a jpeg"}
+    for name, body in uploads.items():
+        r = await client.post(f"/api/v1/files/project/{pid}", files={"file": (name, body)}, headers=auth(company_token))
+        assert r.json()["preview_status"] == (None if name == "notes.txt" else "pending")
+
+    await previews.join()
+    files = {f["filename"]: f for f in (await client.get(f"/api/v1/files/project/{pid}",
+                                                         headers=auth(company_token))).json()}
+    assert files["notes.txt"]["thumbnail_url"] is None
+    assert files["broken.jpg"]["preview_status"] == "failed"
+    assert files["photo.png"]["preview_status"] == "ready"
+    assert files["photo.png"]["preview_url"] is None
+
+    thumb = await client.get(files["photo.png"]["thumbnail_url"], headers=auth(company_token))
+    assert thumb.headers["content-type"] == "image/webp"
+    assert Image.open(io.BytesIO(thumb.content)).size == (settings.THUMBNAIL_SIZE, settings.THUMBNAIL_SIZE // 2)
+    cached = await client.get(files["photo.png"]["thumbnail_url"],
+                              headers={**auth(company_token), "If-None-Match": thumb.headers["etag"]})
+    assert cached.status_code == 304
+
+    preview = await client.get(files["brief.pdf"]["preview_url"], headers=auth(company_token))
+    assert max(Image.open(io.BytesIO(preview.content)).size) == settings.PDF_PREVIEW_SIZE
+
+    # Derived objects go with the original
+    await client.delete(f"/api/v1/files/{files['photo.png']['id']}", headers=auth(company_token))
+    assert not any(name.startswith(files["photo.png"]["object_name"]) for _, name in object_storage.backend.objects)
+
+
+# ── Resumable upload sessions ────────────────────────
+
+@pytest.mark.asyncio
+async def test_resumable_upload_session(client: AsyncClient, company_token, student_token):
+    pid = await _project(client, company_token)
+    content = bytes(range(256)) * 40  # 10240 bytes -> parts of 4096, 4096, 2048
+
+    with patch.object(settings, "UPLOAD_CHUNK_SIZE", 4096), patch.object(settings, "MAX_FILE_SIZE", 5000):
+        r = await client.post(f"/api/v1/files/project/{pid}/upload-sessions", json={
+            "filename": "dataset.zip", "file_size": len(content),
+        }, headers=auth(company_token))
+        assert r.status_code == 201
+        session = r.json()
+        assert (session["chunk_size"], session["total_parts"], session["received_parts"]) == (4096, 3, [])
+        base = f"/api/v1/files/upload-sessions/{session['upload_id']}"
+
+        # Parts arrive out of order; the connection "drops" before part 2
+        assert (await client.put(f"{base}/parts/3", content=content[8192:], headers=auth(company_token))).status_code == 200
+        assert (await client.put(f"{base}/parts/1", content=content[:4096], headers=auth(company_token))).status_code == 200
+        r = await client.put(f"{base}/parts/2", content=content[4096:5000], headers=auth(company_token))
+        assert r.status_code == 400  # truncated chunk
+        assert (await client.post(f"{base}/complete", headers=auth(company_token))).status_code == 400
+
+        # Only the owner sees the session
+        assert (await client.get(base, headers=auth(student_token))).status_code == 404
+        assert (await client.get(base, headers=auth(company_token))).json()["received_parts"] == [1, 3]
+
+        await client.put(f"{base}/parts/2", content=content[4096:8192], headers=auth(company_token))
+        r = await client.post(f"{base}/complete", headers=auth(company_token))
+    assert r.status_code == 201
+    assert r.json()["file_size"] == len(content)  # above MAX_FILE_SIZE: sessions have their own limit
+    assert (await client.get(base, headers=auth(company_token))).status_code == 404
+
+    download = await client.get(f"/api/v1/files/{r.json()['id']}/download", headers=auth(company_token))
+    assert download.content == content
+    assert object_storage.backend.uploads == {}
+
+
+@pytest.mark.asyncio
+async def test_resumable_uploads_share_blobs_with_direct_ones(client: AsyncClient, company_token):
+    from src.projects.models import FileBlob
+    pid = await _project(client, company_token)
+    content = b"PK" + bytes(range(256)) * 20
+    await client.post(f"/api/v1/files/project/{pid}", files={"file": ("first.zip", content)},
+                      headers=auth(company_token))
+
+    with patch.object(settings, "UPLOAD_CHUNK_SIZE", 4096):
+        for name in ("again.zip", "third.zip"):
+            session = (await client.post(f"/api/v1/files/project/{pid}/upload-sessions", json={
+                "filename": name, "file_size": len(content),
+            }, headers=auth(company_token))).json()
+            base = f"/api/v1/files/upload-sessions/{session['upload_id']}"
+            for n in range(session["total_parts"]):
+                await client.put(f"{base}/parts/{n + 1}", content=content[n * 4096:(n + 1) * 4096],
+                                 headers=auth(company_token))
+            r = await client.post(f"{base}/complete", headers=auth(company_token))
+            assert r.status_code == 201
+
+    blob = await FileBlob.get(sha256=hashlib.sha256(content).hexdigest())
+    assert blob.ref_count == 3
+    assert [name for _, name in object_storage.backend.objects] == [blob.object_name]
+    assert (await client.get(f"/api/v1/files/{r.json()['id']}/download", headers=auth(company_token))).content == content
+
+
+@pytest.mark.asyncio
+async def test_upload_session_rechecks_access_on_complete(client: AsyncClient, company_token, student_token):
+    pid = await _project(client, company_token)
+    app_id = (await client.post("/api/v1/applications/", json={"project_id": pid},
+                                headers=auth(student_token))).json()["id"]
+    session = (await client.post(f"/api/v1/files/project/{pid}/upload-sessions", json={
+        "filename": "work.zip", "file_size": 10, "file_type": "submission",
+    }, headers=auth(student_token))).json()
+    base = f"/api/v1/files/upload-sessions/{session['upload_id']}"
+    await client.put(f"{base}/parts/1", content=b"z" * 10, headers=auth(student_token))
+
+    # The application is withdrawn while the upload runs
+    from src.applications.models import Application
+    from src.projects.access import invalidate_project_access
+    await Application.filter(id=app_id).delete()
+    await invalidate_project_access(pid)
+    assert (await client.post(f"{base}/complete", headers=auth(student_token))).status_code == 403
+    assert (await client.get(base, headers=auth(student_token))).status_code == 404
+    assert object_storage.backend.uploads == {}
+    assert (await client.get(f"/api/v1/files/project/{pid}", headers=auth(company_token))).json() == []
+
+
+@pytest.mark.asyncio
+async def test_expired_upload_sessions_are_aborted(client: AsyncClient, company_token):
+    from src.files.service import sweep_upload_sessions
+    pid = await _project(client, company_token)
+    session = (await client.post(f"/api/v1/files/project/{pid}/upload-sessions", json={
+        "filename": "big.zip", "file_size": 100,
+    }, headers=auth(company_token))).json()
+    await client.put(f"/api/v1/files/upload-sessions/{session['upload_id']}/parts/1", content=b"z" * 100,
+                     headers=auth(company_token))
+    assert len(object_storage.backend.uploads) == 1
+
+    assert await sweep_upload_sessions() == 0  # not expired yet
+    with patch("src.files.service.time.time", return_value=session["expires_at"] + 1):
+        r = await client.put(f"/api/v1/files/upload-sessions/{session['upload_id']}/parts/1", content=b"z" * 100,
+                             headers=auth(company_token))
+    assert r.status_code == 404  # expired sessions take no more parts, even before the sweeper runs
+    assert await sweep_upload_sessions(now=session["expires_at"] + 1) == 1
+    assert object_storage.backend.uploads == {}
+    r = await client.get(f"/api/v1/files/upload-sessions/{session['upload_id']}", headers=auth(company_token))
+    assert r.status_code == 404
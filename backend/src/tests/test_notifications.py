@@ -0,0 +1,245 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from httpx import AsyncClient
+from src.tests.conftest import auth
+
+
+async def _user_id(client: AsyncClient, token: str) -> int:
+    return (await client.get("/api/v1/auth/me", headers=auth(token))).json()["id"]
+
+
+# ── Push ───────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_create_notification_publishes_to_user_channel(client: AsyncClient, student_token):
+    from src.notifications.service import create_notification
+    student_id = await _user_id(client, student_token)
+
+    with patch("src.notifications.service.publish_messages", new_callable=AsyncMock) as pub:
+        await create_notification(student_id, "Hello", "World", notification_type="info")
+
+    [(channel, event)] = pub.call_args.args[0]
+    assert channel == f"notifications:{student_id}"
+    assert event["type"] == "notification"
+    assert event["notification"]["title"] == "Hello"
+    assert event["unread_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_fan_out_batches_round_trips(client: AsyncClient):
+    from src.notifications.service import create_notifications_bulk
+    from src.tests.conftest import mock_mongo
+
+    with patch("src.notifications.service.incr_existing_counters",
+               AsyncMock(side_effect=lambda keys: list(range(1, len(keys) + 1)))) as incr, \
+         patch("src.notifications.service.publish_messages", new_callable=AsyncMock) as pub:
+        await create_notifications_bulk([1, 2, 3, 2], "Team update", notification_type="team")
+
+    assert sorted(d["user_id"] for d in mock_mongo.notifications.docs) == [1, 2, 3]
+    incr.assert_awaited_once_with(["unread:1", "unread:2", "unread:3"])
+    messages = pub.call_args.args[0]
+    assert [channel for channel, _ in messages] == [
+        "notifications:1", "notifications:2", "notifications:3",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_mark_all_read_publishes_zero_count(client: AsyncClient, student_token):
+    student_id = await _user_id(client, student_token)
+    with patch("src.notifications.service.publish_message", new_callable=AsyncMock) as pub:
+        await client.post("/api/v1/notifications/read-all", headers=auth(student_token))
+    pub.assert_called_once_with(f"notifications:{student_id}", {"type": "unread_count", "count": 0})
+
+
+@pytest.mark.asyncio
+async def test_hub_shares_one_subscription_per_user():
+    from src.notifications.push import NotificationHub
+    pubsub = MagicMock(subscribe=AsyncMock(), unsubscribe=AsyncMock(), close=AsyncMock(),
+                       get_message=AsyncMock(return_value=None), subscribed=True)
+    redis = MagicMock(pubsub=MagicMock(return_value=pubsub))
+    hub = NotificationHub()
+    ws1, ws2 = MagicMock(send_json=AsyncMock()), MagicMock(send_json=AsyncMock())
+
+    with patch("src.notifications.push.get_redis", AsyncMock(return_value=redis)):
+        await hub.connect(7, ws1)
+        await hub.connect(7, ws2)
+        pubsub.subscribe.assert_awaited_once_with("notifications:7")
+
+        await hub.send_local(7, {"type": "unread_count", "count": 3})
+        ws1.send_json.assert_awaited_once_with({"type": "unread_count", "count": 3})
+        ws2.send_json.assert_awaited_once_with({"type": "unread_count", "count": 3})
+
+        await hub.disconnect(7, ws1)
+        pubsub.unsubscribe.assert_not_awaited()
+        await hub.disconnect(7, ws2)
+        pubsub.unsubscribe.assert_awaited_once_with("notifications:7")
+        await hub.close()
+
+
+# ── Unread counters ────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_unread_count_rebuilt_after_redis_loss(client: AsyncClient, student_token):
+    from src.notifications.service import create_notification
+    from src.tests.conftest import mock_redis_store
+    student_id = await _user_id(client, student_token)
+    await create_notification(student_id, "One")
+    await create_notification(student_id, "Two")
+
+    mock_redis_store.pop(f"unread:{student_id}")  # Redis restart / flush
+    r = await client.get("/api/v1/notifications/unread-count", headers=auth(student_token))
+    assert r.json()["count"] == 2
+    assert mock_redis_store[f"unread:{student_id}"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_fan_out_flags_counters_for_recompute(client: AsyncClient, student_token):
+    from src.notifications.service import create_notification, create_notifications_bulk
+    from src.tests.conftest import mock_redis_store
+    student_id = await _user_id(client, student_token)
+    await create_notification(student_id, "One")
+
+    with patch("src.notifications.service.incr_existing_counters",
+               AsyncMock(side_effect=ConnectionError("redis down"))):
+        with pytest.raises(ConnectionError):
+            await create_notifications_bulk([student_id], "Two")
+    assert mock_redis_store[f"unread:{student_id}"] == 1  # the insert landed, the bump did not
+
+    r = await client.get("/api/v1/notifications/unread-count", headers=auth(student_token))
+    assert r.json()["count"] == 2
+    assert mock_redis_store[f"unread:{student_id}"] == 2
+    assert f"unread_stale:{student_id}" not in mock_redis_store
+
+
+@pytest.mark.asyncio
+async def test_mark_read_never_goes_negative(client: AsyncClient, student_token):
+    from src.notifications.service import create_notification
+    from src.tests.conftest import mock_redis_store
+    student_id = await _user_id(client, student_token)
+    await create_notification(student_id, "Only one")
+    notif_id = (await client.get("/api/v1/notifications/", headers=auth(student_token))).json()[0]["id"]
+
+    mock_redis_store[f"unread:{student_id}"] = 0  # drifted low
+    r = await client.put(f"/api/v1/notifications/{notif_id}/read", headers=auth(student_token))
+    assert r.status_code == 200
+    assert mock_redis_store[f"unread:{student_id}"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reconciler_repairs_drift(client: AsyncClient, student_token):
+    from src.notifications.service import create_notification, reconcile_unread_counters
+    from src.tests.conftest import mock_redis_store
+    student_id = await _user_id(client, student_token)
+    await create_notification(student_id, "Hello")
+
+    mock_redis_store[f"unread:{student_id}"] = 9
+    assert await reconcile_unread_counters(100) == 1
+    assert mock_redis_store[f"unread:{student_id}"] == 1
+
+
+# ── Inbox paging & retention ───────────────────────────
+
+@pytest.mark.asyncio
+async def test_keyset_pagination_with_before(client: AsyncClient, student_token):
+    from src.notifications.service import create_notification
+    student_id = await _user_id(client, student_token)
+    for i in range(5):
+        await create_notification(student_id, f"N{i}")
+
+    r = await client.get("/api/v1/notifications/", params={"size": 2}, headers=auth(student_token))
+    first = r.json()
+    assert [n["title"] for n in first] == ["N4", "N3"]
+
+    r = await client.get("/api/v1/notifications/", params={"size": 2, "before": first[-1]["id"]},
+                         headers=auth(student_token))
+    assert [n["title"] for n in r.json()] == ["N2", "N1"]
+
+    r = await client.get("/api/v1/notifications/", params={"before": "bad"}, headers=auth(student_token))
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_bulk_mark_read(client: AsyncClient, student_token):
+    from src.notifications.service import create_notification
+    student_id = await _user_id(client, student_token)
+    for i in range(3):
+        await create_notification(student_id, f"N{i}")
+    ids = [n["id"] for n in (await client.get("/api/v1/notifications/", headers=auth(student_token))).json()]
+
+    r = await client.post("/api/v1/notifications/read", json={"ids": ids[:2]}, headers=auth(student_token))
+    assert r.status_code == 200
+    assert r.json()["count"] == 1
+
+    # Re-marking already-read ids is a no-op
+    r = await client.post("/api/v1/notifications/read", json={"ids": ids[:2]}, headers=auth(student_token))
+    assert r.json()["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_inbox_is_capped_per_user(client: AsyncClient, student_token):
+    from src.notifications.service import create_notifications_bulk
+    from src.tests.conftest import mock_mongo, mock_redis_store
+    student_id = await _user_id(client, student_token)
+    other_id = student_id + 1
+
+    with patch("src.notifications.service.settings.NOTIFICATION_MAX_PER_USER", 3):
+        for i in range(5):
+            await create_notifications_bulk([student_id, other_id], f"N{i}")
+        for user_id in (student_id, other_id):
+            mock_redis_store.pop(f"inbox_trim:{user_id}")  # trim interval elapsed
+        # The whole fan-out is trimmed in one aggregation and one delete
+        with patch.object(mock_mongo.notifications, "delete_many",
+                          wraps=mock_mongo.notifications.delete_many) as delete:
+            await create_notifications_bulk([student_id, other_id], "N5")
+        delete.assert_awaited_once()
+
+    for user_id in (student_id, other_id):
+        titles = [d["title"] for d in mock_mongo.notifications.docs if d["user_id"] == user_id]
+        assert titles == ["N3", "N4", "N5"]
+    assert mock_redis_store[f"unread:{student_id}"] == 3
+
+
+@pytest.mark.asyncio
+async def test_read_notifications_expire_from_read_time(client: AsyncClient, student_token):
+    from src.notifications.service import create_notification
+    from src.tests.conftest import mock_mongo
+    student_id = await _user_id(client, student_token)
+    await create_notification(student_id, "Hello")
+    [doc] = mock_mongo.notifications.docs
+    assert "read_at" not in doc  # unread notifications are not covered by the TTL index
+
+    await client.put(f"/api/v1/notifications/{doc['_id']}/read", headers=auth(student_token))
+    assert doc["read_at"] >= doc["created_at"]
+
+
+@pytest.mark.asyncio
+async def test_bumped_group_moves_to_the_top_and_survives_trim(client: AsyncClient, student_token):
+    from src.notifications.service import create_notification
+    from src.tests.conftest import mock_mongo, mock_redis_store
+    student_id = await _user_id(client, student_token)
+
+    await create_notification(student_id, "Comments", group_key="task:1:comments")
+    for i in range(3):
+        await create_notification(student_id, f"N{i}")
+    await create_notification(student_id, "More comments", group_key="task:1:comments")
+
+    r = await client.get("/api/v1/notifications/", params={"size": 2}, headers=auth(student_token))
+    first = r.json()
+    assert [(n["title"], n["count"]) for n in first] == [("More comments", 2), ("N2", 1)]
+    r = await client.get("/api/v1/notifications/", params={"size": 2, "before": first[-1]["id"]},
+                         headers=auth(student_token))
+    assert [n["title"] for n in r.json()] == ["N1", "N0"]
+
+    # The group is the oldest document but the most recently active, so the trim keeps it
+    with patch("src.notifications.service.settings.NOTIFICATION_MAX_PER_USER", 2):
+        mock_redis_store.pop(f"inbox_trim:{student_id}")
+        await create_notification(student_id, "N3")
+    titles = {d["title"] for d in mock_mongo.notifications.docs}
+    assert titles == {"More comments", "N3"}
+
+    # Reading the group closes it; the next event opens a new one
+    group_id = next(d["_id"] for d in mock_mongo.notifications.docs if d.get("group_key"))
+    await client.put(f"/api/v1/notifications/{group_id}/read", headers=auth(student_token))
+    await create_notification(student_id, "New comments", group_key="task:1:comments")
+    open_groups = [d for d in mock_mongo.notifications.docs if d.get("open")]
+    assert [d["title"] for d in open_groups] == ["New comments"]
@@ -221,6 +221,32 @@ async def test_add_and_list_comments(client: AsyncClient, company_token, student
     assert len(r.json()) == 1
 
 
+@pytest.mark.asyncio
+async def test_repeated_comments_collapse_into_one_notification(
+    client: AsyncClient, company_token, student_token,
+):
+    from src.tests.conftest import mock_mongo, mock_redis_store
+    pid, student_id = await _create_project_with_team(client, company_token, student_token)
+    created = await client.post(f"/api/v1/tasks/project/{pid}", json={
+        "title": "Busy task", "assignee_id": student_id,
+    }, headers=auth(company_token))
+    tid = created.json()["id"]
+
+    for i in range(3):
+        await client.post(f"/api/v1/tasks/{tid}/comments",
+                          json={"content": f"ping {i}"}, headers=auth(company_token))
+
+    grouped = [d for d in mock_mongo.notifications.docs if d.get("group_key") == f"task:{tid}:comments"]
+    assert len(grouped) == 1
+    assert grouped[0]["count"] == 3
+
+    r = await client.get("/api/v1/notifications/unread-count", headers=auth(student_token))
+    unread = r.json()["count"]
+    assert unread == mock_redis_store[f"unread:{student_id}"]
+    assert unread == len([d for d in mock_mongo.notifications.docs
+                          if d["user_id"] == student_id and not d["is_read"]])
+
+
 @pytest.mark.asyncio
 async def test_outsider_cant_comment(client: AsyncClient, company_token, student_token):
     pid, _ = await _create_project_with_team(client, company_token, student_token)
@@ -189,3 +189,51 @@ async def test_team_chat_room(client: AsyncClient, company_token, student_token)
     room = r.json()
     assert room["project_id"] == pid
     assert len(room["participants"]) >= 2  # owner + student
+
+
+# ── Access roster cache ────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_cached_access_follows_team_changes(client: AsyncClient, company_token, student_token):
+    from src.tests.conftest import mock_redis_store
+    from src.users.models import User
+    proj = await client.post("/api/v1/projects/", json={
+        "title": "Access", "description": "Cached roster", "max_participants": 5,
+    }, headers=auth(company_token))
+    pid = proj.json()["id"]
+    student = await User.filter(username="student1").first()
+
+    assert (await client.get(f"/api/v1/tasks/project/{pid}", headers=auth(student_token))).status_code == 403
+    assert mock_redis_store[f"project_access:{pid}"]["team"] == []
+
+    await client.post(f"/api/v1/teams/project/{pid}/members", json={
+        "user_id": student.id, "role": "backend",
+    }, headers=auth(company_token))
+    assert (await client.get(f"/api/v1/tasks/project/{pid}", headers=auth(student_token))).status_code == 200
+    assert mock_redis_store[f"project_access:{pid}"]["team"] == [student.id]
+
+    await client.delete(f"/api/v1/teams/project/{pid}/members/{student.id}", headers=auth(company_token))
+    assert (await client.get(f"/api/v1/tasks/project/{pid}", headers=auth(student_token))).status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_access_fill_racing_an_invalidation_is_not_cached(client: AsyncClient, company_token):
+    from unittest.mock import patch
+    from src.projects import access
+    from src.tests.conftest import mock_redis_store
+    pid = (await client.post("/api/v1/projects/", json={
+        "title": "Race", "description": "Fill vs invalidate",
+    }, headers=auth(company_token))).json()["id"]
+    await access.invalidate_project_access(pid)
+    load = access.load_project_access
+
+    async def load_then_invalidate(project_id):
+        stale = await load(project_id)
+        await access.invalidate_project_access(project_id)  # a team change commits meanwhile
+        return stale
+
+    with patch.object(access, "load_project_access", load_then_invalidate):
+        assert (await access.get_project_access(pid)).project_id == pid
+    assert f"project_access:{pid}" not in mock_redis_store
+    await access.get_project_access(pid)
+    assert f"project_access:{pid}" in mock_redis_store
@@ -9,6 +9,12 @@ class RoleEnum(str, enum.Enum):
     admin = "admin"
 
 
+class EmailFrequency(str, enum.Enum):
+    instant = "instant"
+    hourly = "hourly"
+    daily = "daily"
+
+
 class User(models.Model):
     id = fields.IntField(primary_key=True)
     email = fields.CharField(max_length=255, unique=True, db_index=True)
@@ -20,6 +26,7 @@ class User(models.Model):
     bio = fields.TextField(null=True)
     is_active = fields.BooleanField(default=True)
     is_blocked = fields.BooleanField(default=False)
+    email_frequency = fields.CharEnumField(enum_type=EmailFrequency, default=EmailFrequency.instant)
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
 
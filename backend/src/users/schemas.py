@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, EmailStr, Field
-from src.users.models import RoleEnum
+from src.users.models import RoleEnum, EmailFrequency
 
 
 class SkillOut(BaseModel):
@@ -25,6 +25,7 @@ class UserResponse(UserBase):
     role: RoleEnum
     is_active: bool
     is_blocked: bool
+    email_frequency: EmailFrequency = EmailFrequency.instant
     skills: list[SkillOut] = []
     created_at: datetime
     class Config:
@@ -35,6 +36,7 @@ class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     bio: Optional[str] = None
     avatar_url: Optional[str] = None
+    email_frequency: Optional[EmailFrequency] = None
 
 
 class CompanyProfileCreate(BaseModel):
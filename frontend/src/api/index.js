@@ -75,6 +75,7 @@ export const skillsAPI = {
 // ── Projects ────────────────────────────────────────
 export const projectsAPI = {
   list: p => api.get('/projects/', { params: p }),
+  recommended: p => api.get('/projects/recommended', { params: p }),
   get: id => api.get(`/projects/${id}`),
   create: d => api.post('/projects/', d),
   update: (id, d) => api.put(`/projects/${id}`, d),
@@ -91,23 +92,89 @@ export const applicationsAPI = {
 }
 
 // ── Files ───────────────────────────────────────────
+// SubtleCrypto only exists in secure contexts (https or localhost)
+async function sha256Hex(file) {
+  if (!globalThis.crypto?.subtle) return null
+  const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer())
+  return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('')
+}
+
 export const filesAPI = {
-  upload: (projectId, file, fileType = 'attachment') => {
+  upload: async (projectId, file, fileType = 'attachment') => {
     const fd = new FormData()
     fd.append('file', file)
-    return api.post(`/files/project/${projectId}?file_type=${fileType}`, fd, {
+    // With the hash, content the server already stores isn't written to storage again
+    const sha256 = await sha256Hex(file)
+    return api.post(`/files/project/${projectId}`, fd, {
+      params: sha256 ? { file_type: fileType, sha256 } : { file_type: fileType },
       headers: { 'Content-Type': 'multipart/form-data' }
     })
   },
   list: (projectId, fileType) => api.get(`/files/project/${projectId}`, { params: fileType ? { file_type: fileType } : {} }),
   download: id => api.get(`/files/${id}/download`, { responseType: 'blob' }),
+  // Short-lived signed export.zip link; open it as a navigation so the browser streams the download
+  exportUrl: (projectId, fileType = 'submission') =>
+    api.post(`/files/project/${projectId}/export-url`, null, { params: { file_type: fileType } }),
+  // `url` is the thumbnail_url/preview_url from the file list (already includes /api/v1)
+  thumbnail: url => api.get(url, { baseURL: '', responseType: 'blob' }),
+  // Direct transfers (FILE_TRANSFER_MODE=presigned); these 400 when the API proxies files
+  downloadUrl: id => api.get(`/files/${id}/download-url`),
+  requestUploadUrl: (projectId, file, fileType = 'attachment') => api.post(`/files/project/${projectId}/upload-url`, {
+    filename: file.name, file_size: file.size, content_type: file.type || null, file_type: fileType,
+  }),
+  uploadDirect: async (projectId, file, fileType = 'attachment') => {
+    const { data } = await filesAPI.requestUploadUrl(projectId, file, fileType)
+    const fd = new FormData()
+    Object.entries(data.fields).forEach(([k, v]) => fd.append(k, v))
+    fd.append('file', file)
+    await axios.post(data.url, fd)
+    return api.post(`/files/uploads/${data.upload_id}/finalize`)
+  },
+  // Large files go up in numbered parts: a failed part is retried, and an interrupted
+  // upload (even across page reloads) resumes from the parts the server already has
+  uploadResumable: async (projectId, file, fileType = 'attachment', onProgress) => {
+    const key = `upload:${projectId}:${fileType}:${file.name}:${file.size}:${file.lastModified}`
+    let session = null
+    const saved = localStorage.getItem(key)
+    if (saved) {
+      try { session = (await api.get(`/files/upload-sessions/${saved}`)).data } catch { localStorage.removeItem(key) }
+    }
+    if (!session) {
+      session = (await api.post(`/files/project/${projectId}/upload-sessions`, {
+        filename: file.name, file_size: file.size, content_type: file.type || null, file_type: fileType,
+      })).data
+      localStorage.setItem(key, session.upload_id)
+    }
+    const received = new Set(session.received_parts)
+    for (let n = 1; n <= session.total_parts; n++) {
+      if (!received.has(n)) {
+        const chunk = file.slice((n - 1) * session.chunk_size, n * session.chunk_size)
+        for (let attempt = 1; ; attempt++) {
+          try {
+            await api.put(`/files/upload-sessions/${session.upload_id}/parts/${n}`, chunk, {
+              headers: { 'Content-Type': 'application/octet-stream' },
+            })
+            break
+          } catch (e) {
+            if (attempt >= 3 || (e.response && e.response.status < 500)) throw e
+            await new Promise(resolve => setTimeout(resolve, 1000 * attempt))
+          }
+        }
+      }
+      onProgress?.(n / session.total_parts)
+    }
+    const res = await api.post(`/files/upload-sessions/${session.upload_id}/complete`)
+    localStorage.removeItem(key)
+    return res
+  },
   delete: id => api.delete(`/files/${id}`),
 }
 
 // ── Chat ────────────────────────────────────────────
 export const chatAPI = {
   createRoom: (projectId, userId) => api.post(`/chat/rooms/${projectId}/${userId}`),
-  myRooms: () => api.get('/chat/rooms'),
+  myRooms: (params = {}) => api.get('/chat/rooms', { params }),
+  room: roomId => api.get(`/chat/rooms/${roomId}`),
   messages: (roomId, page = 1) => api.get(`/chat/rooms/${roomId}/messages`, { params: { page } }),
   send: (roomId, content) => api.post(`/chat/rooms/${roomId}/messages`, { content }),
   connectWs: (roomId) => {
@@ -119,10 +186,16 @@ export const chatAPI = {
 
 // ── Notifications ───────────────────────────────────
 export const notificationsAPI = {
-  list: (unread, page = 1) => api.get('/notifications/', { params: { unread_only: unread || false, page } }),
+  list: (unread, page = 1, before) => api.get('/notifications/', { params: { unread_only: unread || false, page, before } }),
   unreadCount: () => api.get('/notifications/unread-count'),
   markRead: id => api.put(`/notifications/${id}/read`),
+  markManyRead: ids => api.post('/notifications/read', { ids }),
   markAllRead: () => api.post('/notifications/read-all'),
+  connectWs: () => {
+    const token = localStorage.getItem('access_token')
+    const proto = window.location.protocol === 'https:' ? 'wss' : 'ws'
+    return new WebSocket(`${proto}://${window.location.host}/api/v1/notifications/ws?token=${token}`)
+  },
 }
 
 // ── Reviews ─────────────────────────────────────────
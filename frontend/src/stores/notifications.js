@@ -37,12 +37,45 @@ export const useNotificationsStore = defineStore('notifications', () => {
     unreadCount.value = 0
   }
 
+  // Live updates arrive over the WebSocket; the poll only reconciles drift
+  // (e.g. missed events while the socket was reconnecting).
+  const RECONCILE_MS = 5 * 60 * 1000
   let pollInterval = null
+  let ws = null
+  let reconnectTimer = null
+  let reconnectDelay = 1000
+
+  function handleEvent(event) {
+    if (event.type === 'notification') {
+      // Grouped events re-send the same id with a bumped count — replace in place.
+      items.value = [event.notification, ...items.value.filter(n => n.id !== event.notification.id)]
+      unreadCount.value = event.unread_count
+    } else if (event.type === 'unread_count') {
+      unreadCount.value = event.count
+    }
+  }
+
+  function connect() {
+    try {
+      ws = notificationsAPI.connectWs()
+    } catch {
+      return
+    }
+    ws.onopen = () => { reconnectDelay = 1000 }
+    ws.onmessage = e => { try { handleEvent(JSON.parse(e.data)) } catch {} }
+    ws.onclose = () => {
+      ws = null
+      if (!pollInterval) return
+      reconnectTimer = setTimeout(connect, reconnectDelay)
+      reconnectDelay = Math.min(reconnectDelay * 2, 30000)
+    }
+  }
 
   function startPolling() {
     if (pollInterval) return
     fetchUnreadCount()
-    pollInterval = setInterval(fetchUnreadCount, 30000)
+    pollInterval = setInterval(fetchUnreadCount, RECONCILE_MS)
+    connect()
   }
 
   function stopPolling() {
@@ -50,6 +83,8 @@ export const useNotificationsStore = defineStore('notifications', () => {
       clearInterval(pollInterval)
       pollInterval = null
     }
+    clearTimeout(reconnectTimer)
+    if (ws) ws.close()
   }
 
   return {